@@ -0,0 +1,261 @@
+"""
+Vision Pipeline Benchmark
+Per-stage latency and frame rate of the vision lessons at several resolutions.
+
+Week 2 success criterion: HSV filtering at 20-30fps on the Pi 5. This runs
+every stage of HSVStereoPipeline, compute_disparity from the contour lesson
+and the Canny pipeline from the edge detection lesson over stereo pairs
+(datasets/raw by default), scaled to each requested resolution, and
+reports p50/p95/p99 latency and fps per stage:
+
+    begin_frame   color conversion (+ rectification when calibrated)
+    stage1..4     HSV proposals, merge, contours, stereo depth
+    pipeline      begin_frame + stage1..4 (one HSVStereoPipeline.process)
+    disparity     contour_detection_lesson.compute_disparity (full-frame StereoBM)
+    canny         edge_detection_lesson.process_frame
+
+--proposals also times stage 1 (with its begin_frame) in the 'full' and
+'pyramid' proposal modes and reports the speedup and how well the pyramid
+boxes agree with the full-resolution ones (recall, precision, mean IoU).
+
+Results are written as JSON for comparing runs across machines and commits.
+
+Usage:
+    python benchmarks/vision_bench.py [--source images:datasets/raw] [--scales 1,0.5,0.25]
+                                      [--repeat 5] [--output benchmarks/results/latest.json]
+                                      [--proposals]
+    python benchmarks/vision_bench.py --source synthetic --frames 30
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+R_VISION_DIR = os.path.join(REPO_ROOT, 'learning', 'computer_vision', 'r_vision')
+sys.path.insert(0, R_VISION_DIR)
+
+import cv2
+import numpy as np
+
+from contour_detection_lesson import compute_disparity
+from edge_detection_lesson import process_frame
+from frame_sources import open_source
+from hsv_bounded_stereo_lesson import HSVStereoPipeline, proposal_agreement
+
+DEFAULT_SOURCE = 'images:' + os.path.join(REPO_ROOT, 'datasets', 'raw')
+DEFAULT_OUTPUT = os.path.join(REPO_ROOT, 'benchmarks', 'results', 'latest.json')
+
+PIPELINE_STAGES = [
+    ('stage1', 'stage1_hsv_region_proposal'),
+    ('stage2', 'stage2_merge_nearby_detections'),
+    ('stage3', 'stage3_contour_detection_within_bounds'),
+    ('stage4', 'stage4_stereo_depth_analysis'),
+]
+
+
+def load_pairs(spec, max_frames):
+    """All stereo pairs from a source spec (at most max_frames)."""
+    pairs = []
+    with open_source(spec, stereo=True) as source:
+        for pair, _ in source:
+            pairs.append(pair)
+            if max_frames and len(pairs) >= max_frames:
+                break
+    return pairs
+
+
+def scale_pair(pair, scale):
+    if scale == 1.0:
+        return pair
+    return tuple(cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                 for img in pair)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000.0
+
+
+def run_pipeline_stages(pipeline, left, right, timings):
+    """One HSVStereoPipeline.process, timing each stage separately."""
+    frame_ms = timed(pipeline.begin_frame, left, right)
+    timings['begin_frame'].append(frame_ms)
+    for name, method in PIPELINE_STAGES:
+        ms = timed(getattr(pipeline, method))
+        timings[name].append(ms)
+        frame_ms += ms
+    pipeline.end_frame(frame_ms)
+    timings['pipeline'].append(frame_ms)
+
+
+def summarize(samples):
+    values = np.asarray(samples)
+    mean = float(values.mean())
+    return {
+        'n': len(values),
+        'mean_ms': mean,
+        'p50_ms': float(np.percentile(values, 50)),
+        'p95_ms': float(np.percentile(values, 95)),
+        'p99_ms': float(np.percentile(values, 99)),
+        'fps': 1000.0 / mean if mean > 0 else None,
+    }
+
+
+def benchmark(pairs, scales, repeat, baseline_cm=15.24, warmup=1):
+    """Per-stage summaries for every scale, as a list of result rows."""
+    rows = []
+    for scale in scales:
+        scaled = [scale_pair(pair, scale) for pair in pairs]
+        timings = {name: [] for name in
+                   ['begin_frame'] + [s for s, _ in PIPELINE_STAGES] +
+                   ['pipeline', 'disparity', 'canny']}
+
+        pipeline = HSVStereoPipeline(baseline_cm)
+        for left, right in scaled[:1] * warmup:
+            pipeline.process(left, right)
+            compute_disparity(left, right)
+            process_frame(left)
+
+        for _ in range(repeat):
+            for left, right in scaled:
+                run_pipeline_stages(pipeline, left, right, timings)
+                timings['disparity'].append(timed(compute_disparity, left, right))
+                timings['canny'].append(timed(process_frame, left))
+
+        height, width = scaled[0][0].shape[:2]
+        for stage, samples in timings.items():
+            rows.append({'scale': scale, 'width': width, 'height': height,
+                         'stage': stage, **summarize(samples)})
+    return rows
+
+
+def compare_proposals(pairs, scales, repeat, baseline_cm=15.24):
+    """Stage 1 latency in both proposal modes and their box agreement, one row per scale."""
+    rows = []
+    for scale in scales:
+        scaled = [scale_pair(pair, scale) for pair in pairs]
+        timings = {}
+        detections = {}
+        for mode in ('full', 'pyramid'):
+            pipeline = HSVStereoPipeline(baseline_cm)
+            pipeline.proposal_mode = mode
+            samples = []
+            detections[mode] = []
+            for _ in range(repeat):
+                for left, right in scaled:
+                    samples.append(timed(pipeline.begin_frame, left, right) +
+                                   timed(pipeline.stage1_hsv_region_proposal))
+            # Detections for every pair, for the agreement
+            for left, right in scaled:
+                pipeline.begin_frame(left, right)
+                pipeline.stage1_hsv_region_proposal()
+                detections[mode].append(pipeline.color_detections)
+            timings[mode] = float(np.percentile(samples, 50))
+
+        agreements = [proposal_agreement(full, pyramid)
+                      for full, pyramid in zip(detections['full'], detections['pyramid'])]
+        reference = sum(a['reference'] for a in agreements)
+        candidate = sum(a['candidate'] for a in agreements)
+        matched = sum(a['matched'] for a in agreements)
+        ious = [a['mean_iou'] for a in agreements if a['mean_iou'] is not None]
+
+        height, width = scaled[0][0].shape[:2]
+        rows.append({
+            'scale': scale, 'width': width, 'height': height,
+            'full_p50_ms': timings['full'],
+            'pyramid_p50_ms': timings['pyramid'],
+            'speedup': timings['full'] / timings['pyramid'] if timings['pyramid'] > 0 else None,
+            'recall': matched / reference if reference else 1.0,
+            'precision': matched / candidate if candidate else 1.0,
+            'mean_iou': float(np.mean(ious)) if ious else None,
+        })
+    return rows
+
+
+def print_proposal_table(rows):
+    print(f"{'scale':>5} {'size':>10} {'full':>8} {'pyramid':>8} {'speedup':>8} "
+          f"{'recall':>7} {'prec':>7} {'IoU':>6}")
+    for row in rows:
+        iou = f"{row['mean_iou']:.2f}" if row['mean_iou'] is not None else '-'
+        print(f"{row['scale']:>5} {row['width']:>4}x{row['height']:<5} "
+              f"{row['full_p50_ms']:>6.1f}ms {row['pyramid_p50_ms']:>6.1f}ms "
+              f"{row['speedup']:>7.2f}x {row['recall']:>7.2f} {row['precision']:>7.2f} {iou:>6}")
+
+
+def print_table(rows, target_fps):
+    print(f"{'scale':>5} {'size':>10} {'stage':>12} {'p50':>8} {'p95':>8} {'p99':>8} {'fps':>8}")
+    for row in rows:
+        print(f"{row['scale']:>5} {row['width']:>4}x{row['height']:<5} {row['stage']:>12} "
+              f"{row['p50_ms']:>6.1f}ms {row['p95_ms']:>6.1f}ms {row['p99_ms']:>6.1f}ms "
+              f"{row['fps']:>8.1f}")
+    for row in rows:
+        if row['stage'] == 'pipeline':
+            verdict = "✓" if row['fps'] >= target_fps else "✗"
+            print(f"{verdict} {row['width']}x{row['height']}: pipeline {row['fps']:.1f}fps "
+                  f"(target {target_fps}fps)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage vision pipeline benchmark")
+    parser.add_argument('--source', default=DEFAULT_SOURCE, help="Stereo frame source spec")
+    parser.add_argument('--frames', type=int, default=0, help="Max pairs to read (0 = all)")
+    parser.add_argument('--scales', default='1,0.5,0.25')
+    parser.add_argument('--repeat', type=int, default=5, help="Passes over the pairs per scale")
+    parser.add_argument('--target-fps', type=float, default=20.0)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--proposals', action='store_true',
+                        help="Also compare the full and pyramid stage 1 proposal modes")
+    args = parser.parse_args()
+
+    frames = args.frames or (30 if args.source.startswith('synthetic') else 0)
+    pairs = load_pairs(args.source, frames)
+    if not pairs:
+        print(f"Error: No stereo pairs from {args.source}")
+        sys.exit(1)
+    scales = [float(s) for s in args.scales.split(',')]
+
+    print("="*70)
+    print(f"VISION BENCHMARK - {len(pairs)} pairs x {args.repeat} passes, scales {scales}")
+    print("="*70)
+    rows = benchmark(pairs, scales, args.repeat)
+    print_table(rows, args.target_fps)
+    proposal_rows = None
+    if args.proposals:
+        print("-"*70)
+        print("STAGE 1 PROPOSALS - full vs pyramid (begin_frame + stage1, p50)")
+        proposal_rows = compare_proposals(pairs, scales, args.repeat)
+        print_proposal_table(proposal_rows)
+
+    results = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'host': platform.node(),
+            'machine': platform.machine(),
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'source': args.source,
+            'pairs': len(pairs),
+            'repeat': args.repeat,
+            'scales': scales,
+        },
+        'results': rows,
+    }
+    if proposal_rows is not None:
+        results['proposals'] = proposal_rows
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+"""
+Stereo Camera Calibration
+Compute camera matrices for the Camera Module 3 Wide pair from checkerboard photos.
+
+Checkerboard: calibration/Checkerboard-A4-30mm-8x6.pdf
+    8x6 squares of 30mm -> 7x5 inner corners
+
+Image layout (pairs share a file name):
+    calibration/calibration_images/left/<name>.jpg
+    calibration/calibration_images/right/<name>.jpg
+
+Corner detection runs in a process pool, and every result is cached in
+calibration/calibration_images/corner_cache.json keyed by the image's
+SHA-1 and the board's pattern size. Adding five new photos only detects corners in those five, and
+dropping an outlier with --exclude recalibrates from the cache without
+touching any image.
+
+Outputs:
+    calibration/camera_matrices/stereo_calibration.npz   (K1, D1, K2, D2, R, T, E, F, image_size)
+    calibration/camera_matrices/calibration_report.json  (per-image reprojection error)
+
+Usage:
+    python calibrate_cameras.py [--workers 4] [--exclude IMG_0012,IMG_0019]
+                                [--max-error 0.5] [--rational]
+
+Target: RMS reprojection error < 0.5 px.
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from rectification import CALIBRATION_DIR, DEFAULT_CALIBRATION
+
+IMAGES_DIR = os.path.join(CALIBRATION_DIR, 'calibration_images')
+REPORT_PATH = os.path.join(CALIBRATION_DIR, 'camera_matrices', 'calibration_report.json')
+
+PATTERN_SIZE = (7, 5)      # Inner corners of the 8x6 board
+SQUARE_SIZE_MM = 30.0
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+
+def board_points(pattern_size=PATTERN_SIZE, square_size=SQUARE_SIZE_MM):
+    """3D corner positions on the flat board (z = 0), in mm."""
+    cols, rows = pattern_size
+    points = np.zeros((cols * rows, 3), np.float32)
+    points[:, :2] = np.mgrid[0:cols, 0:rows].T.reshape(-1, 2) * square_size
+    return points
+
+
+def image_sha1(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def detect_corners(path, pattern_size=PATTERN_SIZE):
+    """Find and refine checkerboard corners in one image. Runs in a worker process."""
+    gray = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        return {'found': False, 'error': 'unreadable'}
+
+    flags = cv2.CALIB_CB_ADAPTIVE_THRESH | cv2.CALIB_CB_NORMALIZE_IMAGE
+    found, corners = cv2.findChessboardCorners(gray, pattern_size, flags=flags)
+    result = {'found': bool(found), 'image_size': [gray.shape[1], gray.shape[0]]}
+    if found:
+        criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 30, 0.001)
+        corners = cv2.cornerSubPix(gray, corners, (11, 11), (-1, -1), criteria)
+        result['corners'] = corners.reshape(-1, 2).tolist()
+    return result
+
+
+def load_cache(cache_path):
+    if os.path.exists(cache_path):
+        with open(cache_path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_cache(cache_path, cache):
+    with open(cache_path, 'w') as f:
+        json.dump(cache, f)
+
+
+def update_corner_cache(paths, cache, workers=None, pattern_size=PATTERN_SIZE):
+    """
+    Detect corners for every image whose hash is not cached yet for this
+    pattern size. Returns {path: cache entry} for all paths and the number of
+    images processed.
+    """
+    cols, rows = pattern_size
+    hashes = {path: f"{image_sha1(path)}:{cols}x{rows}" for path in paths}
+    todo = [path for path in paths if hashes[path] not in cache]
+
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(detect_corners, todo, [pattern_size] * len(todo))
+            for path, result in zip(todo, results):
+                cache[hashes[path]] = result
+
+    return {path: cache[hashes[path]] for path in paths}, len(todo)
+
+
+def list_images(folder):
+    if not os.path.isdir(folder):
+        return {}
+    return {os.path.splitext(name)[0]: os.path.join(folder, name)
+            for name in sorted(os.listdir(folder))
+            if name.lower().endswith(IMAGE_EXTENSIONS)}
+
+
+def per_view_errors(obj_points, img_points, rvecs, tvecs, K, D):
+    """RMS reprojection error of each view, in pixels."""
+    errors = []
+    for obj, img, rvec, tvec in zip(obj_points, img_points, rvecs, tvecs):
+        projected, _ = cv2.projectPoints(obj, rvec, tvec, K, D)
+        diff = projected.reshape(-1, 2) - img.reshape(-1, 2)
+        errors.append(float(np.sqrt(np.mean(np.sum(diff**2, axis=1)))))
+    return errors
+
+
+def calibrate_mono(names, detections, image_size, flags=0):
+    obj = board_points()
+    obj_points = [obj for _ in names]
+    img_points = [np.array(detections[n]['corners'], np.float32) for n in names]
+    rms, K, D, rvecs, tvecs = cv2.calibrateCamera(obj_points, img_points, image_size,
+                                                  None, None, flags=flags)
+    errors = per_view_errors(obj_points, img_points, rvecs, tvecs, K, D)
+    return rms, K, D, dict(zip(names, errors))
+
+
+def calibrate_stereo(names, left, right, K1, D1, K2, D2, image_size):
+    obj = board_points()
+    obj_points = [obj for _ in names]
+    left_points = [np.array(left[n]['corners'], np.float32) for n in names]
+    right_points = [np.array(right[n]['corners'], np.float32) for n in names]
+
+    rms, K1, D1, K2, D2, R, T, E, F = cv2.stereoCalibrate(
+        obj_points, left_points, right_points, K1, D1, K2, D2, image_size,
+        flags=cv2.CALIB_FIX_INTRINSIC,
+        criteria=(cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 100, 1e-6)
+    )
+
+    # Per-pair error: left pose from solvePnP, right pose through (R, T)
+    errors = {}
+    for name, o, lp, rp in zip(names, obj_points, left_points, right_points):
+        _, rvec_l, tvec_l = cv2.solvePnP(o, lp, K1, D1)
+        R_l = cv2.Rodrigues(rvec_l)[0]
+        rvec_r = cv2.Rodrigues(R @ R_l)[0]
+        tvec_r = R @ tvec_l + T
+        err_l = per_view_errors([o], [lp], [rvec_l], [tvec_l], K1, D1)[0]
+        err_r = per_view_errors([o], [rp], [rvec_r], [tvec_r], K2, D2)[0]
+        errors[name] = float(np.sqrt((err_l**2 + err_r**2) / 2))
+    return rms, R, T, E, F, errors
+
+
+def print_errors(title, errors, max_error):
+    print(f"\n{title}")
+    for name, err in sorted(errors.items(), key=lambda item: -item[1]):
+        flag = "  <-- outlier" if err > max_error else ""
+        print(f"  {name:30s} {err:6.3f}px{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate the stereo camera pair from checkerboard images")
+    parser.add_argument('--images', default=IMAGES_DIR)
+    parser.add_argument('--output', default=DEFAULT_CALIBRATION)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--exclude', default='', help="Comma-separated image names to leave out")
+    parser.add_argument('--max-error', type=float, default=0.5, help="Flag images above this error (px)")
+    parser.add_argument('--rational', action='store_true',
+                        help="8-coefficient distortion model for the 120° lenses")
+    args = parser.parse_args()
+
+    print("="*70)
+    print("STEREO CAMERA CALIBRATION")
+    print("="*70)
+
+    left_paths = list_images(os.path.join(args.images, 'left'))
+    right_paths = list_images(os.path.join(args.images, 'right'))
+    if not left_paths or not right_paths:
+        print(f"Error: Expected images in {args.images}/left and {args.images}/right")
+        sys.exit(1)
+
+    cache_path = os.path.join(args.images, 'corner_cache.json')
+    cache = load_cache(cache_path)
+    all_paths = list(left_paths.values()) + list(right_paths.values())
+    by_path, processed = update_corner_cache(all_paths, cache, args.workers)
+    save_cache(cache_path, cache)
+    print(f"✓ Corners: {processed} images detected, {len(all_paths) - processed} from cache")
+
+    excluded = {name.strip() for name in args.exclude.split(',') if name.strip()}
+    left = {n: by_path[p] for n, p in left_paths.items() if n not in excluded}
+    right = {n: by_path[p] for n, p in right_paths.items() if n not in excluded}
+
+    sizes = {tuple(d['image_size']) for d in list(left.values()) + list(right.values()) if 'image_size' in d}
+    if len(sizes) != 1:
+        print(f"Error: All calibration images must have the same size, found {sorted(sizes)}")
+        sys.exit(1)
+    image_size = sizes.pop()
+
+    flags = cv2.CALIB_RATIONAL_MODEL if args.rational else 0
+    left_names = sorted(n for n, d in left.items() if d['found'])
+    right_names = sorted(n for n, d in right.items() if d['found'])
+    pair_names = sorted(set(left_names) & set(right_names))
+    print(f"✓ Boards found: {len(left_names)} left, {len(right_names)} right, {len(pair_names)} pairs")
+    if len(pair_names) < 3:
+        print("Error: Need at least 3 image pairs with a detected board")
+        sys.exit(1)
+
+    rms_l, K1, D1, errors_l = calibrate_mono(left_names, left, image_size, flags)
+    rms_r, K2, D2, errors_r = calibrate_mono(right_names, right, image_size, flags)
+    rms_s, R, T, E, F, errors_s = calibrate_stereo(pair_names, left, right, K1, D1, K2, D2, image_size)
+
+    print_errors(f"LEFT camera: RMS {rms_l:.3f}px", errors_l, args.max_error)
+    print_errors(f"RIGHT camera: RMS {rms_r:.3f}px", errors_r, args.max_error)
+    print_errors(f"STEREO pairs: RMS {rms_s:.3f}px", errors_s, args.max_error)
+
+    os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    np.savez(args.output, K1=K1, D1=D1, K2=K2, D2=D2, R=R, T=T, E=E, F=F,
+             image_size=np.array(image_size))
+
+    report = {
+        'image_size': list(image_size),
+        'pattern_size': list(PATTERN_SIZE),
+        'square_size_mm': SQUARE_SIZE_MM,
+        'excluded': sorted(excluded),
+        'rms': {'left': rms_l, 'right': rms_r, 'stereo': rms_s},
+        'per_image': {'left': errors_l, 'right': errors_r, 'stereo': errors_s},
+        'baseline_mm': float(np.linalg.norm(T)),
+    }
+    with open(os.path.join(os.path.dirname(args.output), os.path.basename(REPORT_PATH)), 'w') as f:
+        json.dump(report, f, indent=2)
+
+    outliers = sorted(n for n, e in errors_s.items() if e > args.max_error)
+    print("\n" + "="*70)
+    print(f"✓ Saved {args.output}")
+    print(f"  Baseline: {np.linalg.norm(T):.1f}mm")
+    if max(rms_l, rms_r, rms_s) < args.max_error:
+        print(f"✓ All RMS errors below {args.max_error}px")
+    elif outliers:
+        print(f"⚠ Try: --exclude {','.join(outliers)}")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ colored objects - essential for robot navigation and object recognition.
 
 Usage:
     python color_space_lesson.py <image_path>
+    python color_space_lesson.py --source <spec>
 
 Example:
     python color_space_lesson.py datasets/raw/IMG_0096.jpg
@@ -28,17 +29,17 @@ Author: Michael Baker
 Date: 2025-11-17
 """
 
+import argparse
 import cv2
 import numpy as np
 import sys
 
+from frame_sources import ImageSequenceSource, add_source_arguments, open_source
+from render_cache import RenderCache
+
 class ColorSpaceLesson:
-    def __init__(self, image_path):
-        # Load image
-        self.original = cv2.imread(image_path)
-        if self.original is None:
-            print(f"Error: Could not load image from {image_path}")
-            sys.exit(1)
+    def __init__(self, image):
+        self.original = image
         
         # Convert to HSV
         self.hsv = cv2.cvtColor(self.original, cv2.COLOR_BGR2HSV)
@@ -63,6 +64,7 @@ class ColorSpaceLesson:
         }
         
         self.current_mode = '1'
+        self.renderer = RenderCache(lambda mode: getattr(self, f'render_mode_{mode}')())
     
     def create_color_mask(self, color_name):
         """Create a binary mask for a specific color."""
@@ -87,9 +89,9 @@ class ColorSpaceLesson:
         
         return mask
     
-    def apply_mask(self, mask):
-        """Apply mask to original image."""
-        return cv2.bitwise_and(self.original, self.original, mask=mask)
+    def apply_mask(self, mask, dst=None):
+        """Apply mask to original image (into dst, which must start out black)."""
+        return cv2.bitwise_and(self.original, self.original, dst=dst, mask=mask)
     
     def get_color_contours(self, mask):
         """Find contours in a color mask."""
@@ -101,7 +103,7 @@ class ColorSpaceLesson:
     
     def render_mode_1(self):
         """Original RGB image."""
-        display = self.original.copy()
+        display = self.renderer.canvas(self.original, '1')
         cv2.putText(display, "1: Original (RGB Color Space)", 
                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         cv2.putText(display, "Red-Green-Blue: How cameras capture color",
@@ -111,7 +113,8 @@ class ColorSpaceLesson:
     def render_mode_2(self):
         """HSV color space visualization."""
         # Convert HSV back to BGR for display
-        display = cv2.cvtColor(self.hsv, cv2.COLOR_HSV2BGR)
+        display = cv2.cvtColor(self.hsv, cv2.COLOR_HSV2BGR,
+                               dst=self.renderer.buffer(self.original, '2'))
         cv2.putText(display, "2: HSV Color Space", 
                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         cv2.putText(display, "Hue-Saturation-Value: Better for color filtering",
@@ -157,7 +160,7 @@ class ColorSpaceLesson:
     def render_mode_4(self):
         """Red object mask."""
         mask = self.create_color_mask('red')
-        result = self.apply_mask(mask)
+        result = self.apply_mask(mask, self.renderer.blank(self.original, '4'))
         
         cv2.putText(result, "4: Red Object Detection", 
                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
@@ -175,7 +178,7 @@ class ColorSpaceLesson:
     def render_mode_5(self):
         """Yellow object mask."""
         mask = self.create_color_mask('yellow')
-        result = self.apply_mask(mask)
+        result = self.apply_mask(mask, self.renderer.blank(self.original, '5'))
         
         cv2.putText(result, "5: Yellow Object Detection", 
                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
@@ -193,7 +196,7 @@ class ColorSpaceLesson:
     def render_mode_6(self):
         """Black object mask."""
         mask = self.create_color_mask('black')
-        result = self.apply_mask(mask)
+        result = self.apply_mask(mask, self.renderer.blank(self.original, '6'))
         
         cv2.putText(result, "6: Black/Dark Object Detection", 
                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
@@ -215,7 +218,7 @@ class ColorSpaceLesson:
         black_mask = self.create_color_mask('black')
         
         # Combine masks with different colors
-        display = self.original.copy()
+        display = self.renderer.canvas(self.original, '7')
         
         # Red objects in red
         red_overlay = np.zeros_like(display)
@@ -230,9 +233,9 @@ class ColorSpaceLesson:
         black_overlay[black_mask > 0] = [0, 255, 0]
         
         # Blend overlays
-        display = cv2.addWeighted(display, 0.6, red_overlay, 0.4, 0)
-        display = cv2.addWeighted(display, 1.0, yellow_overlay, 0.4, 0)
-        display = cv2.addWeighted(display, 1.0, black_overlay, 0.4, 0)
+        display = cv2.addWeighted(display, 0.6, red_overlay, 0.4, 0, dst=display)
+        display = cv2.addWeighted(display, 1.0, yellow_overlay, 0.4, 0, dst=display)
+        display = cv2.addWeighted(display, 1.0, black_overlay, 0.4, 0, dst=display)
         
         cv2.putText(display, "7: All Color Detections", 
                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
@@ -243,7 +246,7 @@ class ColorSpaceLesson:
     
     def render_mode_8(self):
         """Color filtered contours."""
-        display = self.original.copy()
+        display = self.renderer.canvas(self.original, '8')
         
         # Get contours for each color
         red_contours = self.get_color_contours(self.create_color_mask('red'))
@@ -311,29 +314,11 @@ class ColorSpaceLesson:
         print()
         
         while True:
-            # Render current mode
-            if self.current_mode == '1':
-                display = self.render_mode_1()
-            elif self.current_mode == '2':
-                display = self.render_mode_2()
-            elif self.current_mode == '3':
-                display = self.render_mode_3()
-            elif self.current_mode == '4':
-                display = self.render_mode_4()
-            elif self.current_mode == '5':
-                display = self.render_mode_5()
-            elif self.current_mode == '6':
-                display = self.render_mode_6()
-            elif self.current_mode == '7':
-                display = self.render_mode_7()
-            elif self.current_mode == '8':
-                display = self.render_mode_8()
-            
-            # Show display
-            cv2.imshow("Color Space Lesson", display)
+            # Render current mode (only redrawn when the mode changes)
+            self.renderer.show("Color Space Lesson", self.current_mode)
             
             # Handle keyboard
-            key = cv2.waitKey(1) & 0xFF
+            key = self.renderer.wait_key()
             
             if key == 27 or key == ord('q'):
                 break
@@ -358,14 +343,30 @@ class ColorSpaceLesson:
         print("="*70 + "\n")
 
 def main():
-    if len(sys.argv) != 2:
-        print("Usage: python color_space_lesson.py <image_path>")
-        print("\nExample:")
-        print("  python color_space_lesson.py datasets/raw/IMG_0096.jpg")
+    parser = argparse.ArgumentParser(
+        description="Color space transformation lesson",
+        epilog="Example: python color_space_lesson.py datasets/raw/IMG_0096.jpg")
+    parser.add_argument('image_path', nargs='?')
+    add_source_arguments(parser, default=None)
+    args = parser.parse_args()
+    if not args.image_path and not args.source:
+        parser.error("Give <image_path> or --source <spec>")
+    
+    # Load image (first frame of the source; left view for stereo sources)
+    try:
+        if args.image_path:
+            source = ImageSequenceSource([args.image_path])
+        else:
+            source = open_source(args.source, speed=args.speed)
+        ok, frame, _ = source.read()
+    except (IOError, ValueError):
+        ok = False
+    if not ok:
+        print(f"Error: Could not load image from {args.image_path or args.source}")
         sys.exit(1)
+    source.release()
     
-    image_path = sys.argv[1]
-    lesson = ColorSpaceLesson(image_path)
+    lesson = ColorSpaceLesson(frame[0] if source.stereo else frame)
     lesson.run()
 
 if __name__ == "__main__":
@@ -7,6 +7,7 @@ out contours at floor level, keeping only objects that protrude above the floor.
 
 Usage:
     python stereo_contour_detection_lesson.py <left_image> <right_image> <baseline_cm>
+    python stereo_contour_detection_lesson.py --source <spec> <baseline_cm>
 
 Example:
     python stereo_contour_detection_lesson.py IMG_0096.jpg IMG_0097.jpg 15.24
@@ -24,10 +25,18 @@ Author: Michael Baker
 Date: 2025-11-17
 """
 
+import argparse
 import cv2
 import numpy as np
 import sys
 
+from contour_stats import contour_means
+from frame_sources import add_stereo_arguments, stereo_source_from_args
+from ground_plane import GroundPlaneEstimator
+from render_cache import RenderCache
+
+_floor_estimator = None     # Shared floor line, so later frames only verify it
+
 def compute_disparity(left_img, right_img):
     """
     Compute disparity map using stereo block matching.
@@ -50,32 +59,29 @@ def compute_disparity(left_img, right_img):
     
     return disparity, disparity_visual
 
-def detect_floor_plane(disparity):
+def detect_floor_plane(disparity, estimator=None):
     """
-    Identify the floor plane by finding the dominant disparity value
-    in the bottom portion of the image.
+    Fit the floor as a line in the v-disparity image (disparity vs. row).
+    A tilted camera sees the floor closer at the bottom of the image, so
+    the floor disparity is different for every row.
     
-    Returns the average disparity value of the floor.
+    Without an estimator, one module-wide estimator is reused across calls,
+    so every frame after the first starts from the previous floor line.
+    Returns the expected floor disparity of each row, or None.
     """
-    # Focus on bottom 40% of image (where floor should be)
-    height = disparity.shape[0]
-    floor_region = disparity[int(height * 0.6):, :]
-    
-    # Get valid disparities (non-zero, non-negative)
-    valid_disparities = floor_region[floor_region > 0]
-    
-    if len(valid_disparities) == 0:
-        return None
-    
-    # Floor is the most common disparity value (mode)
-    floor_disparity = np.median(valid_disparities)
+    global _floor_estimator
+    if estimator is None:
+        if _floor_estimator is None:
+            _floor_estimator = GroundPlaneEstimator(num_disparities=64, scale=16)
+        estimator = _floor_estimator
     
-    return floor_disparity
+    return estimator.expected_disparity(disparity)
 
 def filter_floor_contours(contours, disparity, floor_disparity, height_threshold=5):
     """
     Filter out contours that are at floor level.
-    Keep only contours where average disparity is significantly different from floor.
+    Keep only contours where average disparity is significantly above the
+    floor disparity of the rows they cover.
     
     height_threshold: how much disparity difference counts as "above floor"
     Higher threshold = only very tall objects
@@ -84,57 +90,46 @@ def filter_floor_contours(contours, disparity, floor_disparity, height_threshold
     if floor_disparity is None:
         return contours  # Can't filter without floor reference
     
-    obstacle_contours = []
+    # Disparity above the floor, row by row
+    height_above_floor = disparity - floor_disparity[:, None]
     
-    for cnt in contours:
-        # Create mask for this contour
-        mask = np.zeros(disparity.shape, dtype=np.uint8)
-        cv2.drawContours(mask, [cnt], -1, 255, -1)
-        
-        # Get disparity values within this contour
-        contour_disparities = disparity[mask == 255]
-        valid_vals = contour_disparities[contour_disparities > 0]
-        
-        if len(valid_vals) == 0:
-            continue
-        
-        # Average disparity of this contour
-        avg_disparity = np.mean(valid_vals)
-        
-        # If disparity is higher than floor (closer to camera = obstacle)
-        if avg_disparity > floor_disparity + height_threshold:
-            obstacle_contours.append(cnt)
+    # Per-contour mean of valid disparity (one label image for contours that don't overlap)
+    counts, avg_heights = contour_means(contours, height_above_floor, valid=disparity > 0)
+    
+    # Keep contours whose disparity is higher than floor (closer to camera = obstacle)
+    keep = (counts > 0) & (avg_heights > height_threshold)
+    obstacle_contours = [cnt for cnt, k in zip(contours, keep) if k]
     
     return obstacle_contours
 
 def main():
     # Parse command line arguments
-    if len(sys.argv) != 4:
-        print("Usage: python stereo_contour_detection_lesson.py <left_image> <right_image> <baseline_cm>")
-        print("\nExample:")
-        print("  python stereo_contour_detection_lesson.py IMG_0096.jpg IMG_0097.jpg 15.24")
-        print("\nbaseline_cm: Distance between the two camera positions in centimeters")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Stereo contour detection with floor plane filtering",
+        epilog="Example: python stereo_contour_detection_lesson.py IMG_0096.jpg IMG_0097.jpg 15.24  "
+               "(baseline_cm: distance between the two camera positions in centimeters)")
+    add_stereo_arguments(parser)
+    args = parser.parse_args()
     
-    left_path = sys.argv[1]
-    right_path = sys.argv[2]
-    baseline_cm = float(sys.argv[3])
+    try:
+        source, baseline_cm = stereo_source_from_args(args)
+        ok, pair, _ = source.read()
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    source.release()
     
     print("="*70)
     print("STEREO CONTOUR DETECTION - FLOOR PLANE FILTERING")
     print("="*70)
-    print(f"Left image:  {left_path}")
-    print(f"Right image: {right_path}")
+    print(f"Source:      {args.source or ' + '.join(args.inputs[:2])}")
     print(f"Baseline:    {baseline_cm} cm")
     print()
     
-    # Load images
-    left_img = cv2.imread(left_path)
-    right_img = cv2.imread(right_path)
-    
-    if left_img is None or right_img is None:
+    if not ok:
         print("Error: Could not load one or both images")
         sys.exit(1)
+    left_img, right_img = pair
     
     print(f"Image size: {left_img.shape[1]}x{left_img.shape[0]} pixels")
     print("\nProcessing stereo pair...")
@@ -145,8 +140,9 @@ def main():
     
     # Detect floor plane
     floor_disparity = detect_floor_plane(disparity)
-    if floor_disparity:
-        print(f"✓ Floor plane detected (disparity: {floor_disparity:.1f})")
+    if floor_disparity is not None:
+        print(f"✓ Floor plane detected (disparity: {floor_disparity[-1]:.1f} at bottom row, "
+              f"{floor_disparity[left_img.shape[0] // 2]:.1f} at middle row)")
     else:
         print("⚠ Warning: Could not detect floor plane")
     
@@ -180,61 +176,60 @@ def main():
     print("  ESC or Q: Exit")
     print("="*70)
     
-    current_mode = '1'
-    
-    while True:
-        if current_mode == '1':
+    def render(mode):
+        if mode == '1':
             # Original left image
-            display = left_img.copy()
+            display = renderer.canvas(left_img, '1')
             cv2.putText(display, "1: Left Camera - Original Image", 
                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
-        elif current_mode == '2':
+        elif mode == '2':
             # Disparity map (depth visualization)
-            display = cv2.applyColorMap(disparity_visual, cv2.COLORMAP_JET)
+            display = cv2.applyColorMap(disparity_visual, cv2.COLORMAP_JET,
+                                        dst=renderer.buffer(left_img, '2'))
             cv2.putText(display, "2: Disparity Map (Red=Close, Blue=Far)", 
                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-            if floor_disparity:
-                cv2.putText(display, f"Floor disparity: {floor_disparity:.1f}", 
+            if floor_disparity is not None:
+                cv2.putText(display, f"Floor disparity: {floor_disparity[-1]:.1f} (bottom row)", 
                            (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 1)
         
-        elif current_mode == '3':
+        elif mode == '3':
             # All contours (area filtered only)
-            display = left_img.copy()
+            display = renderer.canvas(left_img, '3')
             cv2.drawContours(display, area_filtered, -1, (0, 255, 0), 2)
             cv2.putText(display, f"3: All Contours - {len(area_filtered)} found (includes floor texture)", 
                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
-        elif current_mode == '4':
+        elif mode == '4':
             # Obstacle contours only (floor filtered)
-            display = left_img.copy()
+            display = renderer.canvas(left_img, '4')
             cv2.drawContours(display, obstacle_contours, -1, (0, 255, 0), 2)
             cv2.putText(display, f"4: Obstacles Only - {len(obstacle_contours)} objects (floor removed)", 
                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
             cv2.putText(display, "Floor texture contours removed using depth", 
                        (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 1)
         
-        elif current_mode == '5':
+        elif mode == '5':
             # Height map overlay
-            display = left_img.copy()
+            display = renderer.canvas(left_img, '5')
             
             # Create height mask (anything above floor)
-            if floor_disparity:
-                height_mask = (disparity > floor_disparity + 5).astype(np.uint8) * 255
+            if floor_disparity is not None:
+                height_mask = (disparity > floor_disparity[:, None] + 5).astype(np.uint8) * 255
                 
                 # Color code by height
                 height_overlay = cv2.applyColorMap(height_mask, cv2.COLORMAP_HOT)
                 
                 # Blend with original
-                display = cv2.addWeighted(display, 0.6, height_overlay, 0.4, 0)
+                cv2.addWeighted(display, 0.6, height_overlay, 0.4, 0, dst=display)
             
             cv2.drawContours(display, obstacle_contours, -1, (0, 255, 0), 2)
             cv2.putText(display, "5: Height Map - Colored by distance above floor", 
                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
-        elif current_mode == '6':
+        elif mode == '6':
             # Bounding boxes
-            display = left_img.copy()
+            display = renderer.canvas(left_img, '6')
             
             for cnt in obstacle_contours:
                 x, y, w, h = cv2.boundingRect(cnt)
@@ -247,11 +242,17 @@ def main():
             cv2.putText(display, f"6: Bounding Boxes - {len(obstacle_contours)} obstacles", 
                        (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
         
-        # Show display
-        cv2.imshow("Stereo Contour Detection", display)
+        return display
+    
+    # Each view is drawn once into its own canvas; the loop only redraws on a mode change
+    renderer = RenderCache(render)
+    current_mode = '1'
+    
+    while True:
+        renderer.show("Stereo Contour Detection", current_mode)
         
         # Handle keyboard
-        key = cv2.waitKey(1) & 0xFF
+        key = renderer.wait_key()
         
         if key == 27 or key == ord('q'):
             break
@@ -265,7 +266,7 @@ def main():
     print("KEY TAKEAWAYS:")
     print("="*70)
     print("1. Stereo vision provides DEPTH - which pixel is closer/farther")
-    print("2. Floor plane detection identifies the dominant flat surface")
+    print("2. Floor plane detection fits the floor as a line in v-disparity")
     print("3. Objects ABOVE the floor have different depth than floor")
     print("4. Height-based filtering removes carpet texture contours")
     print("5. This is how robots distinguish 'floor' from 'obstacle'")
@@ -0,0 +1,118 @@
+"""
+Adaptive Depth Strategy Planner
+Decide per frame whether stage 4 should match each obstacle on its own or
+match one band covering all of them and slice the result.
+
+Per-ROI matching is cheapest when obstacles are few, small and far apart.
+When boxes overlap or cover much of the frame, separate calls redo the same
+pixels: every ROI band also carries numDisparities extra columns on its
+left. The planner estimates both costs in matched pixels x disparities
+(plus a fixed per-call overhead) and picks the cheaper one:
+
+    per_roi     one ROIStereoEngine.compute per obstacle
+    union       one band around the bounding box of all obstacles, sliced per ROI
+    full_frame  a union band that is (nearly) the whole image
+
+Usage:
+    planner = DepthPlanner(engine)
+    plan = planner.plan([obs['bbox'] for obs in obstacles], gray.shape, 64, 7)
+    if plan['strategy'] == 'per_roi': ...
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import numpy as np
+
+
+def union_area(rects):
+    """Exact area covered by (x0, y0, x1, y1) rectangles, by coordinate compression."""
+    if not rects:
+        return 0
+    xs = np.unique([r[0] for r in rects] + [r[2] for r in rects])
+    ys = np.unique([r[1] for r in rects] + [r[3] for r in rects])
+    covered = np.zeros((len(ys) - 1, len(xs) - 1), dtype=bool)
+    for x0, y0, x1, y1 in rects:
+        i0, i1 = np.searchsorted(ys, [y0, y1])
+        j0, j1 = np.searchsorted(xs, [x0, x1])
+        covered[i0:i1, j0:j1] = True
+    cell_area = np.outer(np.diff(ys), np.diff(xs))
+    return int(cell_area[covered].sum())
+
+
+def bounding_region(bboxes):
+    """Smallest (x, y, w, h) containing every box."""
+    x0 = min(b[0] for b in bboxes)
+    y0 = min(b[1] for b in bboxes)
+    x1 = max(b[0] + b[2] for b in bboxes)
+    y1 = max(b[1] + b[3] for b in bboxes)
+    return (x0, y0, x1 - x0, y1 - y0)
+
+
+class DepthPlanner:
+    STRATEGIES = ('auto', 'per_roi', 'union', 'full_frame')
+
+    def __init__(self, roi_stereo, call_overhead_px=20000, full_frame_fraction=0.9):
+        self.roi_stereo = roi_stereo
+        self.call_overhead_px = call_overhead_px        # Fixed cost of one SGBM call, in pixels
+        self.full_frame_fraction = full_frame_fraction  # Union band this big = whole frame
+
+    def plan(self, bboxes, image_shape, num_disparities, block_size, strategy='auto'):
+        """Cost estimate for both strategies and the one to use for these boxes."""
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f"Unknown depth strategy '{strategy}', expected one of {self.STRATEGIES}")
+
+        height, width = image_shape[:2]
+        frame_area = height * width
+        plan = {
+            'strategy': 'per_roi',
+            'num_rois': len(bboxes),
+            'roi_area': sum(w * h for _, _, w, h in bboxes),
+            'band_area': 0,
+            'covered_area': 0,
+            'overlap_ratio': 0.0,
+            'bands': [],
+            'union_region': None,
+            'union_band': None,
+            'union_band_area': 0,
+            'est_cost_per_roi': 0,
+            'est_cost_union': 0,
+            'elapsed_ms': None,
+        }
+        if not bboxes:
+            return plan
+
+        bands = [self.roi_stereo.band(b, image_shape, num_disparities, block_size)
+                 for b in bboxes]
+        band_area = sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in bands)
+        covered_area = union_area(bands)
+
+        region = bounding_region(bboxes)
+        union_band = self.roi_stereo.band(region, image_shape, num_disparities, block_size)
+        ux0, uy0, ux1, uy1 = union_band
+        union_band_area = (ux1 - ux0) * (uy1 - uy0)
+
+        cost_per_roi = (band_area + self.call_overhead_px * len(bboxes)) * num_disparities
+        cost_union = (union_band_area + self.call_overhead_px) * num_disparities
+
+        if strategy == 'auto':
+            strategy = 'union' if cost_union < cost_per_roi else 'per_roi'
+        if strategy == 'union' and union_band_area >= self.full_frame_fraction * frame_area:
+            strategy = 'full_frame'
+        if strategy == 'full_frame':
+            region = (0, 0, width, height)
+            union_band = (0, 0, width, height)
+
+        plan.update({
+            'strategy': strategy,
+            'band_area': band_area,
+            'covered_area': covered_area,
+            'overlap_ratio': band_area / covered_area if covered_area else 0.0,
+            'bands': bands,
+            'union_region': region,
+            'union_band': union_band,
+            'union_band_area': union_band_area,
+            'est_cost_per_roi': cost_per_roi,
+            'est_cost_union': cost_union,
+        })
+        return plan
@@ -0,0 +1,444 @@
+"""
+Detection Arrays
+Stage 1 detections and stage 2 obstacles as structured NumPy arrays.
+
+With hundreds of blobs (a busy rug, speckled lighting) stages 1 and 2 spent
+their time building and walking Python dicts: a bounding rect and a contour
+area call per contour, a dict per detection, should_merge per candidate
+pair, min/max over tuples per group. Here every detection is one record:
+
+    DETECTION_DTYPE   bbox (x, y, w, h), center (x, y), area, color id
+    OBSTACLE_DTYPE    bbox, center, colors (bit per color id), color (id of
+                      the first detection, for drawing), num_components,
+                      num_contours, contour_area (stage 3), has_depth,
+                      depth_cm, avg_disparity (stage 4, NaN = none),
+                      track_id (-1 = none), velocity, confidence (tracker)
+
+and every contour lives in one packed (N, 1, 2) point buffer, contour i
+being points[offsets[i]:offsets[i + 1]]. Areas and rects come from that
+buffer in bulk (shoelace sums and min/max with reduceat), and stage 2
+merges with array operations only (connected_groups, ObstacleArrays.from_groups).
+
+Stages 3 and 4 and the tracker fill in obstacle columns in bulk; what has
+no fixed size (contours, edge and disparity crops, skip reasons) sits in
+lists alongside the records, one entry per obstacle.
+
+DetectionArrays still looks like the list of dicts the lessons and tests
+use: indexing or iterating builds a detection's dict on first access and
+keeps it, so a frame nobody debugs never builds one. ObstacleArrays.to_dicts
+gives the obstacle dicts, for debug output and printing only.
+
+Usage:
+    detections = DetectionArrays(color_ranges)
+    detections.add('yellow', contours)              # Raw findContours output
+    detections.finish()                             # Areas, rects, min_area filter
+    boxes = detections.records['bbox']              # (n, 4) int32
+    det = detections[0]                             # {'bbox': ..., 'contour': ...}
+
+    obstacles = result.obstacles                    # ObstacleArrays
+    nearest = np.nanmin(obstacles.records['depth_cm'])
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import numpy as np
+
+DETECTION_DTYPE = np.dtype([
+    ('bbox', np.int32, 4),
+    ('center', np.int32, 2),
+    ('area', np.float64),
+    ('color', np.int16),
+])
+
+OBSTACLE_DTYPE = np.dtype([
+    ('bbox', np.int32, 4),
+    ('center', np.int32, 2),
+    ('colors', np.uint32),
+    ('color', np.int16),
+    ('num_components', np.int32),
+    ('num_contours', np.int32),
+    ('contour_area', np.float64),
+    ('has_depth', bool),
+    ('depth_cm', np.float64),
+    ('avg_disparity', np.float64),
+    ('track_id', np.int32),
+    ('velocity', np.float64, 2),
+    ('confidence', np.float64),
+])
+
+# Per-obstacle entries without a fixed size, kept in lists next to the records
+PAYLOADS = ('contours', 'edges', 'disparities', 'skip_reasons')
+
+# Record fields stages 3 and 4 fill in
+STAGE3_FIELDS = ('num_contours', 'contour_area')
+STAGE4_FIELDS = ('has_depth', 'depth_cm', 'avg_disparity')
+
+MAX_ASPECT = 4.0    # check_aspect colors drop detections wider than this
+
+
+def contour_stats(points, offsets):
+    """
+    (x0, y0, x1, y1, area) arrays for packed contours, the same values as
+    cv2.boundingRect (x1, y1 exclusive) and cv2.contourArea per contour.
+    """
+    starts = offsets[:-1]
+    x = points[:, 0, 0].astype(np.int64)
+    y = points[:, 0, 1].astype(np.int64)
+    x0 = np.minimum.reduceat(x, starts)
+    y0 = np.minimum.reduceat(y, starts)
+    x1 = np.maximum.reduceat(x, starts) + 1
+    y1 = np.maximum.reduceat(y, starts) + 1
+
+    # Shoelace: each point with the next one in its own contour (wrapping round)
+    following = np.arange(1, len(x) + 1)
+    following[offsets[1:] - 1] = starts
+    cross = x * y[following] - x[following] * y
+    area = np.abs(np.add.reduceat(cross, starts)) / 2.0
+    return x0, y0, x1, y1, area
+
+
+def connected_groups(n, i, j):
+    """
+    Component label per node of the graph with edges (i[k], j[k]), by
+    repeatedly hooking each edge's larger label onto the smaller one and
+    compressing label chains - array passes only, no per-edge Python.
+    """
+    labels = np.arange(n)
+    while True:
+        li, lj = labels[i], labels[j]
+        low = np.minimum(li, lj)
+        hooked = labels.copy()
+        np.minimum.at(hooked, li, low)
+        np.minimum.at(hooked, lj, low)
+        while True:
+            jumped = hooked[hooked]
+            if np.array_equal(jumped, hooked):
+                break
+            hooked = jumped
+        if np.array_equal(hooked, labels):
+            return labels
+        labels = hooked
+
+
+class DetectionArrays:
+    """Stage 1 detections: records, packed contours and lazily built dicts."""
+
+    def __init__(self, color_ranges):
+        self.color_ranges = color_ranges
+        self.color_keys = list(color_ranges)
+        self.records = np.zeros(0, DETECTION_DTYPE)
+        self.points = np.zeros((0, 1, 2), np.int32)
+        self.offsets = np.zeros(1, np.int64)
+        self.pending = []             # (color id, contours) until finish()
+        self.dicts = {}
+
+    @classmethod
+    def from_dicts(cls, detections, color_ranges):
+        """Records for existing detection dicts, which indexing then returns as they are."""
+        arrays = cls(color_ranges)
+        records = np.zeros(len(detections), DETECTION_DTYPE)
+        for i, det in enumerate(detections):
+            records[i] = (det['bbox'], det['center'], det['area'],
+                          arrays.color_keys.index(det['color']))
+        arrays.records = records
+        arrays.offsets = np.zeros(len(detections) + 1, np.int64)
+        arrays.dicts = dict(enumerate(detections))
+        return arrays
+
+    def add(self, color_name, contours):
+        """Queue one color's contours (in image coordinates) for finish()."""
+        if len(contours):
+            self.pending.append((self.color_keys.index(color_name), contours))
+
+    def finish(self):
+        """
+        Pack everything added, compute rects and areas in bulk, and keep the
+        contours above their color's min_area (and within MAX_ASPECT for
+        check_aspect colors), in the order they were added.
+        """
+        if not self.pending:
+            return self
+        colors = np.concatenate([np.full(len(contours), color, np.int16)
+                                 for color, contours in self.pending])
+        contours = [c for _, batch in self.pending for c in batch]
+        self.pending = []
+        lengths = np.fromiter((len(c) for c in contours), np.int64, len(contours))
+        offsets = np.concatenate(([0], np.cumsum(lengths)))
+        points = np.concatenate(contours).astype(np.int32, copy=False)
+        x0, y0, x1, y1, area = contour_stats(points, offsets)
+        w, h = x1 - x0, y1 - y0
+
+        infos = [self.color_ranges[key] for key in self.color_keys]
+        min_area = np.array([info.get('min_area', 500) for info in infos], np.float64)
+        check_aspect = np.array([info.get('check_aspect', False) for info in infos], bool)
+        keep = area > min_area[colors]
+        keep &= ~(check_aspect[colors] & (w / h > MAX_ASPECT))
+
+        kept = np.flatnonzero(keep)
+        records = np.zeros(len(kept), DETECTION_DTYPE)
+        records['bbox'] = np.stack([x0, y0, w, h], axis=1)[kept]
+        records['center'] = np.stack([x0 + w // 2, y0 + h // 2], axis=1)[kept]
+        records['area'] = area[kept]
+        records['color'] = colors[kept]
+        if len(kept) == len(contours):
+            self.points, self.offsets = points, offsets
+        else:
+            self.points = np.concatenate([contours[k] for k in kept]).astype(np.int32, copy=False) \
+                if len(kept) else np.zeros((0, 1, 2), np.int32)
+            self.offsets = np.concatenate(([0], np.cumsum(lengths[kept])))
+        self.records = records
+        self.dicts = {}
+        return self
+
+    def contour(self, i):
+        return self.points[self.offsets[i]:self.offsets[i + 1]]
+
+    def __len__(self):
+        return len(self.records)
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        det = self.dicts.get(i)
+        if det is None:
+            if not 0 <= i < len(self):
+                raise IndexError(i)
+            record = self.records[i]
+            key = self.color_keys[record['color']]
+            info = self.color_ranges[key]
+            det = {
+                'color': key,
+                'color_name': info['name'],
+                'color_bgr': info['color_bgr'],
+                'bbox': tuple(record['bbox'].tolist()),
+                'contour': self.contour(i),
+                'center': tuple(record['center'].tolist()),
+                'area': float(record['area']),
+            }
+            self.dicts[i] = det
+        return det
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    __hash__ = None
+
+    def to_dicts(self):
+        return list(self)
+
+
+class DetectionView:
+    """Some of a DetectionArrays' detections, as a read-only sequence of dicts."""
+
+    def __init__(self, detections, indices):
+        self.detections = detections
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, i):
+        return self.detections[int(self.indices[i])]
+
+    def __iter__(self):
+        return (self.detections[int(i)] for i in self.indices)
+
+
+class ObstacleArrays:
+    """
+    Stages 2-4 obstacles: records, each obstacle's detection indices, and the
+    PAYLOADS lists (None until the stage that fills them ran).
+    """
+
+    def __init__(self, records, detections=None, members=None, member_offsets=None):
+        self.records = records
+        self.detections = detections
+        self.members = members
+        self.member_offsets = member_offsets
+        self.contours = None          # Stage 3: contours in image coordinates
+        self.edges = None             # Stage 3: edge map of the box
+        self.disparities = None       # Stage 4: disparity of the box, None without depth
+        self.skip_reasons = None      # Stage 4: why there is no depth, None with depth
+
+    @staticmethod
+    def empty_records(n):
+        records = np.zeros(n, OBSTACLE_DTYPE)
+        records['depth_cm'] = np.nan
+        records['avg_disparity'] = np.nan
+        records['track_id'] = -1
+        return records
+
+    @classmethod
+    def from_groups(cls, detections, labels):
+        """
+        One obstacle per label, ordered by first member, each covering its
+        detections' boxes (unpadded) with one bit per color they have.
+        """
+        n = len(labels)
+        if not n:
+            return cls(cls.empty_records(0), detections, np.zeros(0, np.int64),
+                       np.zeros(1, np.int64))
+        index = np.arange(n)
+        first = np.full(n, n)
+        np.minimum.at(first, labels, index)
+        key = first[labels]
+        order = np.lexsort((index, key))
+        starts = np.flatnonzero(np.concatenate(([True], np.diff(key[order]) != 0)))
+
+        boxes = detections.records['bbox'][order].astype(np.int64)
+        x0 = np.minimum.reduceat(boxes[:, 0], starts)
+        y0 = np.minimum.reduceat(boxes[:, 1], starts)
+        x1 = np.maximum.reduceat(boxes[:, 0] + boxes[:, 2], starts)
+        y1 = np.maximum.reduceat(boxes[:, 1] + boxes[:, 3], starts)
+        colors = detections.records['color'][order]
+        bits = np.left_shift(1, colors.astype(np.uint32))
+
+        records = cls.empty_records(len(starts))
+        records['bbox'] = np.stack([x0, y0, x1 - x0, y1 - y0], axis=1)
+        records['colors'] = np.bitwise_or.reduceat(bits, starts)
+        records['color'] = colors[starts]
+        records['num_components'] = np.diff(np.concatenate((starts, [n])))
+        offsets = np.concatenate((starts, [n]))
+        return cls(records, detections, order, offsets)
+
+    @classmethod
+    def from_obstacles(cls, obstacles):
+        """Records for obstacle dicts (bbox, center, depth, track id), for bulk queries."""
+        records = cls.empty_records(len(obstacles))
+        for i, obs in enumerate(obstacles):
+            depth = obs.get('depth_cm')
+            records[i]['bbox'] = obs['bbox']
+            records[i]['center'] = obs['center']
+            records[i]['num_components'] = obs.get('num_components', 1)
+            records[i]['has_depth'] = bool(obs.get('has_depth', depth is not None))
+            records[i]['depth_cm'] = np.nan if depth is None else depth
+            records[i]['track_id'] = obs.get('track_id', -1)
+        return cls(records)
+
+    @classmethod
+    def stack(cls, parts):
+        """Several ObstacleArrays' records and payloads back to back (no detections)."""
+        stacked = cls(np.concatenate([part.records for part in parts]))
+        for name in PAYLOADS:
+            if all(getattr(part, name) is not None for part in parts):
+                setattr(stacked, name, [value for part in parts for value in getattr(part, name)])
+        return stacked
+
+    def take(self, indices):
+        """The obstacles at indices, in that order, with their payloads."""
+        indices = np.asarray(indices, dtype=np.int64)
+        taken = ObstacleArrays(self.records[indices], self.detections)
+        if self.members is not None:
+            members = [self.members_of(k) for k in indices.tolist()]
+            taken.members = np.concatenate(members) if members else self.members[:0]
+            taken.member_offsets = np.concatenate(
+                ([0], np.cumsum([len(m) for m in members]))).astype(np.int64)
+        for name in PAYLOADS:
+            values = getattr(self, name)
+            if values is not None:
+                setattr(taken, name, [values[k] for k in indices.tolist()])
+        return taken
+
+    def select(self, keep):
+        """The obstacles where keep is True."""
+        kept = np.flatnonzero(keep)
+        if len(kept) == len(self.records):
+            return self
+        return self.take(kept)
+
+    def copy(self):
+        """Own records and payload lists, so a stage can fill them in without touching self."""
+        copied = ObstacleArrays(self.records.copy(), self.detections, self.members,
+                                self.member_offsets)
+        for name in PAYLOADS:
+            values = getattr(self, name)
+            if values is not None:
+                setattr(copied, name, list(values))
+        return copied
+
+    def assign(self, indices, other, fields=None):
+        """
+        Write other's obstacles (one per index) over the obstacles at indices:
+        the record fields named (all of them by default) and every payload.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        for name in fields or OBSTACLE_DTYPE.names:
+            self.records[name][indices] = other.records[name]
+        for name in PAYLOADS:
+            values = getattr(other, name)
+            if values is None:
+                continue
+            if getattr(self, name) is None:
+                setattr(self, name, [None] * len(self))
+            target = getattr(self, name)
+            for k, value in zip(indices.tolist(), values):
+                target[k] = value
+
+    def members_of(self, i):
+        return self.members[self.member_offsets[i]:self.member_offsets[i + 1]]
+
+    def color_keys(self, i):
+        """color_ranges keys of the colors obstacle i has."""
+        bits = int(self.records['colors'][i])
+        return [key for c, key in enumerate(self.detections.color_keys) if bits >> c & 1]
+
+    def color_bgrs(self):
+        """Drawing color per obstacle: its first detection's color_bgr."""
+        ranges, keys = self.detections.color_ranges, self.detections.color_keys
+        return [ranges[keys[c]]['color_bgr'] for c in self.records['color'].tolist()]
+
+    def color_labels(self):
+        """'DARK+YELLOW'-style label per obstacle, from its colors' names."""
+        names = [self.detections.color_ranges[key]['name'] for key in self.detections.color_keys]
+        labels = {}
+        for bits in np.unique(self.records['colors']).tolist():
+            labels[bits] = '+'.join(sorted({names[c] for c in range(len(names)) if bits >> c & 1}))
+        return [labels[bits] for bits in self.records['colors'].tolist()]
+
+    def __len__(self):
+        return len(self.records)
+
+    def to_dicts(self):
+        """
+        Obstacle dicts with every field filled in so far, for debug output and
+        printing. Stages and renderers read the records and payloads instead.
+        """
+        records = self.records
+        labels = self.color_labels() if self.detections is not None else [None] * len(self)
+        obstacles = []
+        for i, (bbox, center, num_components) in enumerate(zip(
+                records['bbox'].tolist(), records['center'].tolist(),
+                records['num_components'].tolist())):
+            obs = {
+                'bbox': tuple(bbox),
+                'center': tuple(center),
+                'num_components': num_components,
+            }
+            if self.detections is not None:
+                obs['colors'] = labels[i].split('+')
+                obs['color_label'] = labels[i]
+                obs['detections'] = DetectionView(self.detections, self.members_of(i))
+            if self.contours is not None:
+                obs['edges_roi'] = self.edges[i]
+                obs['contours'] = self.contours[i]
+                obs['num_contours'] = int(records['num_contours'][i])
+                obs['contour_area'] = float(records['contour_area'][i])
+            if self.skip_reasons is not None:
+                depth = float(records['depth_cm'][i])
+                obs['has_depth'] = bool(records['has_depth'][i])
+                obs['depth_cm'] = None if np.isnan(depth) else depth
+                if obs['has_depth']:
+                    obs['avg_disparity'] = float(records['avg_disparity'][i])
+                    obs['disparity_roi'] = self.disparities[i]
+                else:
+                    obs['skip_reason'] = self.skip_reasons[i]
+            if records['track_id'][i] >= 0:
+                obs['track_id'] = int(records['track_id'][i])
+                obs['velocity'] = tuple(records['velocity'][i].tolist())
+                obs['confidence'] = float(records['confidence'][i])
+            obstacles.append(obs)
+        return obstacles
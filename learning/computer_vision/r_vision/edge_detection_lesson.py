@@ -11,19 +11,30 @@ Controls:
     'q' - Quit
 
 This demonstrates the image processing pipeline your robot will use to see obstacles.
+
+Usage:
+    python edge_detection_lesson.py [--source camera:1 | images:datasets/raw | synthetic]
 """
 
+import argparse
+
 import cv2
 import numpy as np
 
-# Camera index (1 for external USB camera, 0 for built-in)
-CAMERA_INDEX = 1
+from frame_capture import LatestFrameCapture
+from frame_sources import add_source_arguments, open_source
+from stage_graph import StageGraph
+
+# Default source (camera 1 for external USB camera, 0 for built-in)
+DEFAULT_SOURCE = 'camera:1'
 
 # Edge detection parameters
 CANNY_THRESHOLD1 = 50
 CANNY_THRESHOLD2 = 150
 BLUR_KERNEL_SIZE = 5
 
+STEPS = ['original', 'grayscale', 'blurred', 'edges']
+
 def add_label(image, text, position=(10, 30)):
     """Add text label to image for display"""
     # Make a copy so we don't modify original
@@ -68,6 +79,29 @@ def process_frame(frame):
     
     return steps
 
+def edge_graph(params=None):
+    """
+    The same steps as a StageGraph fed with set_input('frame', frame).
+    A view asks only for the step it shows, so the original never waits
+    for Canny, and new thresholds in params rerun only the edge step.
+    """
+    if params is None:
+        params = {'blur_kernel_size': BLUR_KERNEL_SIZE,
+                  'canny_threshold1': CANNY_THRESHOLD1,
+                  'canny_threshold2': CANNY_THRESHOLD2}
+    graph = StageGraph(params)
+    graph.add_input('frame')
+    graph.add('original', lambda frame: frame, ['frame'])
+    graph.add('grayscale', lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), ['frame'])
+    graph.add('blurred',
+              lambda gray: cv2.GaussianBlur(gray, (params['blur_kernel_size'],) * 2, 0),
+              ['grayscale'], ['blur_kernel_size'])
+    graph.add('edges',
+              lambda blurred: cv2.Canny(blurred, params['canny_threshold1'],
+                                        params['canny_threshold2']),
+              ['blurred'], ['canny_threshold1', 'canny_threshold2'])
+    return graph
+
 def create_comparison_view(steps):
     """Create a 2x2 grid showing all processing steps"""
     
@@ -95,18 +129,21 @@ def create_comparison_view(steps):
     return comparison
 
 def main():
-    # Initialize camera
-    print(f"Opening camera {CAMERA_INDEX}...")
-    cap = cv2.VideoCapture(CAMERA_INDEX)
-    
-    if not cap.isOpened():
-        print(f"Error: Cannot open camera {CAMERA_INDEX}")
-        print("Try changing CAMERA_INDEX to 0 or checking camera connection")
+    parser = argparse.ArgumentParser(description="Interactive edge detection lesson")
+    add_source_arguments(parser, default=DEFAULT_SOURCE)
+    args = parser.parse_args()
+    
+    # Initialize camera (or any other frame source)
+    print(f"Opening {args.source}...")
+    try:
+        source = open_source(args.source, speed=args.speed)
+    except (IOError, ValueError) as e:
+        print(f"Error: {e}")
+        print("Try --source camera:0 or check the camera connection")
         return
     
-    # Set camera properties for better quality
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+    # Read on a background thread so processing always gets the freshest frame
+    capture = LatestFrameCapture(source).start()
     
     print("\n" + "="*70)
     print("EDGE DETECTION LESSON - Interactive Demo")
@@ -124,44 +161,45 @@ def main():
     
     # Current view mode
     current_mode = '1'
+    graph = edge_graph()
     
     while True:
-        # Capture frame
-        ret, frame = cap.read()
+        # Capture frame (newest one, older ones are dropped)
+        ret, frame, timestamp = capture.read()
         if not ret:
             print("Error: Failed to capture frame")
             break
         
-        # Process frame through all steps
-        steps = process_frame(frame)
+        # Only the steps the current view shows get computed
+        graph.set_input('frame', frame)
         
         # Display based on current mode
         if current_mode == '1':
-            display = add_label(steps['original'], 
+            display = add_label(graph.get('original'), 
                               "1: Original - Raw Camera Feed")
             info = "This is what your robot's camera sees - lots of info!"
             
         elif current_mode == '2':
-            display = add_label(steps['grayscale'], 
+            display = add_label(graph.get('grayscale'), 
                               "2: Grayscale - Color Removed")
             info = "Only brightness matters for edges. 3 channels -> 1 channel."
             
         elif current_mode == '3':
-            display = add_label(steps['blurred'], 
+            display = add_label(graph.get('blurred'), 
                               "3: Blurred - Noise Smoothed")
             info = "Each pixel averaged with neighbors. Removes camera noise."
             
         elif current_mode == '4':
-            display = add_label(steps['edges'], 
+            display = add_label(graph.get('edges'), 
                               "4: Edges - Canny Algorithm")
             info = "White pixels = rapid brightness change = object boundary!"
             
         elif current_mode == '5':
-            display = create_comparison_view(steps)
+            display = create_comparison_view({step: graph.get(step) for step in STEPS})
             info = "All steps together - see the transformation!"
         
         else:
-            display = add_label(steps['original'], "Press 1-5 to see steps")
+            display = add_label(graph.get('original'), "Press 1-5 to see steps")
             info = "Press a number key..."
         
         # Add instruction text at bottom
@@ -182,7 +220,9 @@ def main():
             print(f"\nSwitched to view: {current_mode}")
     
     # Cleanup
-    cap.release()
+    stats = capture.stats()
+    capture.release()
+    print(f"Frames: {stats['delivered']} processed, {stats['dropped']} dropped")
     cv2.destroyAllWindows()
     
     print("\n" + "="*70)
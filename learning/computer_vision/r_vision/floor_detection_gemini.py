@@ -1,26 +1,28 @@
 """
 Stage 1 Validator: Dense Depth on Carpet
 Tests if Stereo Vision can reliably detect the floor plane in a low-texture environment.
+
+Usage:
+    python floor_detection_gemini.py <left> <right>
+    python floor_detection_gemini.py --source <spec>
 """
 
+import argparse
 import cv2
 import numpy as np
 import sys
 
-def test_dense_depth(left_path, right_path):
-    # Load images
-    imgL = cv2.imread(left_path)
-    imgR = cv2.imread(right_path)
-    
-    if imgL is None or imgR is None:
-        print("Error loading images")
-        sys.exit(1)
+from frame_sources import ImageSequenceSource, add_source_arguments, open_source
+
+TARGET_WIDTH = 800
 
-    # Resize for speed/consistency (800px width)
+def test_dense_depth(imgL, imgR):
+    # Resize for speed/consistency (800px width); image files already arrive decoded at it
     height, width = imgL.shape[:2]
-    scale = 800 / width
-    imgL = cv2.resize(imgL, (800, int(height * scale)))
-    imgR = cv2.resize(imgR, (800, int(height * scale)))
+    if width != TARGET_WIDTH:
+        scale = TARGET_WIDTH / width
+        imgL = cv2.resize(imgL, (TARGET_WIDTH, int(height * scale)))
+        imgR = cv2.resize(imgR, (TARGET_WIDTH, int(height * scale)))
     
     # Convert to grayscale
     grayL = cv2.cvtColor(imgL, cv2.COLOR_BGR2GRAY)
@@ -93,7 +95,23 @@ def test_dense_depth(left_path, right_path):
     cv2.destroyAllWindows()
 
 if __name__ == "__main__":
-    if len(sys.argv) != 3:
-        print("Usage: python test_depth_viability.py <left> <right>")
-    else:
-        test_dense_depth(sys.argv[1], sys.argv[2])
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Dense depth viability test on carpet")
+    parser.add_argument('images', nargs='*', metavar='left right')
+    add_source_arguments(parser, default=None)
+    args = parser.parse_args()
+
+    try:
+        if len(args.images) == 2:
+            source = ImageSequenceSource(args.images, stereo=True, width=TARGET_WIDTH)
+        elif args.source:
+            source = open_source(args.source, stereo=True, speed=args.speed, width=TARGET_WIDTH)
+        else:
+            parser.error("Give <left> <right> or --source <spec>")
+        ok, pair, _ = source.read()
+    except (IOError, ValueError):
+        ok = False
+    if not ok:
+        print("Error loading images")
+        sys.exit(1)
+    source.release()
+    test_dense_depth(*pair)
\ No newline at end of file
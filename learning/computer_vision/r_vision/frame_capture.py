@@ -0,0 +1,125 @@
+"""
+Latest-Frame Capture
+Read a camera on a background thread and always hand out the newest frame.
+
+With cap.read() inline in the display loop, every millisecond spent on
+processing and imshow is a millisecond the camera is not being read: the
+driver queues frames, and the loop ends up working on images that are
+several frames old. Here a thread reads continuously into a small ring
+buffer, and the consumer gets the newest frame it has not seen yet, with
+the time it was captured. Frames that were never handed out are counted
+as dropped, so a slow loop shows up as drops instead of as lag.
+
+Sources that are not live (files, recordings, synthetic scenes) have no
+frames to fall behind on, so for them the thread reads one frame ahead of
+the consumer and then waits: nothing is dropped and it does not spin.
+
+Usage:
+    capture = LatestFrameCapture(OpenCVSource(1)).start()
+    ok, frame, timestamp = capture.read()
+    print(capture.stats())
+    capture.stop()
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import collections
+import threading
+import time
+
+from frame_sources import FrameSource
+
+
+class LatestFrameCapture(FrameSource):
+    def __init__(self, source, buffer_size=2, clock=time.monotonic):
+        self.source = source            # Any FrameSource
+        self.stereo = source.stereo
+        self.live = source.live
+        self.clock = clock
+        self.buffer = collections.deque(maxlen=buffer_size)   # (sequence, timestamp, frame, arrival)
+        self.condition = threading.Condition()
+        self.thread = None
+        self.running = False
+        self.ended = False              # Source returned ok=False (unplugged, end of file)
+
+        self.captured = 0
+        self.delivered = 0
+        self.last_sequence = 0          # Sequence number of the last frame handed out
+        self.last_arrival = None        # When the last handed-out frame left the source
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._reader, name='frame-capture', daemon=True)
+        self.thread.start()
+        return self
+
+    def _reader(self):
+        while self.running:
+            if not self.live:
+                # Wait for the consumer to take the last frame before reading the next
+                with self.condition:
+                    self.condition.wait_for(
+                        lambda: not self.running or self.captured <= self.last_sequence)
+                    if not self.running:
+                        return
+            ok, frame, timestamp = self.source.read()
+            arrival = self.clock()
+            with self.condition:
+                if not ok or frame is None:
+                    self.ended = True
+                    self.condition.notify_all()
+                    return
+                self.captured += 1
+                self.buffer.append((self.captured, timestamp, frame, arrival))
+                self.condition.notify_all()
+
+    def read(self, timeout=1.0):
+        """
+        Newest frame not handed out before, waiting up to timeout seconds for one.
+        Returns (ok, frame, timestamp); ok is False on timeout or end of stream.
+        """
+        with self.condition:
+            self.condition.wait_for(
+                lambda: self.ended or (self.buffer and self.buffer[-1][0] > self.last_sequence),
+                timeout=timeout)
+            if not self.buffer or self.buffer[-1][0] <= self.last_sequence:
+                return False, None, None
+            sequence, timestamp, frame, arrival = self.buffer[-1]
+            self.last_sequence = sequence
+            self.last_arrival = arrival
+            self.delivered += 1
+            self.condition.notify_all()
+            return True, frame, timestamp
+
+    def latency(self):
+        """Seconds since the last handed-out frame was read from the source."""
+        if self.last_arrival is None:
+            return None
+        return self.clock() - self.last_arrival
+
+    @property
+    def dropped(self):
+        with self.condition:
+            # Frames still waiting in the buffer are not dropped yet
+            pending = sum(1 for entry in self.buffer if entry[0] > self.last_sequence)
+            return self.captured - self.delivered - pending
+
+    def stats(self):
+        return {
+            'captured': self.captured,
+            'delivered': self.delivered,
+            'dropped': self.dropped,
+        }
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+    def release(self):
+        self.stop()
+        self.source.release()
@@ -0,0 +1,418 @@
+"""
+Frame Sources
+One interface for every place a frame can come from.
+
+Every source has read() -> (ok, frame, timestamp) and release(). For stereo
+sources (source.stereo is True) frame is a (left, right) tuple. Timestamps
+are in seconds: the capture time for cameras and the recorded (or virtual)
+time for files, so a loop never needs to know which kind it is reading.
+
+    OpenCVSource            USB/V4L2 camera through cv2.VideoCapture
+    Picamera2Source         one CSI camera through picamera2 (Pi only)
+    ImageSequenceSource     image files, single or as stereo pairs (e.g. datasets/raw)
+    VideoFileSource         a video file, optionally with a <video>.timestamps sidecar
+    FrameStoreSource        a dataset packed by frame_store.py, read from a memory map
+    SyntheticSource         generated carpet + colored obstacles, mono or stereo
+    ReplaySource            paces a recorded source by its timestamps at any speed
+
+Scripts take a --source spec (see SOURCE_HELP) and open it with open_source():
+    camera:1   camera:/dev/video0   picamera:0   picamera-stereo
+    images:datasets/raw   video:run.avi   video:left.avi,right.avi   synthetic
+    store:datasets/packed/raw
+
+Usage:
+    source = open_source('images:datasets/raw', stereo=True)
+    source = ReplaySource(VideoFileSource('run.avi'), speed=4.0)   # 4x real time
+    for frame, timestamp in source:
+        ...
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import os
+import time
+
+import cv2
+import numpy as np
+
+from frame_store import FrameStore, is_store
+from image_loader import default_loader
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+SOURCE_HELP = ("camera:<index|device>, picamera:<num>, picamera-stereo, images:<dir>, "
+               "video:<file>[,<right file>], store:<dir>, synthetic")
+
+
+class FrameSource:
+    """Base class: read() -> (ok, frame, timestamp)."""
+
+    stereo = False      # Frames are (left, right) tuples
+    live = False        # Frames keep coming in real time whether read or not
+    endless = False     # read() never runs out of frames (always true when live)
+
+    def read(self):
+        raise NotImplementedError
+
+    def release(self):
+        pass
+
+    def __iter__(self):
+        while True:
+            ok, frame, timestamp = self.read()
+            if not ok:
+                return
+            yield frame, timestamp
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class OpenCVSource(FrameSource):
+    """USB/V4L2 camera. device is an index or a /dev/video* path."""
+
+    live = True
+
+    def __init__(self, device=1, width=640, height=480, fps=30):
+        if isinstance(device, str) and device.startswith('/dev/'):
+            self.capture = cv2.VideoCapture(device, cv2.CAP_V4L2)
+        else:
+            self.capture = cv2.VideoCapture(int(device))
+        if not self.capture.isOpened():
+            raise IOError(f"Cannot open camera {device}")
+
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        self.capture.set(cv2.CAP_PROP_FPS, fps)
+        self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)   # Keep the driver's own queue short
+
+    def read(self):
+        ok, frame = self.capture.read()
+        if not ok or frame is None:
+            return False, None, None
+        return True, frame, time.monotonic()
+
+    def release(self):
+        self.capture.release()
+
+
+class Picamera2Source(FrameSource):
+    """One CSI camera through picamera2, timestamped by the sensor."""
+
+    live = True
+
+    def __init__(self, camera_num=0, size=(1280, 720), fps=30):
+        from picamera2 import Picamera2  # Only installed on the Pi
+
+        self.camera = Picamera2(camera_num)
+        config = self.camera.create_video_configuration(
+            main={'size': size, 'format': 'RGB888'},   # BGR byte order, as OpenCV expects
+            controls={'FrameRate': fps})
+        self.camera.configure(config)
+        self.camera.start()
+
+    def read(self):
+        request = self.camera.capture_request()
+        try:
+            frame = request.make_array('main')
+            timestamp = request.get_metadata()['SensorTimestamp'] / 1e9
+        finally:
+            request.release()
+        return True, frame, timestamp
+
+    def release(self):
+        self.camera.stop()
+        self.camera.close()
+
+
+def list_images(directory):
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))
+            if name.lower().endswith(IMAGE_EXTENSIONS)]
+
+
+class ImageSequenceSource(FrameSource):
+    """
+    Image files in order, one frame per file or, with stereo=True, one
+    (left, right) frame per two files. Timestamps are index / fps.
+    Images come from an ImageLoader (the shared cache by default), decoded
+    at width pixels across if given, and are read-only.
+    """
+
+    def __init__(self, paths, stereo=False, fps=1.0, loop=False, width=None, loader=None):
+        self.stereo = stereo
+        self.width = width
+        self.loader = loader or default_loader
+        step = 2 if stereo else 1
+        self.items = [tuple(paths[i:i + step]) for i in range(0, len(paths) - step + 1, step)]
+        if not self.items:
+            raise IOError("No images to read")
+        self.fps = fps
+        self.loop = loop
+        self.endless = loop
+        self.index = 0
+
+    @classmethod
+    def from_directory(cls, directory, stereo=False, **kwargs):
+        """
+        Every image in directory. Stereo pairs come from left/ and right/
+        subfolders matched by file name, or else from consecutive files
+        (IMG_0096 + IMG_0097).
+        """
+        left_dir, right_dir = os.path.join(directory, 'left'), os.path.join(directory, 'right')
+        if stereo and os.path.isdir(left_dir) and os.path.isdir(right_dir):
+            right_names = set(os.listdir(right_dir))
+            paths = []
+            for left_path in list_images(left_dir):
+                name = os.path.basename(left_path)
+                if name in right_names:
+                    paths += [left_path, os.path.join(right_dir, name)]
+            return cls(paths, stereo=True, **kwargs)
+        return cls(list_images(directory), stereo=stereo, **kwargs)
+
+    def read(self):
+        if self.index >= len(self.items):
+            if not self.loop:
+                return False, None, None
+        item = self.items[self.index % len(self.items)]
+        images = [self.loader.load(path, self.width) for path in item]
+        if any(img is None for img in images):
+            raise IOError(f"Could not load {', '.join(item)}")
+
+        timestamp = self.index / self.fps
+        self.index += 1
+        return True, (tuple(images) if self.stereo else images[0]), timestamp
+
+
+class VideoFileSource(FrameSource):
+    """
+    A recorded camera: frames from a video file, timestamps from a sidecar
+    text file (one value in seconds per line, default <video>.timestamps).
+    Without a sidecar the container's frame times are used.
+    """
+
+    def __init__(self, path, timestamps_path=None):
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise IOError(f"Could not open video {path}")
+
+        if timestamps_path is None and os.path.exists(path + '.timestamps'):
+            timestamps_path = path + '.timestamps'
+        self.timestamps = None
+        if timestamps_path is not None:
+            with open(timestamps_path) as f:
+                self.timestamps = [float(line) for line in f if line.strip()]
+        self.index = 0
+
+    def read(self):
+        ok, frame = self.capture.read()
+        if not ok:
+            return False, None, None
+
+        if self.timestamps is not None:
+            if self.index >= len(self.timestamps):
+                return False, None, None
+            timestamp = self.timestamps[self.index]
+        else:
+            timestamp = self.capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+        self.index += 1
+        return True, frame, timestamp
+
+    def release(self):
+        self.capture.release()
+
+
+class FrameStoreSource(FrameSource):
+    """
+    Frames of a packed FrameStore in order, with their recorded timestamps.
+    Frames are read-only views into the store's memory map.
+    """
+
+    def __init__(self, path):
+        self.store = FrameStore(path)
+        if not len(self.store):
+            raise IOError(f"Frame store {path} is empty")
+        self.stereo = self.store.stereo
+        self.index = 0
+
+    def read(self):
+        if self.index >= len(self.store):
+            return False, None, None
+        i = self.index
+        self.index += 1
+        return True, self.store[i], self.store.timestamp(i)
+
+    def release(self):
+        self.store.close()
+
+
+class SyntheticSource(FrameSource):
+    """
+    Carpet-like gray texture with red, yellow and dark textured blocks that
+    drift across the frame. In stereo, everything is shifted by its own
+    disparity (left(u) = right(u - d)), so the lessons find real depth.
+    Timestamps are virtual (index / fps); frames are generated as fast as asked.
+    """
+
+    OBSTACLES = [
+        # hue, saturation range, value range, disparity, then start x, start y, w, h
+        # and x speed for a 640x480 frame
+        (0, (180, 255), (140, 255), 40, 60, 220, 120, 90, 3),      # Red
+        (26, (180, 255), (150, 255), 28, 300, 160, 90, 140, -2),   # Yellow
+        (0, (0, 60), (0, 30), 34, 460, 260, 110, 110, 1),          # Dark
+    ]
+
+    def __init__(self, size=(640, 480), num_frames=None, fps=30.0, stereo=False,
+                 floor_disparity=16, seed=0):
+        self.width, self.height = size
+        self.num_frames = num_frames
+        self.endless = num_frames is None
+        self.fps = fps
+        self.stereo = stereo
+        self.floor_disparity = floor_disparity
+        self.index = 0
+
+        sx, sy = self.width / 640.0, self.height / 480.0
+        self.obstacles = [(disp, int(x0 * sx), int(y0 * sy), int(w * sx), int(h * sy), vx)
+                          for _, _, _, disp, x0, y0, w, h, vx in self.OBSTACLES]
+
+        rng = np.random.default_rng(seed)
+        pad = max(o[3] for o in self.OBSTACLES) + floor_disparity
+        noise = rng.integers(90, 170, (self.height, self.width + pad), dtype=np.uint8)
+        carpet = cv2.GaussianBlur(noise, (3, 3), 0)
+        self.carpet = cv2.cvtColor(carpet, cv2.COLOR_GRAY2BGR)
+
+        self.textures = []
+        for (hue, sat, val, *_), (_, _, _, w, h, _) in zip(self.OBSTACLES, self.obstacles):
+            hsv = np.empty((h, w, 3), np.uint8)
+            hsv[..., 0] = hue
+            hsv[..., 1] = rng.integers(sat[0], sat[1] + 1, (h, w))
+            hsv[..., 2] = rng.integers(val[0], val[1] + 1, (h, w))
+            self.textures.append(cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR))
+
+    def render(self, shift_scale):
+        """One view; shift_scale 0 = left camera, 1 = right camera."""
+        d = int(self.floor_disparity * shift_scale)
+        frame = self.carpet[:, d:d + self.width].copy()
+        margin = max(o[3] for o in self.OBSTACLES)   # Room for the right view's shift
+        for texture, (disp, x0, y0, w, h, vx) in zip(self.textures, self.obstacles):
+            x = margin + (x0 + vx * self.index) % (self.width - w - margin) - int(disp * shift_scale)
+            frame[y0:y0 + h, x:x + w] = texture
+        return frame
+
+    def read(self):
+        if self.num_frames is not None and self.index >= self.num_frames:
+            return False, None, None
+        left = self.render(0)
+        frame = (left, self.render(1)) if self.stereo else left
+        timestamp = self.index / self.fps
+        self.index += 1
+        return True, frame, timestamp
+
+
+class ReplaySource(FrameSource):
+    """
+    Hand out a recorded source's frames on its own timeline, scaled by speed:
+    1.0 = as recorded, 4.0 = four times faster, 0 or None = no waiting at all.
+    """
+
+    def __init__(self, source, speed=1.0, clock=time.monotonic, sleep=time.sleep):
+        self.source = source
+        self.stereo = source.stereo
+        self.endless = source.endless
+        self.speed = speed
+        self.clock = clock
+        self.sleep = sleep
+        self.start = None       # (wall clock, source timestamp) of the first frame
+
+    def read(self):
+        ok, frame, timestamp = self.source.read()
+        if not ok or not self.speed:
+            return ok, frame, timestamp
+
+        if self.start is None:
+            self.start = (self.clock(), timestamp)
+        due = self.start[0] + (timestamp - self.start[1]) / self.speed
+        delay = due - self.clock()
+        if delay > 0:
+            self.sleep(delay)
+        return ok, frame, timestamp
+
+    def release(self):
+        self.source.release()
+
+
+def open_source(spec, stereo=False, speed=None, width=None):
+    """
+    Build a source from a --source spec. A bare number is a camera, and a
+    bare path is an image directory or a video file. speed replays recorded
+    sources on their timeline (None = as fast as they can be read). width
+    decodes image files straight to that width; other sources ignore it.
+    """
+    kind, _, arg = spec.partition(':')
+    if not arg:
+        if kind.isdigit() or kind.startswith('/dev/'):
+            kind, arg = 'camera', kind
+        elif is_store(kind):
+            kind, arg = 'store', kind
+        elif os.path.isdir(kind):
+            kind, arg = 'images', kind
+        elif os.path.isfile(kind):
+            kind, arg = 'video', kind
+
+    if kind == 'camera':
+        return OpenCVSource(arg or 1)
+    if kind == 'picamera':
+        return Picamera2Source(int(arg or 0))
+    if kind == 'picamera-stereo':
+        from stereo_capture import StereoPairCapture
+        return StereoPairCapture(Picamera2Source(0), Picamera2Source(1)).start()
+
+    if kind == 'images':
+        source = ImageSequenceSource.from_directory(arg, stereo=stereo, width=width)
+    elif kind == 'video' and ',' in arg:
+        from stereo_capture import StereoPairCapture
+        left_path, right_path = arg.split(',', 1)
+        # Both files replay on their recorded timeline so the pairing sees them side by side
+        return StereoPairCapture(ReplaySource(VideoFileSource(left_path), speed or 1.0),
+                                 ReplaySource(VideoFileSource(right_path), speed or 1.0)).start()
+    elif kind == 'video':
+        source = VideoFileSource(arg)
+    elif kind == 'store':
+        source = FrameStoreSource(arg)
+    elif kind == 'synthetic':
+        source = SyntheticSource(stereo=stereo)
+    else:
+        raise ValueError(f"Unknown source '{spec}', expected one of: {SOURCE_HELP}")
+
+    if stereo and not source.stereo:
+        raise ValueError(f"Source '{spec}' does not give stereo pairs")
+    return ReplaySource(source, speed) if speed else source
+
+
+def add_source_arguments(parser, default):
+    parser.add_argument('--source', default=default, help=SOURCE_HELP)
+    parser.add_argument('--speed', type=float, default=None,
+                        help="Replay speed for recorded sources (1 = real time, default = as fast as possible)")
+
+
+def add_stereo_arguments(parser):
+    """Stereo lessons take 'left right baseline_cm', or 'baseline_cm' with --source."""
+    parser.add_argument('inputs', nargs='+', metavar='[left right] baseline_cm')
+    add_source_arguments(parser, default=None)
+
+
+def stereo_source_from_args(args, width=None):
+    """(source, baseline_cm) from add_stereo_arguments() arguments; width as for open_source."""
+    if len(args.inputs) == 3 and args.source is None:
+        left_path, right_path, baseline = args.inputs
+        return (ImageSequenceSource([left_path, right_path], stereo=True, width=width),
+                float(baseline))
+    if len(args.inputs) == 1 and args.source is not None:
+        return (open_source(args.source, stereo=True, speed=args.speed, width=width),
+                float(args.inputs[0]))
+    raise ValueError("Give either <left_image> <right_image> <baseline_cm> "
+                     "or --source <spec> <baseline_cm>")
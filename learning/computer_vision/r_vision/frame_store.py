@@ -0,0 +1,162 @@
+"""
+Frame Store
+Pack a dataset once, then read its frames straight out of a memory map.
+
+Benchmarks and sweeps go over datasets/raw again and again. Even with the
+ImageLoader cache every new process decodes every JPEG first. pack()
+decodes a source once into a store directory:
+
+    frames.bin    every image's raw BGR pixels back to back (64-byte aligned)
+    index.json    per frame: pair id, timestamp, and per view its offset,
+                  shape and source file
+
+FrameStore maps frames.bin read-only and hands out NumPy views into the
+mapping, so reading a frame copies nothing and costs no decode. Processes
+that open the same store share the pages through the OS page cache.
+Images keep their own sizes, so a store can mix cameras and resolutions.
+open_source() reads a store as 'store:<dir>' (or a bare store directory).
+
+Usage:
+    python frame_store.py pack datasets/raw datasets/packed/raw [--stereo] [--width 800]
+    python frame_store.py info datasets/packed/raw
+
+    store = FrameStore('datasets/packed/raw')
+    left, right = store[0]
+    source = open_source('store:datasets/packed/raw', stereo=True)
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+
+DATA_FILE = 'frames.bin'
+INDEX_FILE = 'index.json'
+ALIGN = 64          # Every image starts on a cache line
+FORMAT_VERSION = 1
+
+
+def is_store(path):
+    return os.path.isfile(os.path.join(path, INDEX_FILE))
+
+
+def pack(source, out_dir, files=None, max_frames=0):
+    """
+    Write every frame of source into a store at out_dir and return its index.
+    files(i) may name the source files of frame i (a tuple, one per view).
+    Live and endless sources need max_frames, or packing would never stop.
+    """
+    if not max_frames and (source.live or source.endless):
+        raise ValueError("Source never runs out of frames; give a frame limit")
+    os.makedirs(out_dir, exist_ok=True)
+    data_path = os.path.join(out_dir, DATA_FILE)
+    frames = []
+    offset = 0
+    with open(data_path + '.tmp', 'wb') as f:
+        for i, (frame, timestamp) in enumerate(source):
+            if max_frames and i >= max_frames:
+                break
+            views = frame if source.stereo else (frame,)
+            names = files(i) if files else (None,) * len(views)
+            entry = {'pair': i, 'timestamp': timestamp, 'views': []}
+            for image, name in zip(views, names):
+                image = np.ascontiguousarray(image)
+                f.write(image.data)
+                entry['views'].append({'offset': offset, 'shape': list(image.shape),
+                                       'dtype': image.dtype.str, 'file': name})
+                offset += image.nbytes
+                pad = -offset % ALIGN
+                f.write(b'\0' * pad)
+                offset += pad
+            frames.append(entry)
+
+    index = {'version': FORMAT_VERSION, 'stereo': source.stereo, 'bytes': offset,
+             'frames': frames}
+    os.replace(data_path + '.tmp', data_path)
+    with open(os.path.join(out_dir, INDEX_FILE), 'w') as f:
+        json.dump(index, f, indent=1)
+    return index
+
+
+class FrameStore:
+    """A packed store: store[i] is an image, or a (left, right) tuple for stereo stores."""
+
+    def __init__(self, path):
+        with open(os.path.join(path, INDEX_FILE)) as f:
+            self.index = json.load(f)
+        if self.index.get('version') != FORMAT_VERSION:
+            raise IOError(f"Unsupported frame store version in {path}")
+        self.path = path
+        self.stereo = self.index['stereo']
+        self.frames = self.index['frames']
+        self.data = None
+        if self.index['bytes']:
+            self.data = np.memmap(os.path.join(path, DATA_FILE), dtype=np.uint8, mode='r',
+                                  shape=(self.index['bytes'],))
+
+    def __len__(self):
+        return len(self.frames)
+
+    def view(self, view):
+        """Zero-copy, read-only array for one view entry of the index."""
+        return np.ndarray(view['shape'], dtype=np.dtype(view['dtype']),
+                          buffer=self.data, offset=view['offset'])
+
+    def __getitem__(self, i):
+        images = tuple(self.view(view) for view in self.frames[i]['views'])
+        return images if self.stereo else images[0]
+
+    def timestamp(self, i):
+        return self.frames[i]['timestamp']
+
+    def close(self):
+        # Views handed out keep the mapping alive; it is unmapped when the last one goes
+        self.data = None
+
+
+def summary(store):
+    shapes = sorted({tuple(v['shape']) for frame in store.frames for v in frame['views']})
+    return (f"{store.path}: {len(store)} {'stereo pairs' if store.stereo else 'frames'}, "
+            f"{store.index['bytes'] / 2**20:.1f} MB, shapes {shapes}")
+
+
+def main():
+    from frame_sources import ImageSequenceSource, SOURCE_HELP, open_source
+
+    parser = argparse.ArgumentParser(description="Pack a dataset into a memory-mapped frame store")
+    commands = parser.add_subparsers(dest='command', required=True)
+    pack_parser = commands.add_parser('pack', help="Decode a source into a store")
+    pack_parser.add_argument('source', help=SOURCE_HELP)
+    pack_parser.add_argument('out_dir')
+    pack_parser.add_argument('--stereo', action='store_true', help="Store (left, right) pairs")
+    pack_parser.add_argument('--width', type=int, default=None,
+                             help="Decode image files to this width")
+    pack_parser.add_argument('--frames', type=int, default=0, help="Max frames (0 = all)")
+    info_parser = commands.add_parser('info', help="Describe a store")
+    info_parser.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        print(summary(FrameStore(args.path)))
+        return
+
+    source = open_source(args.source, stereo=args.stereo, width=args.width)
+    if not args.frames and (source.live or source.endless):
+        source.release()
+        parser.error(f"{args.source} never runs out of frames; pass --frames")
+    files = None
+    if isinstance(source, ImageSequenceSource):
+        files = lambda i: tuple(os.path.basename(path) for path in source.items[i])
+    try:
+        pack(source, args.out_dir, files=files, max_frames=args.frames)
+    finally:
+        source.release()
+    print(f"✓ {summary(FrameStore(args.out_dir))}")
+
+
+if __name__ == "__main__":
+    main()
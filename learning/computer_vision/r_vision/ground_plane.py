@@ -0,0 +1,139 @@
+"""
+Ground Plane Estimator (v-disparity + RANSAC)
+Expected floor disparity for every image row, reused from frame to frame.
+
+A camera looking down at a flat floor does not see one floor disparity: the
+floor gets closer towards the bottom of the image, and in rectified images
+its disparity grows linearly with the row, d(v) = slope * v + intercept.
+A single median therefore calls far floor an obstacle and near floor a hole.
+
+The v-disparity image is a histogram of disparities per row; the floor is
+the strongest slanted line in it. Each row contributes its strongest
+disparity bins as weighted points, and many two-point line hypotheses are
+scored at once with numpy broadcasting (vectorized RANSAC), followed by a
+weighted least-squares refit on the inliers.
+
+The floor hardly moves between frames, so the previous line is tried first:
+if it still explains most of the points it is only refined (one small
+least-squares fit), and the full RANSAC search runs only when it does not.
+
+Usage:
+    estimator = GroundPlaneEstimator(num_disparities=64, scale=16)
+    floor_rows = estimator.expected_disparity(disparity)   # (H,) or None
+    above_floor = disparity > floor_rows[:, None] + threshold
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import numpy as np
+
+
+class GroundPlaneEstimator:
+    def __init__(self, num_disparities=64, scale=16, inlier_tolerance=1.5,
+                 iterations=200, peaks_per_row=2, min_row_pixels=20,
+                 min_slope=0.0, verify_fraction=0.8, seed=0):
+        self.num_disparities = num_disparities  # Histogram bins, in pixels of disparity
+        self.scale = scale                      # Input units per pixel (16 for raw SGBM/BM)
+        self.inlier_tolerance = inlier_tolerance
+        self.iterations = iterations
+        self.peaks_per_row = peaks_per_row
+        self.min_row_pixels = min_row_pixels    # Ignore histogram bins with fewer pixels
+        self.min_slope = min_slope              # Floor disparity must grow downward
+        self.verify_fraction = verify_fraction  # Keep last line if it explains this share of its old score
+        self.rng = np.random.default_rng(seed)
+
+        self.model = None                       # {'slope', 'intercept', 'inlier_fraction', 'verified'}
+        self.stats = {'frames': 0, 'refits': 0, 'verified': 0, 'failed': 0}
+
+    def reset(self):
+        self.model = None
+
+    def v_disparity(self, disparity):
+        """Histogram of whole-pixel disparities per row, shape (H, num_disparities)."""
+        height = disparity.shape[0]
+        bins = disparity // self.scale
+        valid = (bins > 0) & (bins < self.num_disparities)
+        rows = np.broadcast_to(np.arange(height)[:, None], disparity.shape)
+        flat = rows[valid] * self.num_disparities + bins[valid]
+        hist = np.bincount(flat, minlength=height * self.num_disparities)
+        return hist.reshape(height, self.num_disparities)
+
+    def row_peaks(self, hist):
+        """The strongest bins of every row as weighted (v, d) points."""
+        k = min(self.peaks_per_row, hist.shape[1])
+        top = np.argpartition(hist, -k, axis=1)[:, -k:]
+        v = np.repeat(np.arange(hist.shape[0]), k)
+        d = top.ravel()
+        w = hist[v, d]
+        keep = w >= self.min_row_pixels
+        return v[keep].astype(np.float64), d[keep].astype(np.float64), w[keep].astype(np.float64)
+
+    def fit_inliers(self, v, d, w, slope, intercept):
+        """Weighted least-squares line through the points within tolerance of a line."""
+        inliers = np.abs(slope * v + intercept - d) < self.inlier_tolerance
+        if np.count_nonzero(inliers) < 2 or np.ptp(v[inliers]) == 0:
+            return None
+        slope, intercept = np.polyfit(v[inliers], d[inliers], 1, w=np.sqrt(w[inliers]))
+        return slope, intercept, w[inliers].sum() / w.sum()
+
+    def ransac(self, v, d, w):
+        """Score every two-point line hypothesis at once and refit the best one."""
+        pairs = self.rng.choice(len(v), size=(self.iterations, 2), p=w / w.sum())
+        v1, v2 = v[pairs[:, 0]], v[pairs[:, 1]]
+        d1, d2 = d[pairs[:, 0]], d[pairs[:, 1]]
+        distinct = v1 != v2
+        if not distinct.any():
+            return None
+        v1, v2, d1, d2 = v1[distinct], v2[distinct], d1[distinct], d2[distinct]
+
+        slopes = (d2 - d1) / (v2 - v1)
+        intercepts = d1 - slopes * v1
+        residuals = np.abs(slopes[:, None] * v[None, :] + intercepts[:, None] - d[None, :])
+        scores = (residuals < self.inlier_tolerance) @ w
+        scores[slopes <= self.min_slope] = -1
+        best = np.argmax(scores)
+        if scores[best] <= 0:
+            return None
+        return self.fit_inliers(v, d, w, slopes[best], intercepts[best])
+
+    def estimate(self, disparity):
+        """Update the floor line from one disparity map. Returns the model or None."""
+        self.stats['frames'] += 1
+        v, d, w = self.row_peaks(self.v_disparity(disparity))
+        if len(v) < 2:
+            self.stats['failed'] += 1
+            self.model = None
+            return None
+
+        fit = None
+        verified = False
+        if self.model is not None:
+            fit = self.fit_inliers(v, d, w, self.model['slope'], self.model['intercept'])
+            if fit is not None and fit[2] >= self.verify_fraction * self.model['inlier_fraction']:
+                verified = True
+            else:
+                fit = None
+        if fit is None:
+            fit = self.ransac(v, d, w)
+            self.stats['refits'] += 1
+        else:
+            self.stats['verified'] += 1
+
+        if fit is None or fit[0] <= self.min_slope:
+            self.stats['failed'] += 1
+            self.model = None
+            return None
+
+        slope, intercept, inlier_fraction = fit
+        self.model = {'slope': float(slope), 'intercept': float(intercept),
+                      'inlier_fraction': float(inlier_fraction), 'verified': verified}
+        return self.model
+
+    def expected_disparity(self, disparity):
+        """Per-row floor disparity in the input's units, or None without a floor line."""
+        if self.estimate(disparity) is None:
+            return None
+        rows = np.arange(disparity.shape[0], dtype=np.float64)
+        floor = (self.model['slope'] * rows + self.model['intercept']) * self.scale
+        return np.maximum(floor, 0.0)
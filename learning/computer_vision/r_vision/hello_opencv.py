@@ -2,32 +2,73 @@
 Hello OpenCV - First computer vision script
 Tests webcam access and displays live video feed
 Press 'q' or ESC to quit
+
+Usage:
+    python hello_opencv.py [--source camera:1]
 """
 
+import argparse
+
 import cv2
 import numpy as np
 
+from frame_capture import LatestFrameCapture
+from frame_sources import add_source_arguments, open_source
+
+def draw_overlay(frame, frame_count, capture):
+    """
+    Draw the greeting and capture stats on frame and return it. Image and
+    frame-store sources hand out read-only frames, so those are copied first.
+    """
+    if not frame.flags.writeable:
+        frame = frame.copy()
+    
+    # Add text overlay
+    cv2.putText(
+        frame, 
+        "Hello OpenCV! Press 'q' or ESC to quit", 
+        (10, 30),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        0.6,
+        (0, 255, 0),  # Green color
+        2
+    )
+    
+    # Add frame counter, dropped frames and capture latency
+    cv2.putText(
+        frame,
+        f"Frame: {frame_count}  Dropped: {capture.dropped}  "
+        f"Latency: {capture.latency() * 1000:.0f}ms",
+        (10, 60),
+        cv2.FONT_HERSHEY_SIMPLEX,
+        0.5,
+        (0, 255, 0),
+        1
+    )
+    return frame
+
 def main():
+    parser = argparse.ArgumentParser(description="Live video feed test")
+    add_source_arguments(parser, default='camera:1')   # External USB camera (index 1)
+    args = parser.parse_args()
+    
     print("🚀 Starting OpenCV test...")
     print("Press 'q' or ESC to quit\n")
     
-    # External USB camera (index 1)
-    cap = cv2.VideoCapture(1)
-    
-    if not cap.isOpened():
-        print("❌ Error: Could not open camera index 1")
+    try:
+        source = open_source(args.source, speed=args.speed)
+    except (IOError, ValueError) as e:
+        print(f"❌ Error: {e}")
         return
     
-    # Set camera properties (optional, for better performance)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-    cap.set(cv2.CAP_PROP_FPS, 30)
+    # Read on a background thread so display time doesn't slow the camera
+    capture = LatestFrameCapture(source).start()
     
     # Test read
-    ret, frame = cap.read()
+    ret, frame, timestamp = capture.read()
     if not ret or frame is None:
         print("❌ Error: Camera opened but can't read frames")
-        cap.release()
+        capture.release()
         return
     
     print("✅ Webcam opened successfully!")
@@ -41,8 +82,8 @@ def main():
     
     try:
         while True:
-            # Capture frame-by-frame
-            ret, frame = cap.read()
+            # Newest frame from the capture thread
+            ret, frame, timestamp = capture.read()
             
             if not ret:
                 print("❌ Error: Can't receive frame (stream end?)")
@@ -50,27 +91,7 @@ def main():
             
             frame_count += 1
             
-            # Add text overlay
-            cv2.putText(
-                frame, 
-                "Hello OpenCV! Press 'q' or ESC to quit", 
-                (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.6,
-                (0, 255, 0),  # Green color
-                2
-            )
-            
-            # Add frame counter
-            cv2.putText(
-                frame,
-                f"Frame: {frame_count}",
-                (10, 60),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                (0, 255, 0),
-                1
-            )
+            frame = draw_overlay(frame, frame_count, capture)
             
             # Display the frame
             cv2.imshow('Hello OpenCV - Robot Vision AI', frame)
@@ -81,7 +102,8 @@ def main():
             
             # Check for quit keys
             if key == ord('q') or key == 27:  # 'q' or ESC
-                print(f"\n👋 Goodbye! Captured {frame_count} frames")
+                print(f"\n👋 Goodbye! Showed {frame_count} frames, "
+                      f"dropped {capture.dropped} stale ones")
                 break
                 
     except KeyboardInterrupt:
@@ -91,7 +113,7 @@ def main():
     finally:
         # Always cleanup
         print("🧹 Cleaning up...")
-        cap.release()
+        capture.release()
         cv2.destroyAllWindows()
         print("✅ Camera released successfully")
 
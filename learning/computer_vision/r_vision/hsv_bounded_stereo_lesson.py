@@ -11,9 +11,24 @@ Architecture:
 
 Usage:
     python hsv_bounded_stereo_lesson.py <left_image> <right_image> <baseline_cm>
+    python hsv_bounded_stereo_lesson.py --source <spec> <baseline_cm>
+        [--debug] [--stats SECONDS] [--metrics run.jsonl]
+        [--serve PORT] [--display-fps 10] [--proposal {pyramid,incremental}]
 
 Example:
     python hsv_bounded_stereo_lesson.py datasets/raw/IMG_0096.jpg datasets/raw/IMG_0097.jpg 15.24
+    python hsv_bounded_stereo_lesson.py --source images:datasets/raw 15.24
+    python hsv_bounded_stereo_lesson.py --source synthetic 15.24 --debug
+    python hsv_bounded_stereo_lesson.py --source picamera-stereo 15.24 --serve 8080
+
+Streaming use (robot loop):
+    pipeline = HSVStereoPipeline(baseline_cm=15.24,
+                                 instrumentation=Instrumentation([SummaryCollector(5.0)]))
+    while True:
+        result = pipeline.process(left_frame, right_frame)
+        nearby = result.obstacles_with_depth.records    # bbox, center, depth_cm, ...
+
+    pipeline.tracker = ObstacleTracker()   # Stages 3-4 only on new or moved obstacles
 
 Controls:
     1: Original with merged obstacle boxes
@@ -23,32 +38,151 @@ Controls:
     5: Stereo disparity within merged regions
     6: Full analysis (contours + depth + labels)
     7: Side-by-side comparison
+    N: Next stereo pair (recorded sources)
     ESC/Q: Exit
 
 Author: Michael Baker
 Date: 2025-11-21
 """
 
+import argparse
 import cv2
 import numpy as np
 import sys
-
-
-class EnhancedHSVBoundedStereo:
-    def __init__(self, left_path, right_path, baseline_cm):
-        # Load stereo pair
-        self.left_img = cv2.imread(left_path)
-        self.right_img = cv2.imread(right_path)
-
-        if self.left_img is None or self.right_img is None:
-            print(f"Error: Could not load images")
-            sys.exit(1)
-
+import time
+
+from change_detector import ChangeDetector, grow_tiles, tile_runs
+from contour_stats import box_means
+from depth_planner import DepthPlanner
+from detection_arrays import (STAGE4_FIELDS, DetectionArrays, ObstacleArrays,
+                              connected_groups)
+from frame_sources import add_stereo_arguments, stereo_source_from_args
+from hsv_classifier import HSVLabelClassifier, ranges_key
+from mjpeg_server import MJPEGServer, add_server_arguments
+from obstacle_tracker import ObstacleTracker
+from render_cache import RenderCache
+from instrumentation import Instrumentation, add_instrumentation_arguments, instrumentation_from_args
+from spatial_index import box_iou, overlapping_pairs
+from roi_stereo import ROIStereoEngine, crop_to_box
+from stage_graph import StageGraph
+from stereo_matchers import StereoMatcherPool
+
+
+class StereoFrameResult:
+    """
+    Everything the pipeline produced for one stereo pair.
+
+    Masks, detections and obstacles are freshly allocated per frame, so a
+    result stays valid after the pipeline moves on to the next pair.
+    """
+
+    def __init__(self, frame_index, left_img, right_img, color_masks,
+                 color_detections, obstacles, process_ms, matcher_stats=None,
+                 depth_plan=None):
+        self.frame_index = frame_index
+        self.left_img = left_img
+        self.right_img = right_img
+        self.color_masks = color_masks
+        self.color_detections = color_detections
+        self.obstacles = obstacles        # ObstacleArrays after stages 3-4
+        self.process_ms = process_ms
+        self.matcher_stats = matcher_stats
+        self.depth_plan = depth_plan      # Stage 4 strategy, its estimated cost and time
+        self._merged_obstacles = None
+
+    @property
+    def merged_obstacles(self):
+        """The obstacles as dicts, for debug output and printing (built on first use)."""
+        if self._merged_obstacles is None:
+            self._merged_obstacles = self.obstacles.to_dicts()
+        return self._merged_obstacles
+
+    @property
+    def obstacles_with_depth(self):
+        return self.obstacles.select(self.obstacles.records['has_depth'])
+
+
+def proposal_agreement(reference, candidate, min_iou=0.5):
+    """
+    How well two stage 1 detection lists agree. Each reference box, largest
+    first, takes the unmatched candidate of the same color with the highest
+    IoU (at least min_iou).
+    Returns {matched, reference, candidate, recall, precision, mean_iou}.
+    """
+    unmatched = list(range(len(candidate)))
+    ious = []
+    for ref in sorted(reference, key=lambda d: -d['area']):
+        best, best_iou = None, min_iou
+        for j in unmatched:
+            if candidate[j]['color'] != ref['color']:
+                continue
+            iou = box_iou(ref['bbox'], candidate[j]['bbox'])
+            if iou >= best_iou:
+                best, best_iou = j, iou
+        if best is not None:
+            unmatched.remove(best)
+            ious.append(best_iou)
+
+    matched = len(ious)
+    return {
+        'matched': matched,
+        'reference': len(reference),
+        'candidate': len(candidate),
+        'recall': matched / len(reference) if reference else 1.0,
+        'precision': matched / len(candidate) if candidate else 1.0,
+        'mean_iou': float(np.mean(ious)) if ious else None,
+    }
+
+
+def merge_obstacle_fields(contours, depths):
+    """Stage 3 and stage 4 copies of the same obstacles, combined into one."""
+    obstacles = contours.copy()
+    obstacles.assign(np.arange(len(depths)), depths, STAGE4_FIELDS)
+    return obstacles
+
+
+class HSVStereoPipeline:
+    """
+    Long-lived HSV-bounded stereo pipeline.
+
+    Build it once, then call process(left, right) for every stereo pair.
+    Color ranges, kernels, stereo matchers and scratch buffers are set up
+    here or on first use and reused across frames.
+
+    With a StereoRectifier the left frame is rectified in full. The right
+    frame is rectified in full (rectify_mode='full') or only inside the
+    bands stage 4 matches (rectify_mode='roi').
+
+    Stages report spans, counters and per-obstacle debug lines through an
+    Instrumentation; the default one records nothing and prints nothing.
+
+    With an ObstacleTracker in self.tracker, process() tracks the stage 2
+    obstacles and runs stages 3-4 only on the new or changed ones.
+
+    stage_graph() runs the same stages lazily, each only when an output
+    needs it and its inputs or STAGE_PARAMS changed.
+    """
+
+    # Attributes each stage reads; changing one reruns that stage and what depends on it
+    STAGE_PARAMS = {
+        'frame': ['rectify_mode', 'proposal_mode'],
+        'stage1': ['color_ranges', 'proposal_mode', 'pyramid_levels', 'pyramid_tile',
+                   'pyramid_area_slack'],
+        'stage2': ['merge_margin_x', 'merge_margin_y', 'merge_max_y_gap', 'roi_padding',
+                   'max_box_width_ratio', 'max_aspect_ratio', 'min_obstacle_area'],
+        'stage3': ['canny_threshold1', 'canny_threshold2'],
+        'stage4': ['block_size', 'num_disparities', 'sgbm_mode', 'sgbm_params',
+                   'min_valid_disparities', 'depth_strategy', 'baseline_cm', 'focal_length'],
+    }
+
+    def __init__(self, baseline_cm, rectifier=None, instrumentation=None):
         self.baseline_cm = baseline_cm
-        self.img_height, self.img_width = self.left_img.shape[:2]
-
-        # Convert to HSV for color filtering
-        self.left_hsv = cv2.cvtColor(self.left_img, cv2.COLOR_BGR2HSV)
+        self.instrumentation = instrumentation or Instrumentation()
+        self.focal_length = 700  # Rough estimate for phone camera
+        self.rectifier = rectifier
+        self.rectify_mode = 'roi'
+        if rectifier is not None:
+            self.focal_length = rectifier.focal_length_px
 
         # Color ranges - TUNED for test scene
         self.color_ranges = {
@@ -89,16 +223,195 @@ class EnhancedHSVBoundedStereo:
         self.canny_threshold2 = 150
         self.roi_padding = 15
 
-        # Process pipeline
+        # Optional post-merge filters (None/0 = disabled)
+        self.max_box_width_ratio = None
+        self.max_aspect_ratio = None
+        self.min_obstacle_area = 0
+        self.min_valid_disparities = 0  # Need more than this many valid pixels for depth
+
+        # Stage 1 proposals: 'full' labels every pixel, 'pyramid' finds candidates
+        # on a 1/2**pyramid_levels image and refines only inside them
+        self.proposal_mode = 'full'
+        self.pyramid_levels = 2
+        self.pyramid_tile = 128       # Full-resolution refinement happens in tiles this size
+        self.pyramid_area_slack = 0.5 # Coarse blobs down to this fraction of min_area are candidates
+        # 'incremental' relabels only the tiles change_detector marks dirty
+        self.change_detector = ChangeDetector()
+        self.incremental = None       # Last frame's masks and detections per color
+
+        # Reused across frames
+        self.morph_kernel = np.ones((5, 5), np.uint8)
+        self.classifier = None        # Compiled from color_ranges on first use
+        self.left_labels = None
+        self.block_size = 7
+        self.num_disparities = 64
+        self.sgbm_mode = cv2.STEREO_SGBM_MODE_SGBM
+        self.sgbm_params = {
+            'disp12MaxDiff': 1,
+            'uniquenessRatio': 10,
+            'speckleWindowSize': 50,
+            'speckleRange': 16,
+        }
+        self.matcher_pool = StereoMatcherPool()
+        self.roi_stereo = ROIStereoEngine(self.matcher_pool)
+        self.depth_planner = DepthPlanner(self.roi_stereo)
+        self.depth_strategy = 'auto'  # 'auto', 'per_roi', 'union' or 'full_frame'
+        self.depth_plan = None
+        self.left_hsv = None          # Scratch buffers, (re)allocated on size change
+        self.left_gray = None
+        self.right_gray = None
+        self.right_raw_gray = None    # Unrectified right gray, source for per-band rectification
+        self.right_bands_pending = False
+        self.rectified_bands = []     # Bands of right_gray rectified so far this frame
+        self.obstacle_arrays = None   # Stage 2 output, filled in by stages 3-4
+        self.frame_index = 0
+        self.tracker = None           # ObstacleTracker: skip stages 3-4 for unchanged obstacles
+
+    def begin_frame(self, left_img, right_img):
+        """Bind a new stereo pair to the pipeline without running any stage."""
+        if left_img.shape != right_img.shape:
+            raise ValueError(f"Stereo pair size mismatch: {left_img.shape} vs {right_img.shape}")
+
+        with self.instrumentation.span('begin_frame'):
+            self._convert_frame(left_img, right_img)
+
+    def _convert_frame(self, left_img, right_img):
+        self.right_bands_pending = False
+        self.rectified_bands = []
+        if self.rectifier is not None:
+            left_img = self.rectifier.rectify('left', left_img)
+            if self.rectify_mode == 'full':
+                right_img = self.rectifier.rectify('right', right_img)
+            else:
+                self.right_bands_pending = True
+
+        self.left_img = left_img
+        self.right_img = right_img
+        self.img_height, self.img_width = left_img.shape[:2]
+
+        if self.left_hsv is None or self.left_hsv.shape != left_img.shape:
+            self.left_hsv = np.empty_like(left_img)
+            self.left_gray = np.empty(left_img.shape[:2], dtype=np.uint8)
+            self.right_gray = np.empty(left_img.shape[:2], dtype=np.uint8)
+            self.right_raw_gray = np.empty(left_img.shape[:2], dtype=np.uint8)
+
+        # Convert to HSV for color filtering (other proposal modes convert only their windows)
+        if self.proposal_mode == 'full':
+            cv2.cvtColor(left_img, cv2.COLOR_BGR2HSV, dst=self.left_hsv)
+        cv2.cvtColor(left_img, cv2.COLOR_BGR2GRAY, dst=self.left_gray)
+        if self.right_bands_pending:
+            cv2.cvtColor(right_img, cv2.COLOR_BGR2GRAY, dst=self.right_raw_gray)
+        else:
+            cv2.cvtColor(right_img, cv2.COLOR_BGR2GRAY, dst=self.right_gray)
+
+    def end_frame(self, process_ms=None):
+        """Package the current frame's stage outputs into a StereoFrameResult."""
+        if process_ms is not None:
+            self.instrumentation.gauge('process_ms', process_ms)
+        self.instrumentation.end_frame()
+        result = StereoFrameResult(self.frame_index, self.left_img, self.right_img,
+                                   self.color_masks, self.color_detections,
+                                   self.obstacle_arrays, process_ms,
+                                   self.matcher_pool.stats(), self.depth_plan)
+        self.frame_index += 1
+        return result
+
+    def process(self, left_img, right_img):
+        """Run stage1-stage4 on one stereo pair and return a StereoFrameResult."""
+        start = time.perf_counter()
+
+        self.begin_frame(left_img, right_img)
+        self.stage1_hsv_region_proposal()
+        self.stage2_merge_nearby_detections()
+        if self.tracker is None:
+            self.stage3_contour_detection_within_bounds()
+            self.stage4_stereo_depth_analysis()
+        else:
+            self.tracked_stages()
+
+        return self.end_frame((time.perf_counter() - start) * 1000.0)
+
+    def tracked_stages(self):
+        """Stages 3-4 on the obstacles the tracker marks new or changed; the rest reuse results."""
+        instr = self.instrumentation
+        with instr.span('tracking'):
+            obstacles, stale = self.tracker.update(self.obstacle_arrays)
+        instr.count('tracks', len(self.tracker.tracks))
+        instr.count('reused_obstacles', len(obstacles) - len(stale))
+        instr.debug("✓ Tracking: {} obstacles, {} need stages 3-4", len(obstacles), len(stale))
+
+        self.obstacle_arrays = obstacles.take(stale)
+        if len(stale):
+            self.stage3_contour_detection_within_bounds()
+            self.stage4_stereo_depth_analysis()
+        self.tracker.refreshed(self.obstacle_arrays)
+        obstacles.assign(stale, self.obstacle_arrays)
+        self.obstacle_arrays = obstacles
+
+    @property
+    def merged_obstacles(self):
+        """The current obstacles as dicts, for debug output (built on every access)."""
+        return [] if self.obstacle_arrays is None else self.obstacle_arrays.to_dicts()
+
+    def stage_graph(self, cache_size=1):
+        """
+        The stages as a StageGraph over this pipeline, fed with
+        set_input('pair', (left, right)):
+
+            frame -> stage1 -> stage2 -> stage3 (also reads stage1's masks)
+                                      -> stage4
+            obstacles = stage3 + stage4, what process() leaves in obstacle_arrays
+
+        stage2-4 keep cache_size results each. The graph drives this
+        pipeline's buffers, so don't call process() while using it.
+        """
+        params = self.STAGE_PARAMS
+        graph = StageGraph(self)
+        graph.add_input('pair')
+        graph.add('frame', self._graph_frame, ['pair'], params['frame'])
+        graph.add('stage1', self._graph_stage1, ['frame'], params['stage1'])
+        graph.add('stage2', self._graph_stage2, ['stage1'], params['stage2'], cache_size)
+        graph.add('stage3', self._graph_stage3, ['stage1', 'stage2'], params['stage3'], cache_size)
+        graph.add('stage4', self._graph_stage4, ['stage2'], params['stage4'], cache_size)
+        graph.add('obstacles', merge_obstacle_fields, ['stage3', 'stage4'], cache_size=cache_size)
+        return graph
+
+    def _graph_frame(self, pair):
+        self.begin_frame(*pair)
+        return self.left_img, self.right_img
+
+    def _graph_stage1(self, frame):
         self.stage1_hsv_region_proposal()
+        return self.color_detections, self.color_masks
+
+    def _graph_stage2(self, stage1):
+        self.color_detections, self.color_masks = stage1
         self.stage2_merge_nearby_detections()
+        return self.obstacle_arrays
+
+    def _graph_stage3(self, stage1, stage2):
+        # Later stages fill in obstacle columns, so each branch works on its own copy
+        self.color_detections, self.color_masks = stage1
+        self.obstacle_arrays = stage2.copy()
         self.stage3_contour_detection_within_bounds()
+        return self.obstacle_arrays
+
+    def _graph_stage4(self, stage2):
+        self.obstacle_arrays = stage2.copy()
         self.stage4_stereo_depth_analysis()
+        return self.obstacle_arrays
 
-        self.current_mode = '1'
+    def get_classifier(self):
+        """Return the HSV label classifier, recompiling if any HSV range changed."""
+        if self.classifier is None or self.classifier.key != ranges_key(self.color_ranges):
+            self.classifier = HSVLabelClassifier(self.color_ranges)
+        return self.classifier
 
     def create_color_mask(self, color_name):
-        """Create binary mask for specific color."""
+        """
+        Create binary mask for specific color.
+        Reference path with one inRange per box; stage1 uses the label image instead.
+        """
         if color_name == 'red':
             # Red requires two ranges (wraps around 0/180)
             mask1 = cv2.inRange(self.left_hsv,
@@ -113,61 +426,209 @@ class EnhancedHSVBoundedStereo:
                               self.color_ranges[color_name]['lower'],
                               self.color_ranges[color_name]['upper'])
 
-        # Morphological cleanup - close gaps, then remove noise
-        kernel = np.ones((5, 5), np.uint8)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+        return self.clean_mask(mask, self.color_ranges[color_name])
 
+    def clean_mask(self, mask, color_info):
+        """Morphological cleanup - close gaps, then remove noise."""
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self.morph_kernel)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self.morph_kernel)
         return mask
 
-    def get_contours_from_mask(self, mask, min_area):
-        """Find contours from mask, filtered by area."""
+    def mask_margin(self, color_info):
+        """
+        How far clean_mask can move a mask edge, plus one kernel radius.
+        Cleaning a crop padded by this much gives the same pixels as cleaning
+        the full frame.
+        """
+        radius = self.morph_kernel.shape[0] // 2
+        return radius * (4 + 1) + 1  # close + open = 4 passes
+
+    def find_contours(self, mask, offset=(0, 0)):
+        """Outer contours of mask; DetectionArrays.finish() drops the ones below min_area."""
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL,
-                                       cv2.CHAIN_APPROX_SIMPLE)
-        return [cnt for cnt in contours if cv2.contourArea(cnt) > min_area]
+                                       cv2.CHAIN_APPROX_SIMPLE, offset=offset)
+        return contours
 
     def stage1_hsv_region_proposal(self):
         """Stage 1: Detect all colored regions using HSV."""
-        print("\n" + "="*70)
-        print("STAGE 1: HSV REGION PROPOSAL")
-        print("="*70)
+        instr = self.instrumentation
+        instr.banner("STAGE 1: HSV REGION PROPOSAL")
+        with instr.span('stage1'):
+            self._propose_regions()
+
+        instr.count('detections', len(self.color_detections))
+        if instr.debugging:
+            instr.debug("✓ Found {} colored regions:", len(self.color_detections))
+            for det in self.color_detections:
+                instr.debug("  - {} at ({}, {}), size {}x{}px, area {:.0f}px²",
+                            det['color_name'], det['center'][0], det['center'][1],
+                            det['bbox'][2], det['bbox'][3], det['area'])
+
+    def _propose_regions(self):
+        classifier = self.get_classifier()
+        if self.proposal_mode == 'incremental':
+            self._propose_incremental(classifier)
+            return
 
-        self.color_detections = []
+        self.color_detections = DetectionArrays(self.color_ranges)
         self.color_masks = {}
+        if self.proposal_mode == 'pyramid':
+            windows = self.pyramid_windows(classifier)
+        else:
+            windows = self.full_frame_windows(classifier)
 
         for color_name, color_info in self.color_ranges.items():
-            mask = self.create_color_mask(color_name)
+            mask = np.zeros((self.img_height, self.img_width), dtype=np.uint8)
             self.color_masks[color_name] = mask
-            
-            min_area = color_info.get('min_area', 500)
-            contours = self.get_contours_from_mask(mask, min_area)
-
-            for cnt in contours:
-                x, y, w, h = cv2.boundingRect(cnt)
-                area = cv2.contourArea(cnt)
-
-                detection = {
-                    'color': color_name,
-                    'color_name': color_info['name'],
-                    'color_bgr': color_info['color_bgr'],
-                    'bbox': (x, y, w, h),
-                    'contour': cnt,
-                    'center': (x + w//2, y + h//2),
-                    'area': area
-                }
+            color_windows = windows.get(color_name)
+            if not color_windows:
+                continue
 
-                self.color_detections.append(detection)
+            for x0, y0, x1, y1, plane in color_windows:
+                if plane is not None:
+                    mask[y0:y1, x0:x1] = self.clean_mask(plane, color_info)
+                else:
+                    self.refine_window(classifier, (x0, y0, x1, y1), {color_name: mask})
+
+            # One contour search over the area the windows cover
+            x0 = min(w[0] for w in color_windows)
+            y0 = min(w[1] for w in color_windows)
+            x1 = max(w[2] for w in color_windows)
+            y1 = max(w[3] for w in color_windows)
+            self.color_detections.add(color_name, self.find_contours(mask[y0:y1, x0:x1],
+                                                                     offset=(x0, y0)))
+        self.color_detections.finish()
+
+    def refine_window(self, classifier, window, masks):
+        """
+        Label and clean a crop around window padded by the cleanup margin,
+        and write only the window itself into each color's mask in masks
+        (exact at the seams).
+        """
+        x0, y0, x1, y1 = window
+        margin = max(self.mask_margin(self.color_ranges[name]) for name in masks)
+        px0, py0 = max(0, x0 - margin), max(0, y0 - margin)
+        px1 = min(self.img_width, x1 + margin)
+        py1 = min(self.img_height, y1 + margin)
+        labels = classifier.classify(cv2.cvtColor(self.left_img[py0:py1, px0:px1],
+                                                  cv2.COLOR_BGR2HSV))
+        for color_name, mask in masks.items():
+            cleaned = self.clean_mask(classifier.plane(labels, color_name),
+                                      self.color_ranges[color_name])
+            mask[y0:y1, x0:x1] = cleaned[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+
+    def _propose_incremental(self, classifier):
+        """
+        Relabel only the tiles that changed since they were last processed,
+        plus a cleanup margin's worth of neighbours; every other tile keeps
+        its mask from the last frame. Contours are searched again only for
+        colors whose mask changed. Masks are replaced, never written in
+        place, so earlier results stay valid.
+        """
+        state = self.incremental
+        reset = (state is None or state['classifier'] is not classifier
+                 or state['shape'] != self.left_img.shape)
+        dirty = self.change_detector.update(self.left_gray, force=reset)
+        if reset:
+            state = self.incremental = {'classifier': classifier, 'shape': self.left_img.shape,
+                                        'masks': {}, 'contours': {}}
+
+        tile = self.change_detector.tile
+        margin = max(self.mask_margin(info) for info in self.color_ranges.values())
+        dirty = grow_tiles(dirty, -(-margin // tile))
+        self.instrumentation.count('dirty_tiles', int(dirty.sum()))
+
+        previous = state['masks']
+        masks = {}
+        for color_name in self.color_ranges:
+            if color_name not in previous:
+                masks[color_name] = np.zeros((self.img_height, self.img_width), dtype=np.uint8)
+            elif dirty.any():
+                masks[color_name] = previous[color_name].copy()
+            else:
+                masks[color_name] = previous[color_name]
+        for window in tile_runs(dirty, tile, self.img_width, self.img_height):
+            self.refine_window(classifier, window, masks)
 
-        print(f"✓ Found {len(self.color_detections)} colored regions:")
-        for det in self.color_detections:
-            print(f"  - {det['color_name']} at ({det['center'][0]}, {det['center'][1]}), "
-                  f"size {det['bbox'][2]}x{det['bbox'][3]}px, area {det['area']:.0f}px²")
+        self.color_detections = DetectionArrays(self.color_ranges)
+        self.color_masks = {}
+        for color_name in self.color_ranges:
+            mask = masks[color_name]
+            old = previous.get(color_name)
+            if old is not None and (mask is old or np.array_equal(mask, old)):
+                mask = old
+            else:
+                x, y, w, h = cv2.boundingRect(mask)
+                state['contours'][color_name] = (
+                    self.find_contours(mask[y:y+h, x:x+w], offset=(x, y)) if w else ())
+                previous[color_name] = mask
+            self.color_masks[color_name] = mask
+            self.color_detections.add(color_name, state['contours'][color_name])
+        self.color_detections.finish()
+
+    def full_frame_windows(self, classifier):
+        """One padded window per color around all of its pixels, from a full-resolution label image."""
+        # One pass labels every pixel with the colors it matches
+        self.left_labels = classifier.classify(self.left_hsv, dst=self.left_labels)
+        rects = classifier.color_rects(self.left_labels)
+
+        windows = {}
+        for color_name, (x, y, w, h) in rects.items():
+            # Clean up and search only the padded box around this color's pixels
+            margin = self.mask_margin(self.color_ranges[color_name])
+            x0, y0 = max(0, x - margin), max(0, y - margin)
+            x1 = min(self.img_width, x + w + margin)
+            y1 = min(self.img_height, y + h + margin)
+            plane = classifier.plane(self.left_labels[y0:y1, x0:x1], color_name)
+            windows[color_name] = [(x0, y0, x1, y1, plane)]
+        return windows
+
+    def pyramid_windows(self, classifier):
+        """
+        Tile runs to refine at full resolution, found on a 1/2**pyramid_levels
+        subsample of the left image. Every coarse blob big enough to plausibly
+        reach min_area at full resolution marks the pyramid_tile tiles under
+        its box (padded by the cleanup margin plus one coarse pixel); each
+        horizontal run of marked tiles becomes one window.
+        """
+        scale = 2 ** self.pyramid_levels
+        small = cv2.resize(self.left_img, (max(1, self.img_width // scale),
+                                           max(1, self.img_height // scale)),
+                           interpolation=cv2.INTER_NEAREST)
+        labels = classifier.classify(cv2.cvtColor(small, cv2.COLOR_BGR2HSV))
+        fx = self.img_width / small.shape[1]
+        fy = self.img_height / small.shape[0]
+        tile = self.pyramid_tile
+        rows = -(-self.img_height // tile)
+        cols = -(-self.img_width // tile)
+
+        windows = {}
+        for color_name, color_info in self.color_ranges.items():
+            plane = classifier.plane(labels, color_name)
+            _, _, stats, _ = cv2.connectedComponentsWithStats(plane, connectivity=8)
+            min_area = color_info.get('min_area', 500) / (fx * fy) * self.pyramid_area_slack
+            margin = self.mask_margin(color_info) + scale
+
+            active = np.zeros((rows, cols), dtype=bool)
+            for x, y, w, h, area in stats[1:]:
+                if area < min_area:
+                    continue
+                tx0 = max(0, int(x * fx) - margin) // tile
+                ty0 = max(0, int(y * fy) - margin) // tile
+                tx1 = min(self.img_width - 1, int((x + w) * fx) + margin) // tile
+                ty1 = min(self.img_height - 1, int((y + h) * fy) + margin) // tile
+                active[ty0:ty1 + 1, tx0:tx1 + 1] = True
+
+            windows[color_name] = [window + (None,) for window in
+                                   tile_runs(active, tile, self.img_width, self.img_height)]
+        return windows
 
     def should_merge(self, det1, det2):
         """
         Check if two detections should be merged.
         Uses both spatial proximity AND vertical position to avoid 
         merging background (rug) with foreground (dispenser).
+        Stage 2 applies the same test to all candidate pairs at once (merge_pairs).
         """
         x1, y1, w1, h1 = det1['bbox']
         x2, y2, w2, h2 = det2['bbox']
@@ -195,112 +656,92 @@ class EnhancedHSVBoundedStereo:
         
         return x_overlap and y_overlap
 
-    def merge_boxes(self, boxes):
-        """Merge multiple bounding boxes into one encompassing box."""
-        if not boxes:
-            return None
-
-        x_min = min(b[0] for b in boxes)
-        y_min = min(b[1] for b in boxes)
-        x_max = max(b[0] + b[2] for b in boxes)
-        y_max = max(b[1] + b[3] for b in boxes)
-
-        return (x_min, y_min, x_max - x_min, y_max - y_min)
+    def merge_pairs(self, records):
+        """
+        (i, j) index arrays of every detection pair should_merge accepts,
+        tested in bulk: boxes that meet once grown by the merge margins
+        (overlapping_pairs), then the center y gap.
+        """
+        i, j = overlapping_pairs(records['bbox'], self.merge_margin_x, self.merge_margin_y)
+        cy = records['center'][:, 1].astype(np.int64)
+        keep = np.abs(cy[i] - cy[j]) <= self.merge_max_y_gap
+        return i[keep], j[keep]
 
     def stage2_merge_nearby_detections(self):
         """Stage 2: Merge overlapping/nearby detections into unified obstacles."""
-        print("\n" + "="*70)
-        print("STAGE 2: MERGE NEARBY DETECTIONS")
-        print("="*70)
-
+        instr = self.instrumentation
+        instr.banner("STAGE 2: MERGE NEARBY DETECTIONS")
+        with instr.span('stage2'):
+            self._merge_detections()
+
+        merged_count = len(self.color_detections) - len(self.obstacle_arrays)
+        instr.count('obstacles', len(self.obstacle_arrays))
+        instr.count('merged', merged_count)
+        if not instr.debugging:
+            return
         if not self.color_detections:
-            self.merged_obstacles = []
-            print("✓ No detections to merge")
+            instr.debug("✓ No detections to merge")
             return
-
-        # Union-find for grouping
-        n = len(self.color_detections)
-        parent = list(range(n))
-
-        def find(i):
-            if parent[i] != i:
-                parent[i] = find(parent[i])
-            return parent[i]
-
-        def union(i, j):
-            pi, pj = find(i), find(j)
-            if pi != pj:
-                parent[pi] = pj
-
-        # Check all pairs using improved merge criteria
-        for i in range(n):
-            for j in range(i + 1, n):
-                if self.should_merge(self.color_detections[i], 
-                                     self.color_detections[j]):
-                    union(i, j)
-
-        # Group by root parent
-        groups = {}
-        for i in range(n):
-            root = find(i)
-            if root not in groups:
-                groups[root] = []
-            groups[root].append(i)
-
-        # Create merged obstacles
-        self.merged_obstacles = []
-
-        for group_indices in groups.values():
-            group_dets = [self.color_detections[i] for i in group_indices]
-            boxes = [d['bbox'] for d in group_dets]
-            colors = list(set(d['color_name'] for d in group_dets))
-
-            # Merge bounding boxes
-            x, y, w, h = self.merge_boxes(boxes)
-
-            # Add padding for edge detection / stereo
-            x = max(0, x - self.roi_padding)
-            y = max(0, y - self.roi_padding)
-            w = min(self.img_width - x, w + 2 * self.roi_padding)
-            h = min(self.img_height - y, h + 2 * self.roi_padding)
-
-            obstacle = {
-                'bbox': (x, y, w, h),
-                'center': (x + w//2, y + h//2),
-                'colors': colors,
-                'color_label': '+'.join(sorted(colors)),
-                'detections': group_dets,
-                'num_components': len(group_dets)
-            }
-
-            self.merged_obstacles.append(obstacle)
-
-        merged_count = len(self.color_detections) - len(self.merged_obstacles)
-        print(f"✓ {len(self.color_detections)} detections → {len(self.merged_obstacles)} obstacles "
-              f"({merged_count} merged)")
-        
+        instr.debug("✓ {} detections → {} obstacles ({} merged)",
+                    len(self.color_detections), len(self.obstacle_arrays), merged_count)
         for obs in self.merged_obstacles:
             if obs['num_components'] > 1:
-                print(f"  - MERGED {obs['color_label']} ({obs['num_components']} parts) "
-                      f"at ({obs['center'][0]}, {obs['center'][1]}), "
-                      f"size {obs['bbox'][2]}x{obs['bbox'][3]}px")
+                instr.debug("  - MERGED {} ({} parts) at ({}, {}), size {}x{}px",
+                            obs['color_label'], obs['num_components'],
+                            obs['center'][0], obs['center'][1], obs['bbox'][2], obs['bbox'][3])
             else:
-                print(f"  - {obs['color_label']} at ({obs['center'][0]}, {obs['center'][1]}), "
-                      f"size {obs['bbox'][2]}x{obs['bbox'][3]}px")
+                instr.debug("  - {} at ({}, {}), size {}x{}px",
+                            obs['color_label'], obs['center'][0], obs['center'][1],
+                            obs['bbox'][2], obs['bbox'][3])
+
+    def _merge_detections(self):
+        detections = self.color_detections
+        if not isinstance(detections, DetectionArrays):
+            detections = DetectionArrays.from_dicts(detections, self.color_ranges)
+        # Group detections joined by any chain of mergeable pairs
+        i, j = self.merge_pairs(detections.records)
+        obstacles = ObstacleArrays.from_groups(detections, connected_groups(len(detections), i, j))
+
+        # Add padding for edge detection / stereo
+        x, y, w, h = obstacles.records['bbox'].T.astype(np.int64)
+        pad = self.roi_padding
+        x = np.maximum(0, x - pad)
+        y = np.maximum(0, y - pad)
+        w = np.minimum(self.img_width - x, w + 2 * pad)
+        h = np.minimum(self.img_height - y, h + 2 * pad)
+        obstacles.records['bbox'] = np.stack([x, y, w, h], axis=1)
+        obstacles.records['center'] = np.stack([x + w // 2, y + h // 2], axis=1)
+
+        keep = w * h >= self.min_obstacle_area
+        if self.max_box_width_ratio is not None:
+            keep &= w <= self.img_width * self.max_box_width_ratio
+        if self.max_aspect_ratio is not None:
+            keep &= w / h.astype(np.float64) <= self.max_aspect_ratio
+
+        self.obstacle_arrays = obstacles.select(keep)
 
     def stage3_contour_detection_within_bounds(self):
         """Stage 3: Find precise contours within merged regions using edge detection."""
-        print("\n" + "="*70)
-        print("STAGE 3: CONTOUR DETECTION WITHIN BOUNDS")
-        print("="*70)
-
-        left_gray = cv2.cvtColor(self.left_img, cv2.COLOR_BGR2GRAY)
-
-        for obs in self.merged_obstacles:
-            x, y, w, h = obs['bbox']
-
+        instr = self.instrumentation
+        instr.banner("STAGE 3: CONTOUR DETECTION WITHIN BOUNDS")
+        with instr.span('stage3'):
+            self._find_edge_contours()
+
+        obstacles = self.obstacle_arrays
+        instr.count('contours', int(obstacles.records['num_contours'].sum()))
+        if instr.debugging:
+            for label, num_contours, area in zip(obstacles.color_labels(),
+                                                 obstacles.records['num_contours'].tolist(),
+                                                 obstacles.records['contour_area'].tolist()):
+                instr.debug("  - {}: {} contours, total area {:.0f}px²", label, num_contours, area)
+
+    def _find_edge_contours(self):
+        obstacles = self.obstacle_arrays
+        n = len(obstacles)
+        obstacles.contours, obstacles.edges = [None] * n, [None] * n
+        for i, (x, y, w, h) in enumerate(obstacles.records['bbox'].tolist()):
             # Extract ROI and apply edge detection
-            roi_gray = left_gray[y:y+h, x:x+w]
+            roi_gray = self.left_gray[y:y+h, x:x+w]
             roi_blurred = cv2.GaussianBlur(roi_gray, (5, 5), 0)
             edges = cv2.Canny(roi_blurred, self.canny_threshold1, self.canny_threshold2)
 
@@ -311,95 +752,196 @@ class EnhancedHSVBoundedStereo:
             # Filter by area and adjust coordinates to full image space
             min_edge_area = 100  # Lower threshold for edge-based contours
             significant_contours = []
+            contour_area = 0.0
             for cnt in contours:
-                if cv2.contourArea(cnt) > min_edge_area:
-                    adjusted = cnt + np.array([x, y])
-                    significant_contours.append(adjusted)
-
-            obs['edges_roi'] = edges
-            obs['contours'] = significant_contours
-            obs['num_contours'] = len(significant_contours)
-            obs['contour_area'] = sum(cv2.contourArea(c) for c in significant_contours)
+                area = cv2.contourArea(cnt)
+                if area > min_edge_area:
+                    significant_contours.append(cnt + np.array([x, y]))
+                    contour_area += area
 
-            print(f"  - {obs['color_label']}: {len(significant_contours)} contours, "
-                  f"total area {obs['contour_area']:.0f}px²")
+            obstacles.edges[i] = edges
+            obstacles.contours[i] = significant_contours
+            obstacles.records['contour_area'][i] = contour_area
+        obstacles.records['num_contours'] = [len(c) for c in obstacles.contours]
 
     def stage4_stereo_depth_analysis(self):
         """Stage 4: Compute stereo depth within merged obstacle regions."""
-        print("\n" + "="*70)
-        print("STAGE 4: STEREO DEPTH ANALYSIS")
-        print("="*70)
-
-        for obs in self.merged_obstacles:
-            x, y, w, h = obs['bbox']
-
-            # Check minimum ROI size for stereo
-            block_size = 7
-            min_num_disp = 16
-            max_num_disp = w - block_size - 8
-            max_num_disp = (max_num_disp // 16) * 16
-
-            if max_num_disp < min_num_disp:
-                obs['has_depth'] = False
-                obs['depth_cm'] = None
-                obs['skip_reason'] = f'ROI too small ({w}px wide)'
-                print(f"  - {obs['color_label']}: Skipped (ROI too small for stereo)")
-                continue
+        instr = self.instrumentation
+        instr.banner("STAGE 4: STEREO DEPTH ANALYSIS")
+
+        start = time.perf_counter()
+        with instr.span('stage4'):
+            obstacles = self.obstacle_arrays
+            plan = self.depth_planner.plan(obstacles.records['bbox'].tolist(),
+                                           self.left_gray.shape, self.num_disparities,
+                                           self.block_size, self.depth_strategy)
+            self.depth_plan = plan
+            if plan['num_rois']:
+                instr.debug("✓ Strategy: {} ({} ROIs, overlap x{:.2f})",
+                            plan['strategy'], plan['num_rois'], plan['overlap_ratio'])
+
+            if self.right_bands_pending:
+                self.rectify_right_bands(plan)
+
+            if plan['strategy'] == 'per_roi':
+                self.match_each_roi()
+            else:
+                self.match_union_region(plan['union_region'])
 
-            num_disparities = min(64, max_num_disp)
-
-            # Extract ROIs
-            left_roi = self.left_img[y:y+h, x:x+w]
-            right_roi = self.right_img[y:y+h, x:x+w]
-
-            left_gray = cv2.cvtColor(left_roi, cv2.COLOR_BGR2GRAY)
-            right_gray = cv2.cvtColor(right_roi, cv2.COLOR_BGR2GRAY)
-
-            # Stereo matching
-            stereo = cv2.StereoSGBM_create(
-                minDisparity=0,
-                numDisparities=num_disparities,
-                blockSize=block_size,
-                P1=8 * 3 * block_size**2,
-                P2=32 * 3 * block_size**2,
-                disp12MaxDiff=1,
-                uniquenessRatio=10,
-                speckleWindowSize=50,
-                speckleRange=16
-            )
+        plan['elapsed_ms'] = (time.perf_counter() - start) * 1000.0
+        instr.count('rois', plan['num_rois'])
+        depths = obstacles.records['depth_cm']
+        if not np.isnan(depths).all():
+            instr.gauge('nearest_depth_cm', float(np.nanmin(depths)))
 
+    def rectify_right_bands(self, plan):
+        """
+        Rectify only the parts of the right frame that this frame's matches read.
+        Stage 4 can rerun on the same frame with a wider plan, so every band not
+        inside one rectified earlier is rectified, not just the first plan's.
+        """
+        bands = plan['bands'] if plan['strategy'] == 'per_roi' else [plan['union_band']]
+        for x0, y0, x1, y1 in bands:
+            if any(rx0 <= x0 and ry0 <= y0 and x1 <= rx1 and y1 <= ry1
+                   for rx0, ry0, rx1, ry1 in self.rectified_bands):
+                continue
+            self.right_gray[y0:y1, x0:x1] = self.rectifier.rectify_roi(
+                'right', self.right_raw_gray, (x0, y0, x1 - x0, y1 - y0))
+            self.rectified_bands.append((x0, y0, x1, y1))
+
+    def match_each_roi(self):
+        """Stereo matching over each box's own epipolar band, cut back to the ROI."""
+        obstacles = self.obstacle_arrays
+        n = len(obstacles)
+        disparities, reasons = [None] * n, [None] * n
+        counts, means = np.zeros(n, np.int64), np.full(n, np.nan)
+        for i, bbox in enumerate(obstacles.records['bbox'].tolist()):
             try:
-                disparity = stereo.compute(left_gray, right_gray)
-            except cv2.error as e:
-                obs['has_depth'] = False
-                obs['depth_cm'] = None
-                obs['skip_reason'] = 'Stereo compute failed'
-                print(f"  - {obs['color_label']}: Stereo failed")
+                disparity = self.roi_stereo.compute(
+                    self.left_gray, self.right_gray, bbox,
+                    self.num_disparities, self.block_size, self.sgbm_mode,
+                    **self.sgbm_params
+                )
+            except cv2.error:
+                reasons[i] = 'Stereo compute failed'
+                continue
+            if disparity is None:
+                reasons[i] = 'Image too narrow for stereo'
                 continue
+            valid = disparity > 0
+            counts[i] = valid.sum()
+            if counts[i]:
+                means[i] = disparity[valid].mean()
+            disparities[i] = disparity
+        self.apply_disparities(disparities, counts, means, reasons)
+
+    def match_union_region(self, region):
+        """One stereo match over the band around every box, sliced per ROI."""
+        obstacles = self.obstacle_arrays
+        n = len(obstacles)
+        try:
+            disparity, origin = self.roi_stereo.compute_band(
+                self.left_gray, self.right_gray, region,
+                self.num_disparities, self.block_size, self.sgbm_mode,
+                **self.sgbm_params
+            )
+        except cv2.error:
+            self.apply_disparities([None] * n, np.zeros(n, np.int64), np.full(n, np.nan),
+                                   ['Stereo compute failed'] * n)
+            return
+
+        if disparity is None:
+            self.apply_disparities([None] * n, np.zeros(n, np.int64), np.full(n, np.nan),
+                                   ['Image too narrow for stereo'] * n)
+            return
+
+        # Valid-pixel count and mean for every box from one pass over the band
+        boxes = obstacles.records['bbox'].tolist()
+        counts, means = box_means(disparity, boxes, valid=disparity > 0, origin=origin)
+        disparities = [crop_to_box(disparity, origin, bbox).copy() for bbox in boxes]
+        self.apply_disparities(disparities, counts, means, [None] * n)
 
-            # Calculate depth
-            valid = disparity[disparity > 0]
-            if len(valid) > 0:
-                avg_disp = np.mean(valid) / 16.0
-                focal_length = 700  # Rough estimate for phone camera
-                
-                if avg_disp > 0:
-                    depth_cm = (self.baseline_cm * focal_length) / avg_disp
+    def apply_disparities(self, disparities, counts, means, reasons):
+        """
+        Turn every obstacle's ROI-aligned disparity map, with its valid-pixel
+        count and mean raw disparity, into the depth columns. reasons[i] says
+        why obstacle i has no disparity map (None when it has one).
+        """
+        obstacles = self.obstacle_arrays
+        records = obstacles.records
+        has_depth = np.array([reason is None for reason in reasons], dtype=bool)
+        has_depth &= np.asarray(counts) > self.min_valid_disparities
+        avg_disp = np.where(has_depth, np.asarray(means, dtype=np.float64) / 16.0, np.nan)
+
+        # Calculate depth
+        with np.errstate(divide='ignore', invalid='ignore'):
+            depth_cm = (self.baseline_cm * self.focal_length) / avg_disp
+        records['has_depth'] = has_depth
+        records['avg_disparity'] = avg_disp
+        records['depth_cm'] = np.where(avg_disp > 0, depth_cm, np.nan)
+
+        obstacles.disparities = [d if ok else None for d, ok in zip(disparities, has_depth.tolist())]
+        obstacles.skip_reasons = [None if ok else (reason or 'No valid disparity')
+                                  for reason, ok in zip(reasons, has_depth.tolist())]
+
+        instr = self.instrumentation
+        instr.count('skipped_rois', int(len(records) - has_depth.sum()))
+        if instr.debugging:
+            for label, ok, avg, depth, reason in zip(
+                    obstacles.color_labels(), has_depth.tolist(), avg_disp.tolist(),
+                    records['depth_cm'].tolist(), obstacles.skip_reasons):
+                if ok:
+                    depth_str = "N/A" if np.isnan(depth) else f"{depth:.0f}cm"
+                    instr.debug("  - {}: disparity={:.1f}, depth={}", label, avg, depth_str)
                 else:
-                    depth_cm = None
+                    instr.debug("  - {}: {}", label, reason)
 
-                obs['disparity_roi'] = disparity
-                obs['avg_disparity'] = avg_disp
-                obs['depth_cm'] = depth_cm
-                obs['has_depth'] = True
 
-                depth_str = f"{depth_cm:.0f}cm" if depth_cm else "N/A"
-                print(f"  - {obs['color_label']}: disparity={avg_disp:.1f}, depth={depth_str}")
-            else:
-                obs['has_depth'] = False
-                obs['depth_cm'] = None
-                obs['skip_reason'] = 'No valid disparity'
-                print(f"  - {obs['color_label']}: No valid disparity (insufficient texture)")
+class EnhancedHSVBoundedStereo:
+    """
+    Interactive viewer for stereo pairs from a frame source. Each render
+    mode pulls only the stages it shows from the pipeline's stage graph, so
+    mode 1 never waits for Canny or stereo matching.
+    """
+
+    def __init__(self, source, baseline_cm, instrumentation=None, proposal_mode='full'):
+        self.source = source
+        self.pipeline = HSVStereoPipeline(baseline_cm, instrumentation=instrumentation)
+        self.pipeline.proposal_mode = proposal_mode
+        self.graph = self.pipeline.stage_graph()
+        self.color_ranges = self.pipeline.color_ranges
+        self.renderer = RenderCache(lambda mode: getattr(self, f'render_mode_{mode}')())
+        self.frames = 0
+
+        if not self.next_frame():
+            print(f"Error: Could not load images")
+            sys.exit(1)
+
+        self.current_mode = '1'
+
+    def next_frame(self):
+        """Bind the next pair from the source. Returns False when it has no more."""
+        ok, pair, _ = self.source.read()
+        if not ok:
+            return False
+        if self.frames:
+            self.pipeline.instrumentation.end_frame()
+        self.frames += 1
+        self.graph.set_input('pair', pair)
+        self.renderer.invalidate()
+        return True
+
+    @property
+    def left_img(self):
+        return self.graph.get('frame')[0]
+
+    @property
+    def color_detections(self):
+        return self.graph.get('stage1')[0]
+
+    @property
+    def color_masks(self):
+        return self.graph.get('stage1')[1]
 
     # =========================================================================
     # RENDER MODES
@@ -407,34 +949,33 @@ class EnhancedHSVBoundedStereo:
 
     def render_mode_1(self):
         """Mode 1: Original with merged obstacle boxes."""
-        display = self.left_img.copy()
-
-        for obs in self.merged_obstacles:
-            x, y, w, h = obs['bbox']
-            color = obs['detections'][0]['color_bgr']
+        obstacles = self.graph.get('stage2')
+        display = self.renderer.canvas(self.left_img, '1')
 
+        for (x, y, w, h), color, label in zip(obstacles.records['bbox'].tolist(),
+                                              obstacles.color_bgrs(), obstacles.color_labels()):
             cv2.rectangle(display, (x, y), (x+w, y+h), color, 2)
-            cv2.putText(display, obs['color_label'], (x, y-5),
+            cv2.putText(display, label, (x, y-5),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, color, 2)
 
         cv2.putText(display, "1: Merged Obstacle Regions",
                    (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
-        cv2.putText(display, f"{len(self.merged_obstacles)} obstacles from {len(self.color_detections)} detections",
+        cv2.putText(display, f"{len(obstacles)} obstacles from {len(self.color_detections)} detections",
                    (10, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
 
         return display
 
     def render_mode_2(self):
         """Mode 2: HSV masks (diagnostic view)."""
-        display = np.zeros_like(self.left_img)
+        obstacles = self.graph.get('stage2')
+        display = self.renderer.blank(self.left_img, '2')
 
         for color_name, mask in self.color_masks.items():
             color_bgr = self.color_ranges[color_name]['color_bgr']
             display[mask > 0] = color_bgr
 
         # Draw merged boxes
-        for obs in self.merged_obstacles:
-            x, y, w, h = obs['bbox']
+        for x, y, w, h in obstacles.records['bbox'].tolist():
             cv2.rectangle(display, (x, y), (x+w, y+h), (255, 255, 255), 2)
 
         cv2.putText(display, "2: HSV Masks + Merged Regions",
@@ -446,12 +987,11 @@ class EnhancedHSVBoundedStereo:
 
     def render_mode_3(self):
         """Mode 3: Edge detection within merged regions."""
-        display = self.left_img.copy()
-
-        for obs in self.merged_obstacles:
-            x, y, w, h = obs['bbox']
-            edges = obs['edges_roi']
+        obstacles = self.graph.get('stage3')
+        display = self.renderer.canvas(self.left_img, '3')
 
+        for (x, y, w, h), color, edges in zip(obstacles.records['bbox'].tolist(),
+                                              obstacles.color_bgrs(), obstacles.edges):
             # Overlay edges in green
             edges_colored = np.zeros((h, w, 3), dtype=np.uint8)
             edges_colored[edges > 0] = (0, 255, 0)
@@ -460,7 +1000,6 @@ class EnhancedHSVBoundedStereo:
                 display[y:y+h, x:x+w], 0.6, edges_colored, 0.4, 0
             )
 
-            color = obs['detections'][0]['color_bgr']
             cv2.rectangle(display, (x, y), (x+w, y+h), color, 2)
 
         cv2.putText(display, "3: Edge Detection Within Merged Regions",
@@ -472,17 +1011,17 @@ class EnhancedHSVBoundedStereo:
 
     def render_mode_4(self):
         """Mode 4: Contours within merged regions."""
-        display = self.left_img.copy()
-
-        for obs in self.merged_obstacles:
-            x, y, w, h = obs['bbox']
-            color = obs['detections'][0]['color_bgr']
+        obstacles = self.graph.get('stage3')
+        display = self.renderer.canvas(self.left_img, '4')
 
-            if obs['contours']:
-                cv2.drawContours(display, obs['contours'], -1, (0, 255, 0), 2)
+        for (x, y, w, h), color, name, contours in zip(
+                obstacles.records['bbox'].tolist(), obstacles.color_bgrs(),
+                obstacles.color_labels(), obstacles.contours):
+            if contours:
+                cv2.drawContours(display, contours, -1, (0, 255, 0), 2)
 
             cv2.rectangle(display, (x, y), (x+w, y+h), color, 2)
-            label = f"{obs['color_label']}: {obs['num_contours']} contours"
+            label = f"{name}: {len(contours)} contours"
             cv2.putText(display, label, (x, y-5),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
 
@@ -495,21 +1034,21 @@ class EnhancedHSVBoundedStereo:
 
     def render_mode_5(self):
         """Mode 5: Stereo disparity within merged regions."""
-        display = np.zeros_like(self.left_img)
+        obstacles = self.graph.get('stage4')
+        display = self.renderer.blank(self.left_img, '5')
 
-        for obs in self.merged_obstacles:
-            if not obs.get('has_depth'):
+        for (x, y, w, h), color, disparity in zip(obstacles.records['bbox'].tolist(),
+                                                  obstacles.color_bgrs(), obstacles.disparities):
+            if disparity is None:
                 continue
 
-            x, y, w, h = obs['bbox']
             disp_visual = cv2.normalize(
-                obs['disparity_roi'], None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U
+                disparity, None, 0, 255, cv2.NORM_MINMAX, dtype=cv2.CV_8U
             )
             disp_colored = cv2.applyColorMap(disp_visual, cv2.COLORMAP_JET)
 
             display[y:y+h, x:x+w] = disp_colored
 
-            color = obs['detections'][0]['color_bgr']
             cv2.rectangle(display, (x, y), (x+w, y+h), color, 2)
 
         cv2.putText(display, "5: Stereo Disparity Within Merged Regions",
@@ -521,30 +1060,30 @@ class EnhancedHSVBoundedStereo:
 
     def render_mode_6(self):
         """Mode 6: Full analysis (contours + depth + labels)."""
-        display = self.left_img.copy()
+        obstacles = self.graph.get('obstacles')
+        display = self.renderer.canvas(self.left_img, '6')
         y_offset = 90
 
-        for obs in self.merged_obstacles:
-            x, y, w, h = obs['bbox']
-            cx, cy = obs['center']
-            color = obs['detections'][0]['color_bgr']
-
+        records = obstacles.records
+        for (x, y, w, h), (cx, cy), color, name, contours, depth, reason in zip(
+                records['bbox'].tolist(), records['center'].tolist(), obstacles.color_bgrs(),
+                obstacles.color_labels(), obstacles.contours, records['depth_cm'].tolist(),
+                obstacles.skip_reasons):
             # Draw contours
-            if obs['contours']:
-                cv2.drawContours(display, obs['contours'], -1, (0, 255, 0), 1)
+            if contours:
+                cv2.drawContours(display, contours, -1, (0, 255, 0), 1)
 
             # Draw box and center
             cv2.rectangle(display, (x, y), (x+w, y+h), color, 2)
             cv2.circle(display, (cx, cy), 5, color, -1)
 
             # Label
-            if obs.get('has_depth') and obs['depth_cm']:
-                label = f"{obs['color_label']}: {obs['depth_cm']:.0f}cm"
-                info = f"{obs['color_label']}: pos=({cx},{cy}) depth={obs['depth_cm']:.0f}cm contours={obs['num_contours']}"
+            if reason is None and not np.isnan(depth):
+                label = f"{name}: {depth:.0f}cm"
+                info = f"{name}: pos=({cx},{cy}) depth={depth:.0f}cm contours={len(contours)}"
             else:
-                label = f"{obs['color_label']}"
-                reason = obs.get('skip_reason', 'no depth')
-                info = f"{obs['color_label']}: pos=({cx},{cy}) {reason}"
+                label = f"{name}"
+                info = f"{name}: pos=({cx},{cy}) {reason or 'no depth'}"
 
             cv2.putText(display, label, (x, y-5),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
@@ -561,20 +1100,19 @@ class EnhancedHSVBoundedStereo:
 
     def render_mode_7(self):
         """Mode 7: Side-by-side comparison."""
+        obstacles = self.graph.get('stage3')
         # Left: merged boxes
-        left_panel = self.left_img.copy()
-        for obs in self.merged_obstacles:
-            x, y, w, h = obs['bbox']
-            color = obs['detections'][0]['color_bgr']
+        left_panel = self.renderer.canvas(self.left_img, '7-left')
+        for (x, y, w, h), color in zip(obstacles.records['bbox'].tolist(), obstacles.color_bgrs()):
             cv2.rectangle(left_panel, (x, y), (x+w, y+h), color, 2)
         cv2.putText(left_panel, "Merged Regions", (10, 30),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
 
         # Right: contours + depth
-        right_panel = self.left_img.copy()
-        for obs in self.merged_obstacles:
-            if obs['contours']:
-                cv2.drawContours(right_panel, obs['contours'], -1, (0, 255, 0), 2)
+        right_panel = self.renderer.canvas(self.left_img, '7-right')
+        for contours in obstacles.contours:
+            if contours:
+                cv2.drawContours(right_panel, contours, -1, (0, 255, 0), 2)
         cv2.putText(right_panel, "Contours", (10, 30),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 255), 2)
 
@@ -598,59 +1136,103 @@ class EnhancedHSVBoundedStereo:
         print("  5: Stereo disparity")
         print("  6: Full analysis")
         print("  7: Side-by-side")
+        print("  N: Next stereo pair")
         print("  ESC/Q: Exit")
         print("="*70)
 
         while True:
-            if self.current_mode == '1':
-                display = self.render_mode_1()
-            elif self.current_mode == '2':
-                display = self.render_mode_2()
-            elif self.current_mode == '3':
-                display = self.render_mode_3()
-            elif self.current_mode == '4':
-                display = self.render_mode_4()
-            elif self.current_mode == '5':
-                display = self.render_mode_5()
-            elif self.current_mode == '6':
-                display = self.render_mode_6()
-            elif self.current_mode == '7':
-                display = self.render_mode_7()
-
-            cv2.imshow("HSV-Bounded Stereo", display)
-
-            key = cv2.waitKey(1) & 0xFF
+            # Live sources keep moving; recorded ones advance on N
+            if self.source.live:
+                self.next_frame()
+
+            # Renders and redraws only when the mode or the frame changed
+            self.renderer.show("HSV-Bounded Stereo", self.current_mode)
+
+            key = self.renderer.wait_key(busy=self.source.live)
             if key == 27 or key == ord('q'):
                 break
+            elif key == ord('n'):
+                if not self.next_frame():
+                    print("\nNo more stereo pairs")
             elif chr(key) in '1234567':
                 self.current_mode = chr(key)
                 print(f"\nSwitched to mode: {self.current_mode}")
 
         cv2.destroyAllWindows()
+        self.source.release()
+        obstacles = self.graph.get('obstacles').to_dicts()    # The summary needs every stage
+        self.pipeline.instrumentation.end_frame()
+        self.pipeline.instrumentation.close()
         
         print("\n" + "="*70)
         print("SUMMARY")
         print("="*70)
-        print(f"Detected {len(self.merged_obstacles)} obstacles:")
-        for obs in self.merged_obstacles:
+        print(f"Detected {len(obstacles)} obstacles:")
+        for obs in obstacles:
             depth_str = f"{obs['depth_cm']:.0f}cm" if obs.get('depth_cm') else "no depth"
             print(f"  - {obs['color_label']} at {obs['center']}, {depth_str}")
+        plan = self.pipeline.depth_plan
+        if plan and plan['num_rois']:
+            print(f"Depth strategy: {plan['strategy']}, {plan['elapsed_ms']:.1f}ms "
+                  f"(est. cost per-ROI {plan['est_cost_per_roi']:,} vs union {plan['est_cost_union']:,})")
+        stats = self.pipeline.matcher_pool.stats()
+        if stats:
+            print(f"Stereo matchers: {stats['matchers']} pooled, "
+                  f"{stats['hits']} hits / {stats['misses']} misses")
         print("="*70)
 
+    def serve(self, server):
+        """
+        Headless display loop: stream whichever render modes browsers are
+        watching. Stages that no watched mode needs are never computed.
+        """
+        modes = [str(m) for m in range(1, 8)]
+        server.streams = modes
+        print(f"Streaming render modes 1-7 at {server.url} (Ctrl+C to stop)")
+        try:
+            while True:
+                if self.source.live and not self.next_frame():
+                    break
+                version = self.renderer.version
+                for mode in server.watched():
+                    if mode in modes and server.due(mode, version):
+                        server.publish(mode, self.renderer.render(mode), version)
+                if not self.source.live:
+                    time.sleep(server.interval or 0.1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
+            self.source.release()
+            self.pipeline.instrumentation.close()
+        stats = server.stats()
+        print(f"\n✓ {stats['encoded']} frames streamed, {stats['dropped']} dropped for slow clients")
+
 
 def main():
-    if len(sys.argv) != 4:
-        print("Usage: python hsv_bounded_stereo_lesson.py <left_image> <right_image> <baseline_cm>")
-        print("\nExample:")
-        print("  python hsv_bounded_stereo_lesson.py datasets/raw/IMG_0096.jpg datasets/raw/IMG_0097.jpg 15.24")
-        sys.exit(1)
-
-    left_path = sys.argv[1]
-    right_path = sys.argv[2]
-    baseline_cm = float(sys.argv[3])
-
-    lesson = EnhancedHSVBoundedStereo(left_path, right_path, baseline_cm)
-    lesson.run()
+    parser = argparse.ArgumentParser(
+        description="HSV-bounded stereo vision",
+        epilog="Example: python hsv_bounded_stereo_lesson.py "
+               "datasets/raw/IMG_0096.jpg datasets/raw/IMG_0097.jpg 15.24")
+    add_stereo_arguments(parser)
+    add_instrumentation_arguments(parser)
+    add_server_arguments(parser)
+    parser.add_argument('--proposal', choices=['full', 'pyramid', 'incremental'], default='full',
+                        help="Stage 1 region proposals on every pixel, coarse-to-fine, "
+                             "or only in tiles that changed since the last frame")
+    args = parser.parse_args()
+
+    try:
+        source, baseline_cm = stereo_source_from_args(args)
+    except (IOError, ValueError) as e:
+        parser.error(str(e))
+
+    lesson = EnhancedHSVBoundedStereo(source, baseline_cm, instrumentation_from_args(args),
+                                      proposal_mode=args.proposal)
+    if args.serve is not None:
+        lesson.serve(MJPEGServer(port=args.serve, max_fps=args.display_fps).start())
+    else:
+        lesson.run()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,132 @@
+"""
+Single-Pass HSV Label Classifier
+Compile a whole color_ranges table once, then label every pixel in one pass.
+
+Every inclusive HSV box in color_ranges gets its own bit (red has two boxes,
+so it gets two bits). The box test is separable per channel, so the table is
+stored as three 256-entry lookup tables instead of one 180x256x256 cube:
+
+    labels = lut_h[H] & lut_s[S] & lut_v[V]
+
+A pixel's label is the set of boxes it falls in - exactly what one
+cv2.inRange per box would give, but the per-frame cost no longer grows with
+the number of colors. Per-color masks are read back out of the label image
+with a second tiny lookup table, and only inside that color's bounding box.
+
+Usage:
+    classifier = HSVLabelClassifier(color_ranges)
+    labels = classifier.classify(hsv)
+    rects = classifier.color_rects(labels)
+    mask = classifier.plane(labels, 'yellow')
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import cv2
+import numpy as np
+
+
+def range_boxes(color_info):
+    """Return the (lower, upper) HSV boxes of one color_ranges entry."""
+    boxes = []
+    for key in sorted(color_info):
+        if key.startswith('lower'):
+            suffix = key[len('lower'):]
+            boxes.append((np.asarray(color_info[key]),
+                          np.asarray(color_info['upper' + suffix])))
+    return boxes
+
+
+def ranges_key(color_ranges):
+    """Hashable snapshot of every color's HSV boxes; equal keys compile to equal LUTs."""
+    return tuple((color_name, tuple((tuple(lower.tolist()), tuple(upper.tolist()))
+                                    for lower, upper in range_boxes(color_info)))
+                 for color_name, color_info in color_ranges.items())
+
+
+class HSVLabelClassifier:
+    def __init__(self, color_ranges):
+        self.color_ranges = color_ranges
+        self.key = ranges_key(color_ranges)
+        self.color_bits = {}
+
+        boxes = []
+        for color_name, color_info in color_ranges.items():
+            bits = 0
+            for box in range_boxes(color_info):
+                bits |= 1 << len(boxes)
+                boxes.append(box)
+            self.color_bits[color_name] = bits
+
+        if len(boxes) <= 8:
+            self.dtype = np.uint8
+        elif len(boxes) <= 16:
+            self.dtype = np.uint16
+        elif len(boxes) <= 31:
+            self.dtype = np.int32  # cv2.LUT has no uint32 output
+        else:
+            raise ValueError(f"Too many HSV boxes for one label image: {len(boxes)}")
+
+        # One LUT per channel: value -> bits of every box containing it
+        self.channel_luts = [np.zeros(256, dtype=self.dtype) for _ in range(3)]
+        for bit, (lower, upper) in enumerate(boxes):
+            for c in range(3):
+                lo = max(0, int(lower[c]))
+                hi = min(255, int(upper[c]))
+                if lo <= hi:
+                    self.channel_luts[c][lo:hi + 1] |= self.dtype(1 << bit)
+
+        # Label -> 0/255 mask, one per color (only possible for 8-bit labels)
+        self.plane_luts = {}
+        if self.dtype == np.uint8:
+            values = np.arange(256, dtype=np.uint8)
+            for color_name, bits in self.color_bits.items():
+                self.plane_luts[color_name] = np.where(values & bits, 255, 0).astype(np.uint8)
+
+        self.num_boxes = len(boxes)
+        self._channels = None
+        self._scratch = None
+
+    def classify(self, hsv, dst=None):
+        """Label every pixel of an HSV image. Reuses internal buffers between calls."""
+        shape = hsv.shape[:2]
+        if self._scratch is None or self._scratch.shape != shape:
+            self._channels = [np.empty(shape, dtype=np.uint8) for _ in range(3)]
+            self._scratch = np.empty(shape, dtype=self.dtype)
+        if dst is None or dst.shape != shape or dst.dtype != self.dtype:
+            dst = np.empty(shape, dtype=self.dtype)
+
+        h, s, v = cv2.split(hsv, self._channels)
+        cv2.LUT(h, self.channel_luts[0], dst=dst)
+        cv2.LUT(s, self.channel_luts[1], dst=self._scratch)
+        cv2.bitwise_and(dst, self._scratch, dst=dst)
+        cv2.LUT(v, self.channel_luts[2], dst=self._scratch)
+        cv2.bitwise_and(dst, self._scratch, dst=dst)
+        return dst
+
+    def plane(self, labels, color_name):
+        """Binary 0/255 mask of one color from a label image (or a crop of one)."""
+        lut = self.plane_luts.get(color_name)
+        if lut is not None:
+            return cv2.LUT(labels, lut)
+        hit = (labels & self.dtype(self.color_bits[color_name])) != 0
+        return hit.astype(np.uint8) * 255
+
+    def color_rects(self, labels):
+        """
+        Bounding box (x, y, w, h) of every color present in the label image.
+        Colors with no pixels are left out.
+        """
+        row_bits = np.bitwise_or.reduce(labels, axis=1)
+        col_bits = np.bitwise_or.reduce(labels, axis=0)
+
+        rects = {}
+        for color_name, bits in self.color_bits.items():
+            rows = np.flatnonzero(row_bits & bits)
+            if len(rows) == 0:
+                continue
+            cols = np.flatnonzero(col_bits & bits)
+            x, y = int(cols[0]), int(rows[0])
+            rects[color_name] = (x, y, int(cols[-1]) - x + 1, int(rows[-1]) - y + 1)
+        return rects
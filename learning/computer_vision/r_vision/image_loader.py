@@ -0,0 +1,147 @@
+"""
+Image Loader
+Decode dataset images at the size they will be used, and only once.
+
+The datasets are full-size phone JPEGs (2016x1512 up to 2856x2142) and a
+decode costs 25-45 ms. The 800 px lessons then threw most of those pixels
+away with cv2.resize, and a parameter sweep decoded the same pair again for
+every setting.
+
+When the target width is known, load() reads the image size from the JPEG
+header and decodes with IMREAD_REDUCED_COLOR_2/4/8 (libjpeg's DCT-domain
+scaling) at the largest reduction that still leaves at least that width,
+then resizes the rest of the way with INTER_AREA. Results go into an LRU
+cache bounded by total bytes and keyed by (path, mtime, size, width), so
+an edited file is decoded again. Cached images are shared between callers
+and marked read-only; copy one before drawing on it.
+
+Usage:
+    img = load_image('datasets/raw/IMG_0096.jpg', width=800)   # shared default cache
+    loader = ImageLoader(max_bytes=256 * 2**20)
+    img = loader.load(path)                                    # full size
+    print(loader.hits, loader.misses)
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import collections
+import os
+import struct
+
+import cv2
+
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+REDUCED_FLAGS = [            # (factor, flag), largest reduction first
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+    (1, cv2.IMREAD_COLOR),
+]
+
+# Start-of-frame markers carry the image size (C4, C8 and CC are other segments)
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(path):
+    """(width, height) from a JPEG's frame header, or None if it is not a readable JPEG."""
+    with open(path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return None
+        while True:
+            header = f.read(4)
+            if len(header) < 4 or header[0] != 0xFF:
+                return None
+            marker, length = header[1], struct.unpack('>H', header[2:])[0]
+            if marker in _SOF_MARKERS:
+                data = f.read(5)
+                if len(data) < 5:
+                    return None
+                height, width = struct.unpack('>HH', data[1:])
+                return width, height
+            f.seek(length - 2, os.SEEK_CUR)
+
+
+def reduction_factor(source_width, width):
+    """Largest decoder reduction that keeps at least width pixels across."""
+    for factor, _ in REDUCED_FLAGS:
+        if source_width // factor >= width:
+            return factor
+    return 1
+
+
+class ImageLoader:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.cache = collections.OrderedDict()   # key -> read-only image, oldest first
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path, width=None):
+        """
+        The image at path, width pixels wide (aspect kept) or full size if
+        width is None. Returns None if it cannot be read, like cv2.imread.
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, width)
+        image = self.cache.get(key)
+        if image is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return image
+
+        self.misses += 1
+        image = self.decode(path, width)
+        if image is None:
+            return None
+        image.flags.writeable = False
+        self.store(key, image)
+        return image
+
+    def decode(self, path, width=None):
+        if width is None:
+            return cv2.imread(path)
+
+        size = jpeg_size(path) if path.lower().endswith(('.jpg', '.jpeg')) else None
+        factor = reduction_factor(size[0], width) if size else 1
+        image = None
+        for f, flag in REDUCED_FLAGS:
+            if f > factor:
+                continue
+            image = cv2.imread(path, flag)
+            # EXIF rotation can swap the header's width and height; reduce less then
+            if image is None or image.shape[1] >= width or f == 1:
+                break
+        if image is None:
+            return None
+
+        h, w = image.shape[:2]
+        if w != width:
+            image = cv2.resize(image, (width, int(h * width / w)), interpolation=cv2.INTER_AREA)
+        return image
+
+    def store(self, key, image):
+        if image.nbytes > self.max_bytes:
+            return
+        self.cache[key] = image
+        self.bytes += image.nbytes
+        while self.bytes > self.max_bytes:
+            _, evicted = self.cache.popitem(last=False)
+            self.bytes -= evicted.nbytes
+
+    def clear(self):
+        self.cache.clear()
+        self.bytes = 0
+
+
+default_loader = ImageLoader()
+
+
+def load_image(path, width=None):
+    """ImageLoader.load on the process-wide default cache."""
+    return default_loader.load(path, width)
@@ -0,0 +1,320 @@
+"""
+Pipeline Instrumentation
+Spans, counters and gauges for the vision pipeline stages, with pluggable collectors.
+
+A print() per obstacle costs real time on a headless Pi over SSH and gives
+no numbers anyone can aggregate. The stages instead record:
+
+    span(name)          wall time of a block (monotonic clock, milliseconds)
+    count(name, n)      per-frame counters: detections, obstacles, skipped ROIs
+    gauge(name, value)  last value in the frame: nearest depth, process_ms
+    debug(fmt, *args)   human-readable lines, formatted only when a DebugSink is attached
+
+end_frame() hands the frame's record to every collector:
+
+    HistogramCollector   in-memory log-bucketed histograms (p50/p95/p99 per span)
+    SummaryCollector     one summary line every few seconds
+    JSONLinesExporter    one JSON object per frame, for offline analysis
+
+With no collectors and no debug sink every call returns straight away, and
+span() hands back a shared no-op context manager without reading the clock.
+
+Usage:
+    instrumentation = Instrumentation([SummaryCollector(interval_s=5)], DebugSink())
+    pipeline = HSVStereoPipeline(15.24, instrumentation=instrumentation)
+
+    with instrumentation.span('stage1'):
+        ...
+    instrumentation.count('detections', len(detections))
+    instrumentation.end_frame()
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import bisect
+import json
+import math
+import sys
+import time
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('instrumentation', 'name', 'start')
+
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+
+    def __enter__(self):
+        self.start = self.instrumentation.clock()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed_ms = (self.instrumentation.clock() - self.start) * 1000.0
+        self.instrumentation.record_span(self.name, elapsed_ms)
+        return False
+
+
+class Instrumentation:
+    def __init__(self, collectors=(), debug_sink=None, clock=time.monotonic):
+        self.collectors = list(collectors)
+        self.debug_sink = debug_sink
+        self.clock = clock
+        self.enabled = bool(self.collectors)
+        self.debugging = debug_sink is not None
+        self.frame_index = 0
+        self.spans = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return _Span(self, name)
+
+    def record_span(self, name, elapsed_ms):
+        # A span entered twice in one frame reports its total
+        self.spans[name] = self.spans.get(name, 0.0) + elapsed_ms
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value):
+        if self.enabled:
+            self.gauges[name] = value
+
+    def debug(self, message, *args):
+        """Write message.format(*args) to the debug sink, if there is one."""
+        if self.debugging:
+            self.debug_sink.write(message.format(*args) if args else message)
+
+    def banner(self, title):
+        if self.debugging:
+            self.debug_sink.write("\n" + "="*70 + "\n" + title + "\n" + "="*70)
+
+    def end_frame(self):
+        """Hand this frame's spans, counters and gauges to the collectors and start the next."""
+        if not self.enabled:
+            return
+        record = {
+            'frame': self.frame_index,
+            'time': self.clock(),
+            'spans': self.spans,
+            'counters': self.counters,
+            'gauges': self.gauges,
+        }
+        for collector in self.collectors:
+            collector.add(record)
+        self.frame_index += 1
+        self.spans = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def close(self):
+        for collector in self.collectors:
+            collector.close()
+
+
+class Histogram:
+    """
+    Fixed log-spaced buckets, so memory stays constant on a long run.
+    Percentiles are the upper edge of the bucket holding that rank
+    (within about 6% of the true value at 40 buckets per decade).
+    """
+
+    def __init__(self, low=0.01, high=100000.0, per_decade=40):
+        decades = math.log10(high / low)
+        self.edges = [low * 10 ** (i / per_decade)
+                      for i in range(int(decades * per_decade) + 1)]
+        self.buckets = [0] * (len(self.edges) + 1)
+        self.n = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.buckets[bisect.bisect_left(self.edges, value)] += 1
+        self.n += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def percentile(self, q):
+        if not self.n:
+            return None
+        rank = max(1, math.ceil(self.n * q / 100.0))
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                if i == len(self.edges):
+                    return self.max
+                return min(self.edges[i], self.max)
+        return self.max
+
+    @property
+    def mean(self):
+        return self.total / self.n if self.n else None
+
+
+class HistogramCollector:
+    """Span histograms, counter totals and last gauge values, kept in memory."""
+
+    def __init__(self):
+        self.histograms = {}
+        self.totals = {}
+        self.gauges = {}
+        self.frames = 0
+
+    def add(self, record):
+        self.frames += 1
+        for name, elapsed_ms in record['spans'].items():
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.add(elapsed_ms)
+        for name, value in record['counters'].items():
+            self.totals[name] = self.totals.get(name, 0) + value
+        self.gauges.update(record['gauges'])
+
+    def summary(self):
+        """{span: {n, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}} over every frame seen."""
+        return {
+            name: {
+                'n': histogram.n,
+                'mean_ms': histogram.mean,
+                'p50_ms': histogram.percentile(50),
+                'p95_ms': histogram.percentile(95),
+                'p99_ms': histogram.percentile(99),
+                'max_ms': histogram.max,
+            }
+            for name, histogram in self.histograms.items()
+        }
+
+    def close(self):
+        pass
+
+
+class SummaryCollector:
+    """One line every interval_s seconds: fps, mean span times and counters per frame."""
+
+    def __init__(self, interval_s=5.0, out=None):
+        self.interval_s = interval_s
+        self.out = out
+        self._reset(None)
+
+    def _reset(self, start):
+        self.start = start              # End time of the frame before this window
+        self.last_time = start
+        self.frames = 0
+        self.frames_timed = 0           # Frames that ended inside the window
+        self.span_totals = {}
+        self.counter_totals = {}
+        self.gauges = {}
+
+    def add(self, record):
+        self.frames += 1
+        for name, elapsed_ms in record['spans'].items():
+            self.span_totals[name] = self.span_totals.get(name, 0.0) + elapsed_ms
+        for name, value in record['counters'].items():
+            self.counter_totals[name] = self.counter_totals.get(name, 0) + value
+        self.gauges.update(record['gauges'])
+
+        if self.start is None:
+            # The very first frame has no predecessor to time it from
+            self.start = record['time']
+        else:
+            self.frames_timed += 1
+        self.last_time = record['time']
+
+        elapsed = self.last_time - self.start
+        if elapsed > 0 and elapsed >= self.interval_s:
+            self.emit(elapsed)
+            self._reset(self.last_time)
+
+    def format_line(self, elapsed):
+        fps = self.frames_timed / elapsed if elapsed > 0 else 0.0
+        parts = [f"{fps:.1f} fps"]
+        parts += [f"{name} {total / self.frames:.1f}ms" for name, total in self.span_totals.items()]
+        line = " | ".join(parts)
+        if self.counter_totals:
+            line += " | " + " ".join(f"{name}={total / self.frames:.1f}"
+                                     for name, total in self.counter_totals.items())
+        if self.gauges:
+            line += " | " + " ".join(f"{name}={value:.1f}" if isinstance(value, float)
+                                     else f"{name}={value}"
+                                     for name, value in self.gauges.items())
+        return line
+
+    def emit(self, elapsed):
+        print(self.format_line(elapsed), file=self.out or sys.stdout, flush=True)
+
+    def close(self):
+        # Flush the partial interval
+        if self.frames:
+            self.emit(self.last_time - self.start)
+            self._reset(self.last_time)
+
+
+class JSONLinesExporter:
+    """Append one JSON object per frame to a file (path or open file object)."""
+
+    def __init__(self, path_or_file):
+        if hasattr(path_or_file, 'write'):
+            self.file = path_or_file
+            self.owns_file = False
+        else:
+            self.file = open(path_or_file, 'a')
+            self.owns_file = True
+
+    def add(self, record):
+        self.file.write(json.dumps(record) + "\n")
+
+    def close(self):
+        self.file.flush()
+        if self.owns_file:
+            self.file.close()
+
+
+class DebugSink:
+    """Print debug lines (the old per-stage and per-obstacle output)."""
+
+    def __init__(self, out=None):
+        self.out = out
+
+    def write(self, line):
+        print(line, file=self.out or sys.stdout)
+
+
+def add_instrumentation_arguments(parser):
+    parser.add_argument('--debug', action='store_true',
+                        help="Print per-stage and per-obstacle details")
+    parser.add_argument('--stats', type=float, default=None, metavar='SECONDS',
+                        help="Print a timing summary line every SECONDS")
+    parser.add_argument('--metrics', default=None, metavar='PATH',
+                        help="Append per-frame spans/counters/gauges to a JSON-lines file")
+
+
+def instrumentation_from_args(args):
+    """Instrumentation from add_instrumentation_arguments() arguments."""
+    collectors = []
+    if args.stats:
+        collectors.append(SummaryCollector(interval_s=args.stats))
+    if args.metrics:
+        collectors.append(JSONLinesExporter(args.metrics))
+    return Instrumentation(collectors, DebugSink() if args.debug else None)
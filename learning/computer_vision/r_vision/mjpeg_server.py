@@ -0,0 +1,276 @@
+"""
+MJPEG Debug Stream Server
+Watch any render mode in a browser while the robot runs headless.
+
+The robot is driven over SSH, so cv2.imshow has no screen to draw on. This
+serves named streams (one per render mode) as multipart MJPEG over plain
+HTTP from the standard library:
+
+    http://<pi>:8080/              index with a link per stream
+    http://<pi>:8080/stream/<name> multipart/x-mixed-replace MJPEG
+    http://<pi>:8080/snapshot/<name>.jpg   the latest frame
+
+The vision loop never waits on a browser. publish() JPEG-encodes a frame
+once, however many clients watch that stream, and appends the bytes to
+each client's short queue; a client that falls behind loses its oldest
+frames. due() tells the loop whether a stream is watched and its display
+interval (max_fps) has passed, so unwatched modes are not even rendered
+and the display rate stays independent of the processing rate.
+
+Usage:
+    python mjpeg_server.py --source synthetic [--port 8080] [--fps 10]
+
+    server = MJPEGServer(port=8080, max_fps=10).start()
+    while True:
+        ...
+        if server.due('1'):
+            server.publish('1', render_mode_1())
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import collections
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+BOUNDARY = 'frame'
+KEEPALIVE_S = 1.0   # Resend the latest frame this often while a stream is idle
+
+
+class _Client:
+    def __init__(self, name, queue_size):
+        self.name = name
+        self.queue = collections.deque(maxlen=queue_size)
+        self.dropped = 0
+
+
+class _StreamHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server.mjpeg
+        path = self.path.split('?')[0].rstrip('/')
+        if path == '':
+            self._send(200, 'text/html', server.index_html().encode())
+        elif path.startswith('/snapshot/') and path.endswith('.jpg'):
+            jpeg = server.latest.get(path[len('/snapshot/'):-len('.jpg')])
+            if jpeg is None:
+                self._send(404, 'text/plain', b'No frame yet\n')
+            else:
+                self._send(200, 'image/jpeg', jpeg)
+        elif path.startswith('/stream/'):
+            self._stream(server, path[len('/stream/'):])
+        else:
+            self._send(404, 'text/plain', b'Not found\n')
+
+    def _send(self, status, content_type, body):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, server, name):
+        self.send_response(200)
+        self.send_header('Content-Type', f'multipart/x-mixed-replace; boundary={BOUNDARY}')
+        self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+
+        client = server.add_client(name)
+        try:
+            while True:
+                jpeg = server.next_frame(client, KEEPALIVE_S)
+                if jpeg is None:
+                    if not server.running:
+                        break
+                    continue
+                self.wfile.write(f'--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n'
+                                 f'Content-Length: {len(jpeg)}\r\n\r\n'.encode())
+                self.wfile.write(jpeg)
+                self.wfile.write(b'\r\n')
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            server.remove_client(client)
+
+    def log_message(self, format, *args):
+        pass   # One line per request would flood the SSH session
+
+
+class MJPEGServer:
+    def __init__(self, host='0.0.0.0', port=8080, max_fps=10.0, quality=80,
+                 queue_size=2, streams=(), clock=time.monotonic):
+        self.host = host
+        self.port = port
+        self.interval = 1.0 / max_fps if max_fps else 0.0
+        self.encode_params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.queue_size = queue_size
+        self.streams = list(streams)        # Names listed on the index page
+        self.clock = clock
+        self.condition = threading.Condition()
+        self.clients = []
+        self.latest = {}                    # name -> latest JPEG bytes
+        self.last_publish = {}              # name -> (time, key)
+        self.running = False
+        self.httpd = None
+        self.thread = None
+
+        self.encoded = 0
+        self.dropped = 0                    # Frames slow clients never got
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer((self.host, self.port), _StreamHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.mjpeg = self
+        self.port = self.httpd.server_address[1]   # Resolves port 0
+        self.running = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever,
+                                       name='mjpeg-server', daemon=True)
+        self.thread.start()
+        return self
+
+    @property
+    def url(self):
+        host = 'localhost' if self.host in ('', '0.0.0.0') else self.host
+        return f'http://{host}:{self.port}/'
+
+    def index_html(self):
+        names = self.streams or sorted(self.latest)
+        links = ''.join(f'<li><a href="/stream/{n}">{n}</a></li>' for n in names)
+        return f'<html><body><h3>r_vision debug streams</h3><ul>{links}</ul></body></html>'
+
+    # =========================================================================
+    # Vision loop side
+    # =========================================================================
+
+    def watched(self):
+        """Names of the streams that have at least one client."""
+        with self.condition:
+            return {client.name for client in self.clients}
+
+    def due(self, name, key=None):
+        """
+        True if someone watches name and its display interval has passed.
+        key identifies the frame content (e.g. a RenderCache version); an
+        unchanged key is never due, so a still image is encoded only once.
+        """
+        with self.condition:
+            if not any(client.name == name for client in self.clients):
+                return False
+        last = self.last_publish.get(name)
+        if last is None:
+            return True
+        if key is not None and key == last[1]:
+            return False
+        return self.clock() - last[0] >= self.interval
+
+    def publish(self, name, image, key=None):
+        """Encode image once and queue it for every client of stream name."""
+        ok, buffer = cv2.imencode('.jpg', image, self.encode_params)
+        if not ok:
+            return False
+        jpeg = buffer.tobytes()
+        self.last_publish[name] = (self.clock(), key)
+        with self.condition:
+            self.encoded += 1
+            self.latest[name] = jpeg
+            for client in self.clients:
+                if client.name != name:
+                    continue
+                if len(client.queue) == client.queue.maxlen:
+                    client.dropped += 1
+                    self.dropped += 1
+                client.queue.append(jpeg)
+            self.condition.notify_all()
+        return True
+
+    # =========================================================================
+    # HTTP side
+    # =========================================================================
+
+    def add_client(self, name):
+        client = _Client(name, self.queue_size)
+        with self.condition:
+            if name in self.latest:
+                client.queue.append(self.latest[name])   # Show something straight away
+            self.clients.append(client)
+        return client
+
+    def remove_client(self, client):
+        with self.condition:
+            if client in self.clients:
+                self.clients.remove(client)
+
+    def next_frame(self, client, timeout):
+        """Oldest queued frame for client; the latest frame again after timeout idle seconds."""
+        with self.condition:
+            self.condition.wait_for(lambda: client.queue or not self.running, timeout=timeout)
+            if client.queue:
+                return client.queue.popleft()
+            if not self.running:
+                return None
+            return self.latest.get(client.name)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'clients': len(self.clients),
+                'encoded': self.encoded,
+                'dropped': self.dropped,
+            }
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.httpd is not None:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+            self.thread.join(timeout=1.0)
+            self.httpd = None
+
+
+def add_server_arguments(parser):
+    parser.add_argument('--serve', type=int, default=None, metavar='PORT',
+                        help="Run headless and stream the render modes as MJPEG on PORT")
+    parser.add_argument('--display-fps', type=float, default=10.0,
+                        help="Max frames per second sent to each stream (with --serve)")
+
+
+def main():
+    import argparse
+
+    from frame_sources import add_source_arguments, open_source
+
+    parser = argparse.ArgumentParser(description="Stream a frame source as MJPEG over HTTP")
+    add_source_arguments(parser, default='camera:1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--fps', type=float, default=10.0, help="Max display frame rate")
+    args = parser.parse_args()
+
+    source = open_source(args.source, speed=args.speed if args.speed is not None else 1.0)
+    server = MJPEGServer(port=args.port, max_fps=args.fps, streams=['camera']).start()
+    print(f"✓ Streaming {args.source} at {server.url}stream/camera (Ctrl+C to stop)")
+    frames = 0
+    try:
+        while True:
+            ok, frame, _ = source.read()
+            if not ok:
+                break
+            frames += 1
+            if server.due('camera'):
+                server.publish('camera', frame[0] if source.stereo else frame)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        source.release()
+    stats = server.stats()
+    print(f"✓ {frames} frames read, {stats['encoded']} encoded, {stats['dropped']} dropped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Obstacle Tracker
+Follow stage 2 obstacles across frames, so stages 3 and 4 only run on the
+ones that are new or changed.
+
+Every frame used to rediscover its obstacles and rerun Canny, contours and
+SGBM for every merged box, even when the robot and the floor were standing
+still. ObstacleTracker sits between stage 2 and stage 3:
+
+    1. Predict every track one frame ahead (constant-velocity Kalman filter
+       on the box center, random walk on its size).
+    2. Match this frame's boxes to the predictions by IoU, best pairs first.
+       Unmatched boxes start new tracks; tracks unmatched for more than
+       max_missed frames are dropped.
+    3. Schedule stages 3-4 for an obstacle when its track is new, its box
+       moved more than move_px or changed size by more than resize_ratio
+       since the last refresh, or its depth is older than depth_max_age
+       frames. Every other obstacle reuses its track's last results.
+
+Obstacles are ObstacleArrays. A reused obstacle keeps the box its results
+were computed for (bbox, center, contours, edges, disparity and depth all
+line up), while its detections come from this frame. Every obstacle gets
+the track_id, velocity (px/frame) and confidence (0-1, grows with hits,
+drops with misses) columns.
+
+Usage:
+    pipeline.tracker = ObstacleTracker()
+    result = pipeline.process(left, right)      # stages 3-4 on changed obstacles only
+
+    obstacles, stale = tracker.update(pipeline.obstacle_arrays)
+    refreshed = run_stages_3_and_4(obstacles.take(stale))
+    tracker.refreshed(refreshed)
+    obstacles.assign(stale, refreshed)
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import itertools
+
+import numpy as np
+
+from detection_arrays import STAGE3_FIELDS, STAGE4_FIELDS, ObstacleArrays
+from spatial_index import box_iou
+
+# Record fields reused (with every payload) while a track holds still: the box
+# stages 3 and 4 ran on and what they computed for it
+REUSED_FIELDS = ('bbox', 'center') + STAGE3_FIELDS + STAGE4_FIELDS
+
+
+class KalmanBox:
+    """Constant-velocity Kalman filter over [cx, cy, w, h, vx, vy]."""
+
+    F = np.eye(6)
+    F[0, 4] = F[1, 5] = 1.0
+    H = np.eye(4, 6)
+
+    def __init__(self, bbox, position_noise=1.0, velocity_noise=0.5, measurement_noise=2.0):
+        x, y, w, h = bbox
+        self.x = np.array([x + w / 2.0, y + h / 2.0, w, h, 0.0, 0.0])
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 100.0, 100.0])
+        self.Q = np.diag([position_noise] * 4 + [velocity_noise] * 2)
+        self.R = np.eye(4) * measurement_noise ** 2
+
+    def predict(self):
+        self.x = self.F @ self.x
+        self.P = self.F @ self.P @ self.F.T + self.Q
+
+    def correct(self, bbox):
+        x, y, w, h = bbox
+        z = np.array([x + w / 2.0, y + h / 2.0, w, h])
+        S = self.H @ self.P @ self.H.T + self.R
+        K = self.P @ self.H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ (z - self.H @ self.x)
+        self.P = (np.eye(6) - K @ self.H) @ self.P
+
+    @property
+    def bbox(self):
+        cx, cy, w, h = self.x[:4]
+        return (int(round(cx - w / 2)), int(round(cy - h / 2)),
+                max(1, int(round(w))), max(1, int(round(h))))
+
+    @property
+    def velocity(self):
+        return (float(self.x[4]), float(self.x[5]))
+
+
+class Track:
+    def __init__(self, track_id, bbox, frame):
+        self.id = track_id
+        self.kalman = KalmanBox(bbox)
+        self.hits = 1
+        self.missed = 0
+        self.snapshot = None          # Obstacle as stages 3-4 last left it (one-row ObstacleArrays)
+        self.refresh_frame = frame
+
+    def confidence(self, min_hits):
+        return min(1.0, self.hits / float(min_hits)) / (1 + self.missed)
+
+
+class ObstacleTracker:
+    def __init__(self, iou_threshold=0.3, max_missed=3, move_px=4, resize_ratio=0.1,
+                 depth_max_age=15, min_hits=3):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.move_px = move_px
+        self.resize_ratio = resize_ratio
+        self.depth_max_age = depth_max_age
+        self.min_hits = min_hits
+        self.tracks = []
+        self.frame = 0
+        self.ids = itertools.count(1)
+        self.scheduled = 0            # Obstacles sent to stages 3-4, all frames
+        self.reused = 0
+
+    def associate(self, boxes):
+        """Greedy (track index, box index) matches at IoU >= iou_threshold, best first."""
+        scored = []
+        for t, track in enumerate(self.tracks):
+            predicted = track.kalman.bbox
+            for b, box in enumerate(boxes):
+                iou = box_iou(predicted, box)
+                if iou >= self.iou_threshold:
+                    scored.append((iou, t, b))
+        scored.sort(reverse=True)
+
+        matches = []
+        used_tracks, used_boxes = set(), set()
+        for _, t, b in scored:
+            if t not in used_tracks and b not in used_boxes:
+                matches.append((t, b))
+                used_tracks.add(t)
+                used_boxes.add(b)
+        return matches
+
+    def update(self, obstacles):
+        """
+        Track this frame's stage 2 obstacles. Returns (obstacles, stale): a
+        copy with the track columns set and reused obstacles already filled
+        in, and the indices of the ones that still need stages 3 and 4.
+        """
+        self.frame += 1
+        for track in self.tracks:
+            track.kalman.predict()
+
+        boxes = obstacles.records['bbox'].tolist()
+        track_of = {}
+        for t, b in self.associate(boxes):
+            track = self.tracks[t]
+            track.kalman.correct(boxes[b])
+            track.hits += 1
+            track.missed = 0
+            track_of[b] = track
+
+        for track in self.tracks:
+            if track not in track_of.values():
+                track.missed += 1
+        self.tracks = [track for track in self.tracks if track.missed <= self.max_missed]
+
+        n = len(boxes)
+        track_ids = np.zeros(n, np.int32)
+        velocity = np.zeros((n, 2))
+        confidence = np.zeros(n)
+        stale, reused, snapshots = [], [], []
+        for b, bbox in enumerate(boxes):
+            track = track_of.get(b)
+            if track is None:
+                track = Track(next(self.ids), bbox, self.frame)
+                self.tracks.append(track)
+            track_ids[b] = track.id
+            velocity[b] = track.kalman.velocity
+            confidence[b] = track.confidence(self.min_hits)
+
+            if self.needs_refresh(track, bbox):
+                stale.append(b)
+            else:
+                reused.append(b)
+                snapshots.append(track.snapshot)
+
+        obstacles = obstacles.copy()
+        obstacles.records['track_id'] = track_ids
+        obstacles.records['velocity'] = velocity
+        obstacles.records['confidence'] = confidence
+        if reused:
+            obstacles.assign(reused, ObstacleArrays.stack(snapshots), REUSED_FIELDS)
+
+        self.scheduled += len(stale)
+        self.reused += len(reused)
+        return obstacles, np.array(stale, dtype=np.int64)
+
+    def needs_refresh(self, track, bbox):
+        if track.snapshot is None or self.frame - track.refresh_frame >= self.depth_max_age:
+            return True
+        x, y, w, h = bbox
+        px, py, pw, ph = track.snapshot.records['bbox'][0].tolist()
+        moved = max(abs((x + w / 2.0) - (px + pw / 2.0)), abs((y + h / 2.0) - (py + ph / 2.0)))
+        resized = max(abs(w - pw) / float(pw), abs(h - ph) / float(ph))
+        return moved > self.move_px or resized > self.resize_ratio
+
+    def refreshed(self, obstacles):
+        """Record stage 3-4 results for the obstacles update() returned as stale."""
+        tracks = {track.id: track for track in self.tracks}
+        for k, track_id in enumerate(obstacles.records['track_id'].tolist()):
+            track = tracks.get(track_id)
+            if track is not None:
+                track.snapshot = obstacles.take([k])
+                track.refresh_frame = self.frame
+
+    def reset(self):
+        self.tracks = []
+        self.frame = 0
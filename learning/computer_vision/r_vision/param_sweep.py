@@ -0,0 +1,353 @@
+"""
+Parameter Sweep
+Grid or random search over pipeline parameters, in parallel, over a dataset.
+
+Tuning used to be one full pipeline run per hand edit ("S > 120 kills the
+Rug"). This runs every configuration of a search over every frame of a
+source and writes one results row per configuration.
+
+Parameters are pipeline attributes, with dots reaching into dicts and
+arrays:
+
+    color_ranges.yellow.lower.1     yellow's lower saturation bound
+    merge_margin_x  roi_padding  canny_threshold1  block_size
+    sgbm_params.uniquenessRatio
+
+Each parameter belongs to the first stage that reads it (PARAM_STAGES,
+from HSVStereoPipeline.STAGE_PARAMS). Configurations are grouped by their
+stage 1 values and evaluated through the pipeline's stage graph, which
+only reruns a stage when its own parameters or an upstream output change.
+Stage 3 (contours) and stage 4 (depth) both start from the stage 2
+obstacles, so a Canny sweep never reruns stereo matching and vice versa.
+Work is spread over a process pool as (stage 1 group, frame) tasks; each
+worker opens the source once (a packed frame store is shared, not copied).
+
+With --labels (JSON: {"<pair index>": [[x, y, w, h], ...]}) each row is
+scored by box F1 of its obstacles against the labels at IoU >= 0.5.
+Without labels the table reports counts only and has no score.
+
+Usage:
+    python param_sweep.py --source store:datasets/packed/raw \\
+        --grid canny_threshold1=30,50,80 --grid color_ranges.yellow.lower.1=50,70,90 \\
+        [--random 50 --grid roi_padding=5:30] [--labels labels.json] [--workers 4] \\
+        [--pipeline gemini --width 800] [--output benchmarks/results/sweep.csv]
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import argparse
+import copy
+import csv
+import itertools
+import multiprocessing
+import os
+import random
+import time
+
+from frame_sources import SOURCE_HELP, open_source
+from hsv_bounded_stereo_lesson import HSVStereoPipeline, proposal_agreement
+
+# Stage number (1-4) of every parameter, from the pipeline's stage graph
+PARAM_STAGES = {name: 1 if stage == 'frame' else int(stage[-1])
+                for stage, names in reversed(HSVStereoPipeline.STAGE_PARAMS.items())
+                for name in names}
+
+METRICS = ['detections', 'obstacles', 'contours', 'with_depth']
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..'))
+
+
+def param_stage(path):
+    stage = PARAM_STAGES.get(path.split('.')[0])
+    if stage is None:
+        raise ValueError(f"Unknown sweep parameter '{path}'")
+    return stage
+
+
+def make_pipeline(name, baseline_cm):
+    if name == 'gemini':
+        from hsv_bounded_stereo_lesson_gemini import GeminiHSVStereoPipeline
+        return GeminiHSVStereoPipeline(baseline_cm)
+    return HSVStereoPipeline(baseline_cm)
+
+
+def set_param(pipeline, path, value):
+    """Set a dotted parameter; numeric parts index arrays and lists."""
+    parts = path.split('.')
+    if len(parts) == 1:
+        setattr(pipeline, path, value)
+        return
+    target = getattr(pipeline, parts[0])
+    for part in parts[1:-1]:
+        target = target[int(part)] if part.isdigit() else target[part]
+    last = parts[-1]
+    target[int(last) if last.isdigit() else last] = value
+
+
+class Evaluator:
+    """Runs configurations over frames with one pipeline, reusing stage outputs."""
+
+    # Enough memoized results per stage to cover a grid's later-stage combinations
+    CACHE_SIZE = 64
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.graph = pipeline.stage_graph(cache_size=self.CACHE_SIZE)
+        self.defaults = {name: copy.deepcopy(getattr(pipeline, name)) for name in PARAM_STAGES
+                         if hasattr(pipeline, name)}
+        self.changed = set()          # Attributes the last configuration set
+
+    @property
+    def stage_runs(self):
+        return [self.graph.runs[f'stage{n}'] for n in range(1, 5)]
+
+    def apply(self, config):
+        """
+        Undo the previous configuration, then set this one. Only attributes a
+        configuration touched are restored, so values the pipeline derives per
+        frame (Gemini's focal_length) are left alone.
+        """
+        pipeline = self.pipeline
+        for name in self.changed & self.defaults.keys():
+            setattr(pipeline, name, copy.deepcopy(self.defaults[name]))
+        for path, value in config.items():
+            set_param(pipeline, path, value)
+        self.changed = {path.split('.')[0] for path in config}
+
+    def run_frame(self, left, right, configs, labels=None):
+        """Per-config metric dicts for one frame; configs share their stage 1 values."""
+        graph = self.graph
+        graph.set_input('pair', (left, right))
+        results = []
+        for config in configs:
+            self.apply(config)
+            obstacles = graph.get('stage2')
+            metrics = {'detections': len(graph.get('stage1')[0]), 'obstacles': len(obstacles),
+                       'contours': int(graph.get('stage3').records['num_contours'].sum()),
+                       'with_depth': int(graph.get('stage4').records['has_depth'].sum())}
+            if labels is not None:
+                agreement = proposal_agreement(
+                    [{'color': None, 'bbox': tuple(box), 'area': box[2] * box[3]}
+                     for box in labels],
+                    [{'color': None, 'bbox': tuple(box), 'area': box[2] * box[3]}
+                     for box in obstacles.records['bbox'].tolist()])
+                metrics['matched'] = agreement['matched']
+                metrics['labels'] = agreement['reference']
+            results.append(metrics)
+        return results
+
+
+def stage_keys(config):
+    """Hashable parameter values per stage (1-4), each including everything it depends on."""
+    by_stage = {1: [], 2: [], 3: [], 4: []}
+    for path in sorted(config):
+        by_stage[param_stage(path)].append((path, repr(config[path])))
+    s1 = tuple(by_stage[1])
+    s2 = (s1, tuple(by_stage[2]))
+    return s1, s2, tuple(by_stage[3]), tuple(by_stage[4])
+
+
+def parse_values(text):
+    """'a,b,c' -> list of values, 'lo:hi' -> (lo, hi) range for random search."""
+    def number(value):
+        for cast in (int, float):
+            try:
+                return cast(value)
+            except ValueError:
+                pass
+        return value
+
+    if ':' in text and ',' not in text:
+        lo, hi = (number(v) for v in text.split(':', 1))
+        return (lo, hi)
+    return [number(v) for v in text.split(',')]
+
+
+def build_configs(space, samples=0, seed=0):
+    """
+    Every grid combination of space ({path: [values]}), or samples random
+    configurations drawing lists by choice and (lo, hi) ranges uniformly.
+    """
+    for path in space:
+        param_stage(path)
+    paths = sorted(space)
+    if not samples:
+        if any(isinstance(space[p], tuple) for p in paths):
+            raise ValueError("lo:hi ranges need --random")
+        return [dict(zip(paths, values)) for values in itertools.product(*(space[p] for p in paths))]
+
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(samples):
+        config = {}
+        for path in paths:
+            values = space[path]
+            if isinstance(values, list):
+                config[path] = rng.choice(values)
+            elif all(isinstance(v, int) for v in values):
+                config[path] = rng.randint(*values)
+            else:
+                config[path] = rng.uniform(*values)
+        configs.append(config)
+    return configs
+
+
+def group_configs(configs):
+    """Config indices grouped by stage 1 values, sorted so later stages repeat less."""
+    groups = {}
+    for i, config in enumerate(configs):
+        groups.setdefault(stage_keys(config)[0], []).append(i)
+    return [sorted(indices, key=lambda i: stage_keys(configs[i])[1:]) for indices in groups.values()]
+
+
+# =============================================================================
+# Worker side
+# =============================================================================
+
+_worker = None      # (evaluator, frames, labels) in each pool process
+
+
+def load_frames(spec, width=None, max_frames=0):
+    frames = []
+    with open_source(spec, stereo=True, width=width) as source:
+        for pair, _ in source:
+            frames.append(pair)
+            if max_frames and len(frames) >= max_frames:
+                break
+    return frames
+
+
+def init_worker(spec, width, max_frames, pipeline_name, baseline_cm, labels):
+    global _worker
+    _worker = (Evaluator(make_pipeline(pipeline_name, baseline_cm)),
+               load_frames(spec, width, max_frames), labels)
+
+
+def run_task(task):
+    """One (group configs, frame index) task -> (config indices, metrics, stage runs)."""
+    indices, configs, frame_index = task
+    evaluator, frames, labels = _worker
+    before = list(evaluator.stage_runs)
+    left, right = frames[frame_index]
+    frame_labels = labels.get(str(frame_index), []) if labels is not None else None
+    metrics = evaluator.run_frame(left, right, configs, frame_labels)
+    return indices, metrics, [a - b for a, b in zip(evaluator.stage_runs, before)]
+
+
+# =============================================================================
+# Sweep
+# =============================================================================
+
+def sweep(spec, configs, workers=1, width=None, max_frames=0, pipeline='hsv',
+          baseline_cm=15.24, labels=None):
+    """Run configs over a source's frames and return (rows, stage runs, num frames)."""
+    init_args = (spec, width, max_frames, pipeline, baseline_cm, labels)
+    num_frames = len(load_frames(spec, width, max_frames))
+    tasks = [(indices, [configs[i] for i in indices], f)
+             for indices in group_configs(configs) for f in range(num_frames)]
+
+    totals = [dict.fromkeys(METRICS + ['matched', 'labels'], 0) for _ in configs]
+    stage_runs = [0, 0, 0, 0]
+
+    if workers > 1:
+        with multiprocessing.Pool(workers, initializer=init_worker, initargs=init_args) as pool:
+            results = list(pool.imap_unordered(run_task, tasks))
+    else:
+        init_worker(*init_args)
+        results = [run_task(task) for task in tasks]
+
+    for indices, metrics, runs in results:
+        for i, frame_metrics in zip(indices, metrics):
+            for key, value in frame_metrics.items():
+                totals[i][key] += value
+        stage_runs = [a + b for a, b in zip(stage_runs, runs)]
+
+    rows = [score_row(config, total, num_frames, labels is not None)
+            for config, total in zip(configs, totals)]
+    return rows, stage_runs, num_frames
+
+
+def score_row(config, total, num_frames, labelled):
+    row = dict(config)
+    for key in METRICS:
+        row[key + '_per_frame'] = total[key] / num_frames if num_frames else 0.0
+    row['depth_rate'] = total['with_depth'] / total['obstacles'] if total['obstacles'] else 0.0
+    row['score'] = None
+    if labelled:
+        recall = total['matched'] / total['labels'] if total['labels'] else 1.0
+        precision = total['matched'] / total['obstacles'] if total['obstacles'] else 1.0
+        row['recall'] = recall
+        row['precision'] = precision
+        row['score'] = (2 * recall * precision / (recall + precision)
+                        if recall + precision else 0.0)
+    return row
+
+
+def write_csv(rows, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    fields = list(dict.fromkeys(key for row in rows for key in row))
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main():
+    import json
+
+    parser = argparse.ArgumentParser(description="Parallel pipeline parameter sweep")
+    parser.add_argument('--source', default='images:' + os.path.join(REPO_ROOT, 'datasets', 'raw'),
+                        help=SOURCE_HELP)
+    parser.add_argument('--grid', action='append', default=[], metavar='PATH=VALUES',
+                        help="Values as a,b,c (or lo:hi with --random); repeat per parameter")
+    parser.add_argument('--random', type=int, default=0, metavar='N',
+                        help="Sample N random configurations instead of the full grid")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--labels', default=None, help="Ground truth boxes per pair (JSON)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--frames', type=int, default=0, help="Max pairs (0 = all)")
+    parser.add_argument('--width', type=int, default=None, help="Decode image files to this width")
+    parser.add_argument('--pipeline', choices=['hsv', 'gemini'], default='hsv')
+    parser.add_argument('--baseline', type=float, default=15.24, help="Stereo baseline (cm)")
+    parser.add_argument('--output', default=os.path.join(REPO_ROOT, 'benchmarks', 'results', 'sweep.csv'))
+    args = parser.parse_args()
+
+    space = {}
+    for item in args.grid:
+        path, _, values = item.partition('=')
+        if not values:
+            parser.error(f"--grid needs PATH=VALUES, got '{item}'")
+        space[path] = parse_values(values)
+    try:
+        configs = build_configs(space, args.random, args.seed)
+    except ValueError as e:
+        parser.error(str(e))
+
+    labels = None
+    if args.labels:
+        with open(args.labels) as f:
+            labels = json.load(f)
+
+    start = time.perf_counter()
+    rows, stage_runs, num_frames = sweep(args.source, configs, args.workers, args.width,
+                                         args.frames, args.pipeline, args.baseline, labels)
+    elapsed = time.perf_counter() - start
+    if labels is not None:
+        rows.sort(key=lambda row: -row['score'])
+    write_csv(rows, args.output)
+
+    naive = len(configs) * num_frames
+    print(f"✓ {len(configs)} configs x {num_frames} pairs in {elapsed:.1f}s "
+          f"({args.workers} workers)")
+    print(f"  stage runs {stage_runs} instead of {naive} each")
+    for row in rows[:10]:
+        params = ' '.join(f"{path}={row[path]}" for path in sorted(space))
+        score = f"score {row['score']:.3f} " if row['score'] is not None else ''
+        print(f"  {score}obstacles {row['obstacles_per_frame']:.1f} "
+              f"depth {row['depth_rate']:.2f}  {params}")
+    print(f"✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Stereo Rectification Map Cache
+Undistort and rectify the Camera Module 3 Wide pair before stereo matching.
+
+The 120° lenses have strong barrel distortion, and StereoSGBM/StereoBM
+assume rectified images (matching points on the same row). Building the
+rectify/undistort maps is expensive, so it is done once from the saved
+calibration and the maps are stored next to it in OpenCV's fixed-point form:
+
+    map1: CV_16SC2  - integer source x, y per pixel      (int16, H x W x 2)
+    map2: CV_16UC1  - index into the interpolation table (uint16, H x W)
+
+Later runs memory-map the .npy files instead of rebuilding them, and
+cv2.remap on fixed-point maps is several times faster than on float maps.
+Either a full frame or only a box of the rectified image can be produced,
+because the map slice for a box says where every output pixel comes from.
+
+Calibration file (written by calibrate_cameras.py):
+    calibration/camera_matrices/stereo_calibration.npz
+    keys: K1, D1, K2, D2, R, T, image_size (width, height)
+
+Usage:
+    python rectification.py build [--calibration PATH] [--alpha 0]
+    python rectification.py bench [--calibration PATH] [--frames 50]
+
+    rectifier = StereoRectifier.load()
+    left_rect, right_rect = rectifier.rectify_pair(left, right)
+    right_box = rectifier.rectify_roi('right', right, (x, y, w, h))
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+CALIBRATION_DIR = os.path.join(REPO_ROOT, 'calibration')
+DEFAULT_CALIBRATION = os.path.join(CALIBRATION_DIR, 'camera_matrices', 'stereo_calibration.npz')
+MAP_FILES = ('left_map1', 'left_map2', 'right_map1', 'right_map2')
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_maps_dir(calibration_path):
+    return os.path.join(os.path.dirname(calibration_path), 'rectify_maps')
+
+
+def build_maps(calibration_path, maps_dir, alpha=0.0):
+    """Compute fixed-point rectify maps from a calibration file and save them as .npy."""
+    calib = np.load(calibration_path)
+    width, height = (int(v) for v in calib['image_size'])
+    K1, D1, K2, D2 = calib['K1'], calib['D1'], calib['K2'], calib['D2']
+    R, T = calib['R'], calib['T']
+
+    R1, R2, P1, P2, Q, roi1, roi2 = cv2.stereoRectify(
+        K1, D1, K2, D2, (width, height), R, T,
+        flags=cv2.CALIB_ZERO_DISPARITY, alpha=alpha
+    )
+
+    os.makedirs(maps_dir, exist_ok=True)
+    maps = {}
+    maps['left_map1'], maps['left_map2'] = cv2.initUndistortRectifyMap(
+        K1, D1, R1, P1, (width, height), cv2.CV_16SC2)
+    maps['right_map1'], maps['right_map2'] = cv2.initUndistortRectifyMap(
+        K2, D2, R2, P2, (width, height), cv2.CV_16SC2)
+    for name in MAP_FILES:
+        np.save(os.path.join(maps_dir, name + '.npy'), maps[name])
+
+    meta = {
+        'source': os.path.relpath(calibration_path, maps_dir),
+        'source_sha1': file_sha1(calibration_path),
+        'alpha': alpha,
+        'image_size': [width, height],
+        'focal_length_px': float(P1[0, 0]),
+        'baseline': float(-P2[0, 3] / P2[0, 0]),  # Same units as T
+        'Q': Q.tolist(),
+        'valid_roi_left': [int(v) for v in roi1],
+        'valid_roi_right': [int(v) for v in roi2],
+    }
+    with open(os.path.join(maps_dir, 'maps_meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def maps_are_current(calibration_path, maps_dir, alpha):
+    meta_path = os.path.join(maps_dir, 'maps_meta.json')
+    if not os.path.exists(meta_path):
+        return False
+    if not all(os.path.exists(os.path.join(maps_dir, n + '.npy')) for n in MAP_FILES):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return meta['source_sha1'] == file_sha1(calibration_path) and meta['alpha'] == alpha
+
+
+class StereoRectifier:
+    def __init__(self, maps_dir):
+        with open(os.path.join(maps_dir, 'maps_meta.json')) as f:
+            self.meta = json.load(f)
+        # Memory-mapped: pages load on first touch and are shared between processes
+        self.maps = {name: np.load(os.path.join(maps_dir, name + '.npy'), mmap_mode='r')
+                     for name in MAP_FILES}
+        self.image_size = tuple(self.meta['image_size'])
+        self.focal_length_px = self.meta['focal_length_px']
+        self.Q = np.array(self.meta['Q'])
+
+    @classmethod
+    def load(cls, calibration_path=DEFAULT_CALIBRATION, maps_dir=None, alpha=0.0):
+        """Load cached maps for this calibration, rebuilding them only if the calibration changed."""
+        if maps_dir is None:
+            maps_dir = default_maps_dir(calibration_path)
+        if not maps_are_current(calibration_path, maps_dir, alpha):
+            print(f"Building rectification maps from {calibration_path}...")
+            build_maps(calibration_path, maps_dir, alpha)
+        return cls(maps_dir)
+
+    def check_size(self, img):
+        height, width = img.shape[:2]
+        if (width, height) != self.image_size:
+            raise ValueError(f"Image is {width}x{height} but maps were built for "
+                             f"{self.image_size[0]}x{self.image_size[1]}")
+
+    def rectify(self, side, img, dst=None):
+        """Rectify a full frame from the 'left' or 'right' camera."""
+        self.check_size(img)
+        return cv2.remap(img, self.maps[side + '_map1'], self.maps[side + '_map2'],
+                         cv2.INTER_LINEAR, dst=dst)
+
+    def rectify_pair(self, left, right):
+        return self.rectify('left', left), self.rectify('right', right)
+
+    def rectify_roi(self, side, img, bbox, dst=None):
+        """
+        Only box (x, y, w, h) of the rectified frame, from the full unrectified img.
+        Costs w * h remapped pixels instead of the whole frame.
+        """
+        self.check_size(img)
+        x, y, w, h = bbox
+        map1 = self.maps[side + '_map1'][y:y+h, x:x+w]
+        map2 = self.maps[side + '_map2'][y:y+h, x:x+w]
+        return cv2.remap(img, map1, map2, cv2.INTER_LINEAR, dst=dst)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build or benchmark cached stereo rectification maps")
+    parser.add_argument('command', choices=['build', 'bench'])
+    parser.add_argument('--calibration', default=DEFAULT_CALIBRATION)
+    parser.add_argument('--maps-dir', default=None)
+    parser.add_argument('--alpha', type=float, default=0.0,
+                        help="0 = crop to valid pixels, 1 = keep every source pixel")
+    parser.add_argument('--frames', type=int, default=50)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.calibration):
+        print(f"Error: No calibration at {args.calibration}")
+        print("Run calibrate_cameras.py first.")
+        sys.exit(1)
+
+    maps_dir = args.maps_dir or default_maps_dir(args.calibration)
+    if args.command == 'build':
+        meta = build_maps(args.calibration, maps_dir, args.alpha)
+        print(f"✓ Maps for {meta['image_size'][0]}x{meta['image_size'][1]} saved to {maps_dir}")
+        print(f"  Rectified focal length: {meta['focal_length_px']:.1f}px, "
+              f"baseline: {meta['baseline']:.2f}")
+        return
+
+    rectifier = StereoRectifier.load(args.calibration, maps_dir, args.alpha)
+    width, height = rectifier.image_size
+    frame = np.random.default_rng(0).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    out = np.empty_like(frame)
+    box = (width // 4, height // 4, width // 4, height // 4)
+
+    for label, fn in [('full frame', lambda: rectifier.rectify('left', frame, dst=out)),
+                      ('quarter ROI', lambda: rectifier.rectify_roi('left', frame, box))]:
+        fn()
+        start = time.perf_counter()
+        for _ in range(args.frames):
+            fn()
+        ms = (time.perf_counter() - start) * 1000.0 / args.frames
+        print(f"  {label:12s}: {ms:.2f}ms per remap")
+
+
+if __name__ == "__main__":
+    main()
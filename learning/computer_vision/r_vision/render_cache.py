@@ -0,0 +1,92 @@
+"""
+Render Cache
+Redraw a viewer's display only when its mode or its data changed.
+
+The lesson viewers poll waitKey(1) in a loop and used to re-render the
+current mode on every tick: copy the frame, draw every contour and label,
+imshow. With a still image nothing changes between ticks, so all of that
+was wasted CPU that the capture threads on the Pi could have used.
+
+RenderCache keeps the last image rendered for each mode together with the
+data version it was rendered from. The viewer calls invalidate() when new
+data arrives (next frame, new thresholds) and show() every tick; show()
+only renders and calls imshow when (mode, version) differs from what is on
+screen. Render modes draw into canvas()/blank()/buffer() buffers that are
+allocated once per mode and refilled in place instead of copying the frame
+each time.
+wait_key() sleeps longer between polls while nothing is live.
+
+Usage:
+    renderer = RenderCache(lambda mode: getattr(self, f'render_mode_{mode}')())
+    while True:
+        renderer.show("Window", self.current_mode)
+        key = renderer.wait_key(busy=self.source.live)
+        ...
+    # New data:
+    renderer.invalidate()
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import cv2
+import numpy as np
+
+IDLE_WAIT_MS = 100   # waitKey delay while nothing changes on its own
+
+
+class RenderCache:
+    def __init__(self, render):
+        self.render_fn = render       # render(mode) -> image
+        self.version = 0              # Bumped whenever the data behind the modes changes
+        self.cache = {}               # mode -> (version, image)
+        self.canvases = {}            # slot -> reusable buffer
+        self.shown = None             # (window, mode, version) currently on screen
+        self.renders = 0
+
+    def invalidate(self):
+        self.version += 1
+
+    def render(self, mode):
+        """The image for mode, rendered again only if the data changed since last time."""
+        entry = self.cache.get(mode)
+        if entry is None or entry[0] != self.version:
+            entry = (self.version, self.render_fn(mode))
+            self.cache[mode] = entry
+            self.renders += 1
+        return entry[1]
+
+    def show(self, window, mode):
+        """imshow the mode's image if it is not already on screen. Returns True if it drew."""
+        key = (window, mode, self.version)
+        if key == self.shown:
+            return False
+        cv2.imshow(window, self.render(mode))
+        self.shown = key
+        return True
+
+    def wait_key(self, busy=False):
+        """waitKey(1) while frames are arriving, a longer idle wait otherwise."""
+        return cv2.waitKey(1 if busy else IDLE_WAIT_MS) & 0xFF
+
+    def buffer(self, image, slot):
+        """An uninitialized buffer shaped like image, reserved for slot (e.g. a cv2 dst)."""
+        buffer = self.canvases.get(slot)
+        if buffer is None or buffer.shape != image.shape or buffer.dtype != image.dtype:
+            buffer = self.canvases[slot] = np.empty_like(image)
+        return buffer
+
+    def canvas(self, image, slot):
+        """
+        A copy of image in the buffer reserved for slot.
+        Each render mode uses its own slot so cached images stay intact.
+        """
+        buffer = self.buffer(image, slot)
+        np.copyto(buffer, image)
+        return buffer
+
+    def blank(self, image, slot):
+        """A zeroed buffer shaped like image, reserved for slot."""
+        buffer = self.buffer(image, slot)
+        buffer.fill(0)
+        return buffer
@@ -0,0 +1,84 @@
+"""
+Epipolar-Band ROI Stereo Engine
+Compute disparity for one obstacle box without cropping away its matches.
+
+Cropping left and right with the same [y:y+h, x:x+w] window loses every
+match that lies more than the box's left margin away: a point at column u in
+the left image appears at u - d in the right image. SGBM also leaves the
+first numDisparities columns of its input without a result, which is why the
+old code had to shrink numDisparities to the box width and skip narrow boxes.
+
+Here both images are cut to the same band: the box rows (plus half a block)
+and the box columns widened leftward by the full disparity search range.
+After matching, only the box columns are kept, so the result is aligned with
+the ROI and every box column had the full search range available.
+
+Usage:
+    engine = ROIStereoEngine(StereoMatcherPool())
+    disparity = engine.compute(left_gray, right_gray, (x, y, w, h), 64, 7)
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import cv2
+
+
+class ROIStereoEngine:
+    def __init__(self, matcher_pool):
+        self.matcher_pool = matcher_pool
+        self.last_band = None     # (x0, y0, x1, y1) of the most recent compute
+        self.band_pixels = 0      # Pixels matched since creation, for cost reporting
+
+    def band(self, bbox, image_shape, num_disparities, block_size):
+        """Band (x0, y0, x1, y1) that both images are cut to for this box."""
+        x, y, w, h = bbox
+        height, width = image_shape[:2]
+        r = block_size // 2
+        x0 = max(0, x - num_disparities - r)
+        y0 = max(0, y - r)
+        x1 = min(width, x + w + r)
+        y1 = min(height, y + h + r)
+        return x0, y0, x1, y1
+
+    def compute_band(self, left_gray, right_gray, region, num_disparities, block_size,
+                     mode=cv2.STEREO_SGBM_MODE_SGBM, **params):
+        """
+        Raw SGBM disparity over the whole band of region (x, y, w, h).
+        Returns (disparity, (x0, y0)) with the band's top-left corner, or
+        (None, None) when the band is too narrow to hold a single search range.
+        """
+        x0, y0, x1, y1 = self.band(region, left_gray.shape, num_disparities, block_size)
+
+        # Regions hugging the left image edge get a shorter search range
+        band_width = x1 - x0
+        if band_width < num_disparities + block_size:
+            num_disparities = ((band_width - block_size) // 16) * 16
+            if num_disparities < 16:
+                return None, None
+
+        stereo = self.matcher_pool.get(num_disparities, block_size, mode, **params)
+        disparity = stereo.compute(left_gray[y0:y1, x0:x1], right_gray[y0:y1, x0:x1])
+
+        self.last_band = (x0, y0, x1, y1)
+        self.band_pixels += (x1 - x0) * (y1 - y0)
+        return disparity, (x0, y0)
+
+    def compute(self, left_gray, right_gray, bbox, num_disparities, block_size,
+                mode=cv2.STEREO_SGBM_MODE_SGBM, **params):
+        """
+        Raw SGBM disparity (16x fixed point, int16) for the box, shaped (h, w).
+        Returns None when the band is too narrow to hold a single search range.
+        """
+        disparity, origin = self.compute_band(left_gray, right_gray, bbox, num_disparities,
+                                              block_size, mode, **params)
+        if disparity is None:
+            return None
+        return crop_to_box(disparity, origin, bbox).copy()
+
+
+def crop_to_box(disparity, origin, bbox):
+    """View of a band disparity map covering box (x, y, w, h) in image coordinates."""
+    x, y, w, h = bbox
+    x0, y0 = origin
+    return disparity[y - y0:y - y0 + h, x - x0:x - x0 + w]
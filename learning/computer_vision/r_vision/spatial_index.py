@@ -0,0 +1,61 @@
+"""
+Sort-and-Sweep Box Pairs
+Find the box pairs that could possibly merge without testing every pair.
+
+Stage 2 merges two detections when their boxes, grown by merge_margin_x and
+merge_margin_y, overlap:
+
+    x2 <= x1 + w1 + margin_x  and  x1 <= x2 + w2 + margin_x   (same for y)
+
+That is exactly "the closed intervals [x, x + w + margin_x] intersect" on
+both axes. Sorted by left edge, a box can only reach the boxes after it
+whose left edge is within its own grown right edge, so each box's partners
+on the x axis are one contiguous run of the sorted order. overlapping_pairs
+expands those runs with array operations and keeps the pairs whose y
+extents meet too - no per-pair Python, and no all-pairs matrix.
+
+box_iou scores how well two boxes agree (stage 1 proposal modes, tracking).
+
+Usage:
+    i, j = overlapping_pairs(records['bbox'], margin_x, margin_y)
+    iou = box_iou(boxes[0], boxes[1])
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import numpy as np
+
+
+def overlapping_pairs(boxes, margin_x, margin_y):
+    """
+    (i, j) index arrays, each unordered pair once, of (x, y, w, h) boxes
+    whose grown extents [x, x + w + margin_x] x [y, y + h + margin_y]
+    intersect. A margin of -1 keeps only boxes sharing a pixel.
+    """
+    boxes = np.asarray(boxes, dtype=np.int64).reshape(-1, 4)
+    x, y, w, h = boxes.T
+    n = len(boxes)
+
+    order = np.argsort(x, kind='stable')
+    xs = x[order]
+    starts = np.arange(1, n + 1)
+    ends = np.searchsorted(xs, xs + w[order] + margin_x, side='right')
+    counts = np.maximum(ends - starts, 0)
+    a = np.repeat(np.arange(n), counts)
+    b = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) \
+        + np.repeat(starts, counts)
+    i, j = order[a], order[b]
+
+    keep = (y[i] + h[i] + margin_y >= y[j]) & (y[j] + h[j] + margin_y >= y[i])
+    return i[keep], j[keep]
+
+
+def box_iou(a, b):
+    """Intersection over union of two (x, y, w, h) boxes."""
+    ix = min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0])
+    iy = min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1])
+    if ix <= 0 or iy <= 0:
+        return 0.0
+    inter = ix * iy
+    return inter / float(a[2] * a[3] + b[2] * b[3] - inter)
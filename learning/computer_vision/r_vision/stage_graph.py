@@ -0,0 +1,120 @@
+"""
+Stage Graph
+Named pipeline stages with declared inputs and parameters, computed lazily
+and memoized.
+
+The lessons ran every stage on every frame in a fixed order: the HSV viewer
+ran stage1 -> stage4 before showing anything, and the edge lesson computed
+grayscale, blur and Canny even while showing the original. A StageGraph
+knows which stages each output needs, and only runs those:
+
+    graph.get('stage3')     runs frame, stage1, stage2, stage3 (not stage4)
+
+Every value a stage computes gets a fresh id. A stage's memo key is the ids
+of its inputs plus the current values of its declared parameters (read
+from a params dict or object). get() reruns a stage only when that key is
+new, so changing canny_threshold1 reruns stage3 and nothing else. Each
+stage keeps its last cache_size results (LRU); sweeps that flip between
+parameter values keep more than one. set_input() drops every cached result
+downstream of that input, since nothing can reach them any more.
+
+Usage:
+    params = {'threshold': 50}
+    graph = StageGraph(params)
+    graph.add_input('frame')
+    graph.add('gray', lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), ['frame'])
+    graph.add('edges', lambda gray: cv2.Canny(gray, params['threshold'], 150),
+              ['gray'], params=['threshold'])
+    graph.set_input('frame', frame)
+    edges = graph.get('edges')
+    print(graph.runs)        # {'gray': 1, 'edges': 1}
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import collections
+import itertools
+
+
+class _Stage:
+    def __init__(self, name, fn, inputs, params, cache_size):
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+        self.params = list(params)
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()   # key -> (value id, value), oldest first
+
+
+class StageGraph:
+    def __init__(self, params=None):
+        self.params = params if params is not None else {}
+        self.stages = {}
+        self.inputs = {}                  # input name -> (value id, value)
+        self.runs = collections.Counter() # stage name -> times computed
+        self.ids = itertools.count(1)
+
+    def add_input(self, name):
+        self.inputs[name] = None
+
+    def add(self, name, fn, inputs=(), params=(), cache_size=1):
+        """
+        Add a stage computed as fn(*input values). params names the
+        parameters fn reads; their values are part of its memo key. Inputs
+        must already be in the graph, which keeps it acyclic.
+        """
+        for dep in inputs:
+            if dep not in self.inputs and dep not in self.stages:
+                raise ValueError(f"Stage '{name}' needs unknown input '{dep}'")
+        self.stages[name] = _Stage(name, fn, inputs, params, cache_size)
+
+    def set_input(self, name, value):
+        if name not in self.inputs:
+            raise KeyError(name)
+        self.inputs[name] = (next(self.ids), value)
+        for stage in self.downstream(name):
+            stage.cache.clear()
+
+    def downstream(self, name):
+        """Every stage that depends on name, directly or not."""
+        found = []
+        names = {name}
+        for stage in self.stages.values():     # Insertion order is a topological order
+            if names.intersection(stage.inputs):
+                found.append(stage)
+                names.add(stage.name)
+        return found
+
+    def param_key(self, stage):
+        # repr() compares dicts of numpy arrays (color ranges) by value
+        if isinstance(self.params, dict):
+            return tuple(repr(self.params[p]) for p in stage.params)
+        return tuple(repr(getattr(self.params, p)) for p in stage.params)
+
+    def get(self, name):
+        return self._evaluate(name)[1]
+
+    def _evaluate(self, name):
+        """(value id, value) for an input or a stage, computing what is stale."""
+        if name in self.inputs:
+            entry = self.inputs[name]
+            if entry is None:
+                raise LookupError(f"Input '{name}' has not been set")
+            return entry
+
+        stage = self.stages[name]
+        upstream = [self._evaluate(dep) for dep in stage.inputs]
+        key = (tuple(value_id for value_id, _ in upstream), self.param_key(stage))
+        entry = stage.cache.get(key)
+        if entry is not None:
+            stage.cache.move_to_end(key)
+            return entry
+
+        value = stage.fn(*(value for _, value in upstream))
+        self.runs[name] += 1
+        entry = (next(self.ids), value)
+        stage.cache[key] = entry
+        while len(stage.cache) > stage.cache_size:
+            stage.cache.popitem(last=False)
+        return entry
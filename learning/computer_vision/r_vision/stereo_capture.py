@@ -0,0 +1,185 @@
+"""
+Synchronized Stereo Pair Capture
+Capture both cameras concurrently and pair frames by sensor timestamp.
+
+The two Camera Module 3 sensors free-run, so "the next left frame" and "the
+next right frame" can be up to a whole frame period apart. Each source is
+read on its own thread into a short queue, and frames are paired when their
+timestamps are within a tolerance (5ms target). A frame with no partner is
+dropped, and every pair reports its skew. Only the newest pair is handed
+out, so a slow consumer skips pairs instead of falling behind.
+
+Any two frame_sources work (read() -> (ok, frame, timestamp in seconds)):
+    Picamera2Source          one CSI camera on the Pi (SensorTimestamp metadata)
+    VideoFileSource          a video file plus a sidecar of per-frame timestamps
+
+Usage:
+    python stereo_capture.py --picamera
+    python stereo_capture.py --left left.avi --right right.avi [--tolerance-ms 5]
+
+    stereo = StereoPairCapture(Picamera2Source(0), Picamera2Source(1)).start()
+    ok, (left, right), timestamp = stereo.read()
+    print(stereo.last_skew_ms, stereo.stats())
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import collections
+import threading
+import time
+
+from frame_sources import FrameSource, Picamera2Source, ReplaySource, VideoFileSource
+
+
+class StereoPairCapture(FrameSource):
+    stereo = True
+    live = True
+
+    def __init__(self, left_source, right_source, tolerance_ms=5.0, queue_size=4):
+        self.sources = {'left': left_source, 'right': right_source}
+        self.tolerance = tolerance_ms / 1000.0
+        self.queues = {side: collections.deque() for side in self.sources}   # (timestamp, frame)
+        self.queue_size = queue_size
+        self.condition = threading.Condition()
+        self.threads = []
+        self.running = False
+        self.ended = {side: False for side in self.sources}
+
+        self.pairs = 0                 # Pairs handed out
+        self.stale_pairs = 0           # Matched, but a newer pair was ready
+        self.dropped = {side: 0 for side in self.sources}   # Frames with no partner
+        self.last_skew_ms = None
+        self.skew_total_ms = 0.0
+        self.max_skew_ms = 0.0
+
+    def start(self):
+        self.running = True
+        for side, source in self.sources.items():
+            thread = threading.Thread(target=self._reader, args=(side, source),
+                                      name=f'stereo-{side}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        return self
+
+    def _reader(self, side, source):
+        queue = self.queues[side]
+        while self.running:
+            ok, frame, timestamp = source.read()
+            with self.condition:
+                if not ok:
+                    self.ended[side] = True
+                    self.condition.notify_all()
+                    return
+                if len(queue) == self.queue_size:
+                    queue.popleft()
+                    self.dropped[side] += 1
+                queue.append((timestamp, frame))
+                self.condition.notify_all()
+
+    def _match(self):
+        """Pair queued frames oldest first; return the newest pair, keep leftovers queued."""
+        left, right = self.queues['left'], self.queues['right']
+        newest = None
+        while left and right:
+            skew = left[0][0] - right[0][0]
+            if abs(skew) <= self.tolerance:
+                if newest is not None:
+                    self.stale_pairs += 1
+                newest = (left.popleft(), right.popleft(), skew)
+            elif skew < 0:
+                left.popleft()          # Left frame is older than anything right can still offer
+                self.dropped['left'] += 1
+            else:
+                right.popleft()
+                self.dropped['right'] += 1
+        return newest
+
+    def read(self, timeout=1.0):
+        """
+        Newest matched pair, waiting up to timeout seconds.
+        Returns (ok, (left, right), timestamp) with the mean of both timestamps.
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                pair = self._match()
+                if pair is not None:
+                    break
+                remaining = deadline - time.monotonic()
+                if any(self.ended.values()) or remaining <= 0:
+                    return False, None, None
+                self.condition.wait(remaining)
+
+        (left_ts, left), (right_ts, right), skew = pair
+        self.pairs += 1
+        self.last_skew_ms = abs(skew) * 1000.0
+        self.skew_total_ms += self.last_skew_ms
+        self.max_skew_ms = max(self.max_skew_ms, self.last_skew_ms)
+        return True, (left, right), (left_ts + right_ts) / 2.0
+
+    def stats(self):
+        return {
+            'pairs': self.pairs,
+            'stale_pairs': self.stale_pairs,
+            'dropped_left': self.dropped['left'],
+            'dropped_right': self.dropped['right'],
+            'mean_skew_ms': self.skew_total_ms / self.pairs if self.pairs else None,
+            'max_skew_ms': self.max_skew_ms,
+        }
+
+    def stop(self):
+        self.running = False
+        for thread in self.threads:
+            thread.join(timeout=1.0)
+        self.threads = []
+
+    def release(self):
+        self.stop()
+        for source in self.sources.values():
+            source.release()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Capture timestamp-matched stereo pairs")
+    parser.add_argument('--picamera', action='store_true', help="Use CSI cameras 0 and 1")
+    parser.add_argument('--left', help="Left video file (with <video>.timestamps)")
+    parser.add_argument('--right', help="Right video file (with <video>.timestamps)")
+    parser.add_argument('--tolerance-ms', type=float, default=5.0)
+    parser.add_argument('--frames', type=int, default=100)
+    args = parser.parse_args()
+
+    if args.picamera:
+        left, right = Picamera2Source(0), Picamera2Source(1)
+    elif args.left and args.right:
+        left = ReplaySource(VideoFileSource(args.left), speed=1.0)
+        right = ReplaySource(VideoFileSource(args.right), speed=1.0)
+    else:
+        parser.error("Use --picamera or both --left and --right")
+
+    stereo = StereoPairCapture(left, right, args.tolerance_ms).start()
+    start = time.monotonic()
+    try:
+        while stereo.pairs < args.frames:
+            ok, _, _ = stereo.read()
+            if not ok:
+                break
+    finally:
+        elapsed = time.monotonic() - start
+        stereo.release()
+
+    stats = stereo.stats()
+    print("="*70)
+    print(f"✓ {stats['pairs']} pairs in {elapsed:.1f}s ({stats['pairs'] / elapsed:.1f} fps)")
+    if stats['pairs']:
+        print(f"  Skew: mean {stats['mean_skew_ms']:.2f}ms, max {stats['max_skew_ms']:.2f}ms "
+              f"(tolerance {args.tolerance_ms}ms)")
+    print(f"  Dropped: {stats['dropped_left']} left, {stats['dropped_right']} right, "
+          f"{stats['stale_pairs']} stale pairs")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
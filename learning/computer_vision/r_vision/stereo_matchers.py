@@ -0,0 +1,78 @@
+"""
+Stereo Matcher Pool
+Keep StereoSGBM instances alive for the lifetime of a pipeline.
+
+Creating a StereoSGBM allocates its internal buffers, and stage 4 used to do
+that once per obstacle per frame. The pool keeps one matcher per
+(numDisparities, blockSize, mode) - the settings that shape those buffers -
+and applies everything else (P1, P2, uniquenessRatio, ...) through the
+matcher's setters on each request.
+
+Usage:
+    pool = StereoMatcherPool()
+    stereo = pool.get(64, 7, uniquenessRatio=10, speckleWindowSize=50)
+    disparity = stereo.compute(left_gray, right_gray)
+    print(pool.stats())
+
+Author: Michael Baker
+Date: 2026-10-17
+"""
+
+import cv2
+
+
+def sgbm_penalties(block_size, channels=3):
+    """The P1/P2 smoothness penalties used throughout the lessons."""
+    return 8 * channels * block_size**2, 32 * channels * block_size**2
+
+
+class StereoMatcherPool:
+    def __init__(self):
+        self.matchers = {}      # (numDisparities, blockSize, mode) -> StereoSGBM
+        self.applied = {}       # same key -> params last pushed through setters
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, num_disparities, block_size, mode=cv2.STEREO_SGBM_MODE_SGBM, **params):
+        """
+        Return a pooled StereoSGBM configured with params.
+        params use StereoSGBM_create names (P1, P2, uniquenessRatio, ...);
+        P1/P2 default to sgbm_penalties(block_size).
+        """
+        key = (num_disparities, block_size, mode)
+        matcher = self.matchers.get(key)
+        if matcher is None:
+            self.misses += 1
+            matcher = cv2.StereoSGBM_create(minDisparity=0,
+                                            numDisparities=num_disparities,
+                                            blockSize=block_size,
+                                            mode=mode)
+            self.matchers[key] = matcher
+            self.applied[key] = {}
+        else:
+            self.hits += 1
+
+        p1, p2 = sgbm_penalties(block_size)
+        params.setdefault('P1', p1)
+        params.setdefault('P2', p2)
+
+        applied = self.applied[key]
+        for name, value in params.items():
+            if applied.get(name) != value:
+                getattr(matcher, 'set' + name[0].upper() + name[1:])(value)
+                applied[name] = value
+        return matcher
+
+    def stats(self):
+        """Hit/miss counters - misses should stop growing once a live run warms up."""
+        total = self.hits + self.misses
+        return {
+            'matchers': len(self.matchers),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        self.matchers.clear()
+        self.applied.clear()
@@ -1,11 +1,16 @@
 """
 Test OpenCV display capabilities
+
+Usage:
+    python test_display.py [source]     (default camera:1)
 """
 
 import cv2
 import numpy as np
 import sys
 
+from frame_sources import open_source
+
 print("=" * 60)
 print("OpenCV Display System Diagnostic")
 print("=" * 60)
@@ -63,10 +68,14 @@ print("\n" + "=" * 60)
 print("TEST 3: Displaying camera feed...")
 print("=" * 60)
 
-cap = cv2.VideoCapture(1)
+try:
+    source = open_source(sys.argv[1] if len(sys.argv) > 1 else 'camera:1')
+except (IOError, ValueError) as e:
+    print(f"   {e}")
+    source = None
 
-if cap.isOpened():
-    ret, frame = cap.read()
+if source is not None:
+    ret, frame, _ = source.read()
     if ret:
         print("✅ Frame captured from camera")
         print(f"   Shape: {frame.shape}")
@@ -83,10 +92,10 @@ if cap.isOpened():
             print(f"❌ Failed to display camera frame: {e}")
     else:
         print("❌ Could not read frame from camera")
+    source.release()
 else:
     print("❌ Could not open camera")
 
-cap.release()
 cv2.destroyAllWindows()
 
 print("\n" + "=" * 60)
@@ -0,0 +1,15 @@
+"""
+Shared pytest setup.
+
+The vision lessons are plain scripts that import their sibling modules by
+name, so put their folder on sys.path for the tests that exercise them.
+"""
+
+import os
+import sys
+
+R_VISION_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            "learning", "computer_vision", "r_vision")
+
+if R_VISION_DIR not in sys.path:
+    sys.path.insert(0, R_VISION_DIR)
@@ -0,0 +1,104 @@
+"""
+Calibration pipeline tests.
+
+Corner detection is cached by image hash and pattern size, so only new images are processed,
+and synthetic boards rendered through a known camera calibrate back to a
+sub-pixel reprojection error.
+
+Run with:
+    pytest tests/test_calibrate_cameras.py -v
+"""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from calibrate_cameras import (PATTERN_SIZE, SQUARE_SIZE_MM, calibrate_mono,
+                               calibrate_stereo, update_corner_cache)
+
+SIZE = (640, 480)
+K = np.array([[500.0, 0, 320], [0, 500.0, 240], [0, 0, 1]])
+BASELINE_MM = 60.0
+
+
+def _board_image(scale=10):
+    """Checkerboard with a white border, one square = scale pixels per mm."""
+    cols, rows = PATTERN_SIZE[0] + 1, PATTERN_SIZE[1] + 1
+    square = int(SQUARE_SIZE_MM * scale / 10)
+    board = np.full(((rows + 2) * square, (cols + 2) * square), 255, np.uint8)
+    for r in range(rows):
+        for c in range(cols):
+            if (r + c) % 2 == 0:
+                board[(r + 1) * square:(r + 2) * square, (c + 1) * square:(c + 2) * square] = 0
+    return board, square
+
+
+def _render(board, square, rvec, tvec):
+    """Project the board plane (z = 0, mm) into the camera and warp it."""
+    h, w = board.shape
+    mm = SQUARE_SIZE_MM / square
+    # Board pixel -> board mm, origin at the first inner corner
+    corners_px = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    corners_mm = np.hstack([(corners_px - 2 * square) * mm, np.zeros((4, 1), np.float32)])
+    projected, _ = cv2.projectPoints(corners_mm, rvec, tvec, K, None)
+    H = cv2.getPerspectiveTransform(corners_px, projected.reshape(-1, 2).astype(np.float32))
+    return cv2.warpPerspective(board, H, SIZE, borderValue=255)
+
+
+def _write_pairs(folder, count, start=0):
+    board, square = _board_image()
+    rng = np.random.default_rng(start)
+    paths = []
+    for i in range(start, start + count):
+        rvec = rng.uniform(-0.35, 0.35, 3)
+        tvec = np.array([rng.uniform(-120, -20), rng.uniform(-90, -30), rng.uniform(450, 600)])
+        for side, offset in (('left', 0.0), ('right', -BASELINE_MM)):
+            path = folder / side / f'pose_{i:02d}.png'
+            path.parent.mkdir(exist_ok=True)
+            cv2.imwrite(str(path), _render(board, square, rvec, tvec + [offset, 0, 0]))
+            paths.append(str(path))
+    return paths
+
+
+class TestCornerCache:
+    def test_only_new_images_are_processed(self, tmp_path):
+        cache = {}
+        paths = _write_pairs(tmp_path, 3)
+        _, processed = update_corner_cache(paths, cache, workers=2)
+        assert processed == 6
+
+        new_paths = _write_pairs(tmp_path, 1, start=3)
+        detections, processed = update_corner_cache(paths + new_paths, cache, workers=2)
+        assert processed == 2
+        assert all(d['found'] for d in detections.values())
+
+    def test_other_pattern_size_is_a_miss(self, tmp_path):
+        cache = {}
+        paths = _write_pairs(tmp_path, 1)
+        update_corner_cache(paths, cache, workers=2)
+
+        other = (PATTERN_SIZE[0] - 1, PATTERN_SIZE[1])
+        detections, processed = update_corner_cache(paths, cache, workers=2, pattern_size=other)
+        assert processed == 2
+        assert len(cache) == 4
+        for d in detections.values():
+            assert not d['found'] or len(d['corners']) == other[0] * other[1]
+
+
+class TestCalibration:
+    def test_recovers_camera_and_baseline(self, tmp_path):
+        paths = _write_pairs(tmp_path, 8)
+        detections, _ = update_corner_cache(paths, {}, workers=2)
+        left = {p.rsplit('/', 1)[1][:-4]: d for p, d in detections.items() if '/left/' in p}
+        right = {p.rsplit('/', 1)[1][:-4]: d for p, d in detections.items() if '/right/' in p}
+        names = sorted(left)
+
+        rms_l, K1, D1, errors = calibrate_mono(names, left, SIZE)
+        rms_r, K2, D2, _ = calibrate_mono(names, right, SIZE)
+        rms_s, R, T, _, _, pair_errors = calibrate_stereo(names, left, right, K1, D1, K2, D2, SIZE)
+
+        assert max(rms_l, rms_r) < 0.5
+        assert set(errors) == set(pair_errors) == set(names)
+        assert abs(K1[0, 0] - 500.0) < 10.0
+        assert abs(np.linalg.norm(T) - BASELINE_MM) < 2.0
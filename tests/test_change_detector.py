@@ -0,0 +1,93 @@
+"""
+Change detector and incremental stage 1 tests.
+
+Only tiles that changed may be dirty, slow changes must add up against the
+reference, a full refresh must come round periodically, and incremental
+proposals must find the same detections as full-frame ones on a moving
+scene without touching masks handed out for earlier frames.
+
+Run with:
+    pytest tests/test_change_detector.py -v
+"""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from change_detector import ChangeDetector, grow_tiles, tile_runs
+from frame_sources import SyntheticSource
+from hsv_bounded_stereo_lesson import HSVStereoPipeline
+
+
+class TestChangeDetector:
+    def test_dirty_tiles(self):
+        detector = ChangeDetector(tile=32, scale=4, threshold=10, full_refresh=0)
+        frame = np.full((100, 130), 100, np.uint8)
+        assert detector.update(frame).all()
+        assert detector.update(frame).shape == (4, 5)
+        assert not detector.update(frame).any()
+
+        changed = frame.copy()
+        changed[40:50, 100:110] = 200
+        dirty = detector.update(changed)
+        assert np.argwhere(dirty).tolist() == [[1, 3]]
+        assert not detector.update(changed).any()
+
+    def test_slow_drift_adds_up(self):
+        detector = ChangeDetector(tile=32, threshold=10, full_refresh=0)
+        frame = np.full((64, 64, 3), 100, np.uint8)
+        detector.update(frame)
+        dirty = [detector.update(frame + 4 * step).any() for step in range(1, 5)]
+        assert dirty == [False, False, True, False]
+
+    def test_full_refresh(self):
+        detector = ChangeDetector(tile=32, full_refresh=3)
+        frame = np.zeros((64, 64), np.uint8)
+        assert [detector.update(frame).all() for _ in range(7)] == [
+            True, False, False, True, False, False, True]
+        assert detector.update(frame, force=True).all()
+
+    def test_tile_helpers(self):
+        active = np.zeros((3, 4), bool)
+        active[1, 1] = active[1, 3] = True
+        assert tile_runs(active, 10, 35, 30) == [(10, 10, 20, 20), (30, 10, 35, 20)]
+        assert grow_tiles(active, 1).all()
+        assert grow_tiles(active, 0) is active
+
+
+class TestIncrementalProposals:
+    def test_matches_full_on_moving_scene(self):
+        full = HSVStereoPipeline(15.24)
+        incremental = HSVStereoPipeline(15.24)
+        incremental.proposal_mode = 'incremental'
+        source = SyntheticSource(stereo=True)
+        earlier = None
+        for _ in range(12):
+            ok, (left, right), _ = source.read()
+            for pipeline in (full, incremental):
+                pipeline.begin_frame(left, right)
+                pipeline.stage1_hsv_region_proposal()
+            assert ([d['bbox'] for d in incremental.color_detections] ==
+                    [d['bbox'] for d in full.color_detections])
+            for name, mask in full.color_masks.items():
+                np.testing.assert_array_equal(incremental.color_masks[name], mask)
+            if earlier is None:
+                earlier = {name: (mask, mask.copy()) for name, mask in incremental.color_masks.items()}
+
+        for mask, copy in earlier.values():
+            np.testing.assert_array_equal(mask, copy)
+        assert incremental.change_detector.dirty_ratio < 1.0
+
+    def test_static_scene_reuses_results(self):
+        pipeline = HSVStereoPipeline(15.24)
+        pipeline.proposal_mode = 'incremental'
+        ok, (left, right), _ = SyntheticSource(stereo=True).read()
+        pipeline.begin_frame(left, right)
+        pipeline.stage1_hsv_region_proposal()
+        first = [d['bbox'] for d in pipeline.color_detections]
+        masks = dict(pipeline.color_masks)
+        pipeline.begin_frame(left, right)
+        pipeline.stage1_hsv_region_proposal()
+        assert [d['bbox'] for d in pipeline.color_detections] == first
+        assert all(pipeline.color_masks[name] is mask for name, mask in masks.items())
@@ -0,0 +1,96 @@
+"""
+Label-image statistics tests.
+
+Per-contour and per-box means from one pass must equal the per-region
+mask-and-mean they replace, also for nested and overlapping contours.
+
+Run with:
+    pytest tests/test_contour_stats.py -v
+"""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from contour_stats import box_means, contour_means, label_contours, label_means
+
+
+def _disparity(shape=(120, 160), seed=0):
+    rng = np.random.default_rng(seed)
+    disparity = rng.integers(-16, 1024, shape).astype(np.int16)
+    disparity[rng.random(shape) < 0.3] = -16
+    return disparity
+
+
+def _square(x, y, size):
+    return np.array([[[x, y]], [[x + size, y]], [[x + size, y + size]], [[x, y + size]]], np.int32)
+
+
+def _masked_mean(disparity, mask):
+    values = disparity[mask]
+    values = values[values > 0]
+    return len(values), (values.mean() if len(values) else np.nan)
+
+
+class TestLabelMeans:
+    def test_matches_per_contour_masks(self):
+        disparity = _disparity()
+        contours = [_square(5, 5, 20), _square(40, 10, 30), _square(100, 60, 25)]
+        labels = label_contours(contours, disparity.shape)
+        counts, means = label_means(labels, disparity, len(contours), valid=disparity > 0)
+
+        for i, cnt in enumerate(contours):
+            mask = np.zeros(disparity.shape, np.uint8)
+            cv2.drawContours(mask, [cnt], -1, 255, -1)
+            count, mean = _masked_mean(disparity, mask == 255)
+            assert counts[i] == count
+            assert means[i] == pytest.approx(mean)
+
+    def test_nested_contour_keeps_its_pixels(self):
+        contours = [_square(10, 10, 50), _square(20, 20, 10)]
+        labels = label_contours(contours, (80, 80))
+        assert np.count_nonzero(labels == 2) == 11 * 11
+
+    def test_empty_label_has_zero_count(self):
+        disparity = np.full((40, 40), -16, np.int16)
+        labels = label_contours([_square(5, 5, 10)], disparity.shape)
+        counts, means = label_means(labels, disparity, 1, valid=disparity > 0)
+        assert counts[0] == 0
+        assert np.isnan(means[0])
+
+
+class TestContourMeans:
+    def test_overlapping_contours_match_per_contour_masks(self):
+        disparity = _disparity()
+        ring = np.array([[[60, 5]], [[150, 5]], [[150, 100]], [[60, 100]],
+                         [[60, 70]], [[130, 70]], [[130, 30]], [[60, 30]]], np.int32)
+        contours = [_square(5, 5, 40), _square(15, 15, 10), _square(30, 30, 40),
+                    ring, _square(100, 40, 20), _square(5, 90, 20)]
+        counts, means = contour_means(contours, disparity, valid=disparity > 0)
+
+        for i, cnt in enumerate(contours):
+            mask = np.zeros(disparity.shape, np.uint8)
+            cv2.drawContours(mask, [cnt], -1, 255, -1)
+            count, mean = _masked_mean(disparity, mask == 255)
+            assert counts[i] == count
+            assert means[i] == pytest.approx(mean)
+
+    def test_no_contours(self):
+        counts, means = contour_means([], _disparity())
+        assert len(counts) == len(means) == 0
+
+
+class TestBoxMeans:
+    def test_overlapping_boxes_with_origin(self):
+        disparity = _disparity()
+        origin = (30, 20)
+        boxes = [(30, 20, 50, 40), (60, 40, 70, 60), (35, 25, 10, 10)]
+        counts, means = box_means(disparity, boxes, valid=disparity > 0, origin=origin)
+
+        for i, (x, y, w, h) in enumerate(boxes):
+            x0, y0 = x - origin[0], y - origin[1]
+            count, mean = _masked_mean(disparity[y0:y0 + h, x0:x0 + w],
+                                       np.ones((h, w), bool))
+            assert counts[i] == count
+            assert means[i] == pytest.approx(mean)
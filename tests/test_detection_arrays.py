@@ -0,0 +1,137 @@
+"""
+Detection array tests.
+
+Bulk rects and areas must equal cv2.boundingRect and cv2.contourArea,
+finish() must filter like the per-contour loop did, connected_groups must
+find the same components as union-find, stages 2-4 must fill in obstacle
+columns without building a single detection dict, and to_dicts must still
+give the obstacle dicts debug output uses.
+
+Run with:
+    pytest tests/test_detection_arrays.py -v
+"""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from detection_arrays import (DetectionArrays, ObstacleArrays, connected_groups,
+                              contour_stats)
+from frame_sources import SyntheticSource
+from hsv_bounded_stereo_lesson import HSVStereoPipeline
+
+
+def _contours(seed=0):
+    mask = np.zeros((200, 300), np.uint8)
+    rng = np.random.default_rng(seed)
+    for x, y, w, h in rng.integers(0, 60, (30, 4)):
+        cv2.ellipse(mask, (int(x) * 4 + 20, int(y) * 3 + 10), (int(w) // 3 + 1, int(h) // 4 + 1),
+                    0, 0, 360, 255, -1)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return contours
+
+
+class TestDetectionArrays:
+    def test_stats_match_opencv(self):
+        contours = _contours()
+        offsets = np.concatenate(([0], np.cumsum([len(c) for c in contours])))
+        x0, y0, x1, y1, area = contour_stats(np.concatenate(contours), offsets)
+        for k, cnt in enumerate(contours):
+            assert (x0[k], y0[k], x1[k] - x0[k], y1[k] - y0[k]) == cv2.boundingRect(cnt)
+            assert area[k] == cv2.contourArea(cnt)
+
+    def test_finish_filters_and_packs(self):
+        pipeline = HSVStereoPipeline(15.24)
+        ranges = pipeline.color_ranges
+        ranges['yellow']['check_aspect'] = True
+        contours = _contours(1)
+        wide = np.array([[[0, 0]], [[100, 0]], [[100, 10]], [[0, 10]]], np.int32)
+
+        detections = DetectionArrays(ranges)
+        detections.add('yellow', list(contours) + [wide])
+        detections.add('red', contours)
+        detections.finish()
+
+        expected = [('yellow', cv2.boundingRect(c)) for c in contours
+                    if cv2.contourArea(c) > ranges['yellow']['min_area']]
+        expected += [('red', cv2.boundingRect(c)) for c in contours
+                     if cv2.contourArea(c) > ranges['red']['min_area']]
+        assert [(d['color'], d['bbox']) for d in detections] == expected
+        assert detections.dicts and detections[0] is detections[0]
+        assert cv2.boundingRect(detections[-1]['contour']) == expected[-1][1]
+        assert len(detections.offsets) == len(detections) + 1
+
+    def test_connected_groups(self):
+        edges = [(0, 5), (5, 2), (7, 8), (3, 3), (9, 1), (1, 6)]
+        i, j = (np.array(v) for v in zip(*edges))
+        labels = connected_groups(10, i, j)
+        groups = {}
+        for node, label in enumerate(labels):
+            groups.setdefault(label, []).append(node)
+        assert sorted(groups.values()) == [[0, 2, 5], [1, 6, 9], [3], [4], [7, 8]]
+        assert list(connected_groups(3, np.zeros(0, int), np.zeros(0, int))) == [0, 1, 2]
+
+
+class TestObstacleArrays:
+    def test_groups_and_dicts(self):
+        pipeline = HSVStereoPipeline(15.24)
+        detections = DetectionArrays.from_dicts([
+            {'color': 'yellow', 'bbox': (10, 10, 20, 20), 'center': (20, 20), 'area': 400},
+            {'color': 'red', 'bbox': (200, 10, 5, 5), 'center': (202, 12), 'area': 25},
+            {'color': 'black', 'bbox': (25, 15, 30, 10), 'center': (40, 20), 'area': 300},
+        ], pipeline.color_ranges)
+        obstacles = ObstacleArrays.from_groups(detections, np.array([0, 1, 0]))
+        dicts = obstacles.to_dicts()
+        assert [o['bbox'] for o in dicts] == [(10, 10, 45, 20), (200, 10, 5, 5)]
+        assert dicts[0]['color_label'] == 'DARK+YELLOW'
+        assert [d['color'] for d in dicts[0]['detections']] == ['yellow', 'black']
+        assert dicts[0]['detections'][0] is detections[0]
+
+        assert len(obstacles.select([False, True])) == 1
+        assert list(obstacles.select([False, True]).members_of(0)) == [1]
+
+    def test_from_obstacles(self):
+        obstacles = [{'bbox': (0, 0, 5, 5), 'center': (2, 2), 'num_components': 1,
+                      'depth_cm': 80.0, 'track_id': 4},
+                     {'bbox': (9, 9, 5, 5), 'center': (11, 11), 'num_components': 2,
+                      'depth_cm': None}]
+        records = ObstacleArrays.from_obstacles(obstacles).records
+        assert np.nanmin(records['depth_cm']) == 80.0
+        assert list(records['track_id']) == [4, -1]
+
+    def test_take_and_assign_payloads(self):
+        pipeline = HSVStereoPipeline(15.24)
+        detections = DetectionArrays.from_dicts([
+            {'color': 'yellow', 'bbox': (10, 10, 20, 20), 'center': (20, 20), 'area': 400},
+            {'color': 'red', 'bbox': (200, 10, 5, 5), 'center': (202, 12), 'area': 25},
+        ], pipeline.color_ranges)
+        obstacles = ObstacleArrays.from_groups(detections, np.array([0, 1]))
+        part = obstacles.take([1])
+        part.records['depth_cm'] = 50.0
+        part.skip_reasons = ['why']
+        obstacles.assign([1], part, ['depth_cm'])
+        assert np.isnan(obstacles.records['depth_cm'][0])
+        assert obstacles.records['depth_cm'][1] == 50.0
+        assert obstacles.skip_reasons == [None, 'why']
+        assert obstacles.color_labels() == ['YELLOW', 'RED']
+        assert obstacles.color_bgrs() == [(0, 255, 255), (0, 0, 255)]
+        assert list(obstacles.take([1]).members_of(0)) == [1]
+
+
+class TestPipelineColumns:
+    def test_stages_fill_columns_without_dicts(self):
+        ok, pair, _ = SyntheticSource(stereo=True).read()
+        result = HSVStereoPipeline(15.24).process(*pair)
+        obstacles = result.obstacles
+        assert len(obstacles) and not result.color_detections.dicts
+
+        records = obstacles.records
+        assert list(records['num_contours']) == [len(c) for c in obstacles.contours]
+        assert list(records['has_depth']) == [r is None for r in obstacles.skip_reasons]
+        assert len(result.obstacles_with_depth) == int(records['has_depth'].sum())
+
+        dicts = result.merged_obstacles
+        assert [d['bbox'] for d in dicts] == [tuple(b) for b in records['bbox'].tolist()]
+        assert [d['depth_cm'] for d in dicts if d['has_depth']] == \
+            list(records['depth_cm'][records['has_depth']])
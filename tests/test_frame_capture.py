@@ -0,0 +1,82 @@
+"""
+Latest-frame capture tests.
+
+A slow consumer must always get the newest frame, frames it never saw must
+be counted as dropped, and the end of the stream must be reported. Sources
+that are not live must be read at the consumer's pace, without drops.
+
+Run with:
+    pytest tests/test_frame_capture.py -v
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from frame_capture import LatestFrameCapture
+from frame_sources import FrameSource, SyntheticSource
+
+
+class FakeCamera(FrameSource):
+    """Numbered frames at a fixed rate, then end of stream."""
+
+    live = True
+
+    def __init__(self, num_frames, interval=0.002):
+        self.num_frames = num_frames
+        self.interval = interval
+        self.index = 0
+
+    def read(self):
+        time.sleep(self.interval)
+        if self.index >= self.num_frames:
+            return False, None, None
+        self.index += 1
+        return True, np.full((4, 4), self.index, np.uint8), time.monotonic()
+
+
+class TestLatestFrameCapture:
+    def test_slow_consumer_gets_newest_frame(self):
+        capture = LatestFrameCapture(FakeCamera(200)).start()
+        ok, first, _ = capture.read()
+        assert ok
+        time.sleep(0.05)                     # "Processing" while the camera keeps going
+        ok, frame, timestamp = capture.read()
+        assert ok
+        assert frame[0, 0] > first[0, 0] + 5
+        assert capture.dropped > 0
+        assert capture.latency() >= 0
+        capture.release()
+
+    def test_counts_add_up_at_end_of_stream(self):
+        capture = LatestFrameCapture(FakeCamera(30)).start()
+        while True:
+            ok, _, _ = capture.read(timeout=0.5)
+            if not ok:
+                break
+            time.sleep(0.005)
+        stats = capture.stats()
+        assert stats['captured'] == 30
+        assert stats['delivered'] + stats['dropped'] == 30
+        capture.release()
+
+    def test_frame_is_never_delivered_twice(self):
+        capture = LatestFrameCapture(FakeCamera(1)).start()
+        assert capture.read()[0]
+        assert not capture.read(timeout=0.1)[0]
+        capture.release()
+
+    def test_recorded_source_is_read_at_consumer_pace(self):
+        capture = LatestFrameCapture(SyntheticSource(size=(64, 48), num_frames=10)).start()
+        assert not capture.live
+        delivered = 0
+        while capture.read(timeout=0.5)[0]:
+            delivered += 1
+            time.sleep(0.01)
+            assert capture.captured <= capture.delivered + 1     # One frame read ahead at most
+        assert delivered == 10
+        assert capture.stats() == {'captured': 10, 'delivered': 10, 'dropped': 0}
+        capture.release()
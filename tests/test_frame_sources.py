@@ -0,0 +1,135 @@
+"""
+Frame source tests.
+
+Every source hands out (ok, frame, timestamp); image directories pair files
+into stereo frames, the synthetic scene has real disparity, and replay paces
+frames on their own timeline at any speed.
+
+Run with:
+    pytest tests/test_frame_sources.py -v
+"""
+
+import argparse
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from image_loader import ImageLoader
+from frame_sources import (ImageSequenceSource, ReplaySource, SyntheticSource,
+                           add_stereo_arguments, open_source, stereo_source_from_args)
+
+
+def _write_images(folder, names):
+    folder.mkdir(parents=True, exist_ok=True)
+    for i, name in enumerate(names):
+        cv2.imwrite(str(folder / name), np.full((8, 8, 3), i * 20, np.uint8))
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestImageSequenceSource:
+    def test_consecutive_files_become_pairs(self, tmp_path):
+        _write_images(tmp_path, ['IMG_0096.jpg', 'IMG_0097.png', 'IMG_0098.png'])
+        (tmp_path / 'notes.txt').write_text('not an image')
+        source = open_source(f'images:{tmp_path}', stereo=True)
+        ok, (left, right), timestamp = source.read()
+        assert ok and timestamp == 0.0
+        assert left.shape == right.shape == (8, 8, 3)
+        assert not source.read()[0]          # The odd file out has no partner
+
+    def test_left_right_folders_match_by_name(self, tmp_path):
+        _write_images(tmp_path / 'left', ['a.png', 'b.png', 'c.png'])
+        _write_images(tmp_path / 'right', ['a.png', 'c.png'])
+        source = ImageSequenceSource.from_directory(str(tmp_path), stereo=True)
+        assert [tuple(p.rsplit('/', 1)[1] for p in item) for item in source.items] == \
+            [('a.png', 'a.png'), ('c.png', 'c.png')]
+
+    def test_mono_iteration(self, tmp_path):
+        _write_images(tmp_path, ['1.png', '2.png', '3.png'])
+        source = open_source(str(tmp_path))
+        assert [ts for _, ts in source] == [0.0, 1.0, 2.0]
+
+    def test_width_and_shared_cache(self, tmp_path):
+        _write_images(tmp_path, ['1.png', '2.png'])
+        loader = ImageLoader()
+        for _ in range(2):
+            source = ImageSequenceSource.from_directory(str(tmp_path), stereo=True, width=4,
+                                                        loader=loader)
+            ok, (left, right), _ = source.read()
+            assert left.shape == right.shape == (4, 4, 3)
+        assert (loader.hits, loader.misses) == (2, 2)
+
+
+class TestSyntheticSource:
+    def test_stereo_floor_has_its_disparity(self):
+        source = SyntheticSource(size=(320, 240), num_frames=2, stereo=True, floor_disparity=16)
+        ok, (left, right), _ = source.read()
+        assert ok
+        # Top rows are floor only: left(u) == right(u - d)
+        assert np.array_equal(left[:20, 16:], right[:20, :-16])
+
+    def test_ends_after_num_frames(self):
+        source = SyntheticSource(num_frames=3)
+        assert [ts for _, ts in source] == pytest.approx([0.0, 1 / 30, 2 / 30])
+
+
+class TestReplaySource:
+    def test_faster_than_real_time(self):
+        fake = FakeClock()
+        source = ReplaySource(SyntheticSource(num_frames=31, fps=30.0), speed=4.0,
+                              clock=fake.clock, sleep=fake.sleep)
+        frames = sum(1 for _ in source)
+        assert frames == 31
+        assert fake.now - 100.0 == pytest.approx(1.0 / 4.0)
+
+    def test_no_speed_means_no_waiting(self):
+        fake = FakeClock()
+        source = ReplaySource(SyntheticSource(num_frames=10), speed=None,
+                              clock=fake.clock, sleep=fake.sleep)
+        assert sum(1 for _ in source) == 10
+        assert fake.sleeps == []
+
+
+class TestOpenSource:
+    def test_unknown_spec(self):
+        with pytest.raises(ValueError):
+            open_source('webcam:3')
+
+    def test_mono_source_rejected_for_stereo(self, tmp_path):
+        path = str(tmp_path / 'mono.avi')
+        writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (16, 16))
+        if not writer.isOpened():
+            pytest.skip("MJPG video writer not available")
+        writer.write(np.zeros((16, 16, 3), np.uint8))
+        writer.release()
+        with pytest.raises(ValueError):
+            open_source(f'video:{path}', stereo=True)
+
+    def test_stereo_arguments(self, tmp_path):
+        _write_images(tmp_path, ['l.png', 'r.png'])
+        parser = argparse.ArgumentParser()
+        add_stereo_arguments(parser)
+
+        args = parser.parse_args([str(tmp_path / 'l.png'), str(tmp_path / 'r.png'), '15.24'])
+        source, baseline = stereo_source_from_args(args)
+        assert baseline == 15.24 and source.stereo
+
+        args = parser.parse_args(['--source', 'synthetic', '10'])
+        source, baseline = stereo_source_from_args(args)
+        assert baseline == 10.0 and isinstance(source, SyntheticSource) and source.stereo
+
+        with pytest.raises(ValueError):
+            stereo_source_from_args(parser.parse_args(['15.24']))
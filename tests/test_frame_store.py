@@ -0,0 +1,83 @@
+"""
+Memory-mapped frame store tests.
+
+A packed store must give back exactly the pixels it was packed from, as
+read-only views into one mapping, for mixed image sizes and stereo pairs,
+and open_source must read it like any other source.
+
+Run with:
+    pytest tests/test_frame_store.py -v
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from frame_sources import ImageSequenceSource, SyntheticSource, open_source
+from frame_store import ALIGN, FrameStore, pack
+
+
+def _write_images(folder, shapes):
+    paths = []
+    for i, shape in enumerate(shapes):
+        path = str(folder / f'{i}.png')
+        cv2.imwrite(path, np.random.default_rng(i).integers(0, 256, shape, dtype=np.uint8))
+        paths.append(path)
+    return paths
+
+
+class TestFrameStore:
+    def test_round_trip_mixed_sizes(self, tmp_path):
+        paths = _write_images(tmp_path, [(30, 40, 3), (17, 23, 3), (30, 40, 3)])
+        source = ImageSequenceSource(paths)
+        pack(source, str(tmp_path / 'store'),
+             files=lambda i: (os.path.basename(source.items[i][0]),))
+
+        store = FrameStore(str(tmp_path / 'store'))
+        assert len(store) == 3 and not store.stereo
+        for i, path in enumerate(paths):
+            np.testing.assert_array_equal(store[i], cv2.imread(path))
+            assert store.frames[i]['views'][0]['file'] == f'{i}.png'
+            assert store.frames[i]['views'][0]['offset'] % ALIGN == 0
+        assert [store.timestamp(i) for i in range(3)] == [0.0, 1.0, 2.0]
+
+    def test_views_are_zero_copy_and_read_only(self, tmp_path):
+        pack(SyntheticSource(size=(64, 48), num_frames=2), str(tmp_path))
+        store = FrameStore(str(tmp_path))
+        frame = store[1]
+        assert np.shares_memory(frame, store.data)
+        assert not frame.flags.writeable
+        with pytest.raises(ValueError):
+            frame[0, 0] = 0
+
+        store.close()
+        assert frame.sum() >= 0               # Still mapped while a view is alive
+
+    def test_stereo_through_open_source(self, tmp_path):
+        synthetic = SyntheticSource(size=(64, 48), num_frames=3, stereo=True)
+        expected = [pair for pair, _ in SyntheticSource(size=(64, 48), num_frames=3, stereo=True)]
+        pack(synthetic, str(tmp_path / 'pairs'))
+
+        for spec in (f"store:{tmp_path / 'pairs'}", str(tmp_path / 'pairs')):
+            source = open_source(spec, stereo=True)
+            pairs = [pair for pair, _ in source]
+            assert len(pairs) == 3
+            for (left, right), (exp_left, exp_right) in zip(pairs, expected):
+                np.testing.assert_array_equal(left, exp_left)
+                np.testing.assert_array_equal(right, exp_right)
+
+    def test_max_frames(self, tmp_path):
+        index = pack(SyntheticSource(size=(64, 48)), str(tmp_path), max_frames=4)
+        assert len(index['frames']) == 4
+
+    def test_endless_source_needs_max_frames(self, tmp_path):
+        for source in (SyntheticSource(size=(64, 48)),
+                       ImageSequenceSource(_write_images(tmp_path, [(8, 8, 3)]), loop=True)):
+            assert source.endless
+            with pytest.raises(ValueError):
+                pack(source, str(tmp_path / 'store'))
+        assert not os.path.exists(tmp_path / 'store')
+        assert not SyntheticSource(size=(64, 48), num_frames=2).endless
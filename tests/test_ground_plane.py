@@ -0,0 +1,75 @@
+"""
+Ground plane estimator tests.
+
+A synthetic tilted floor (disparity growing linearly with the row) plus an
+obstacle must give back the floor line, and a second frame of the same scene
+must be accepted by verification instead of a full refit, also when the
+lesson's detect_floor_plane is called without an estimator.
+
+Run with:
+    pytest tests/test_ground_plane.py -v
+"""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+import contour_detection_lesson
+from contour_detection_lesson import detect_floor_plane
+from ground_plane import GroundPlaneEstimator
+
+
+def _floor_scene(slope=0.12, intercept=-6.0, shape=(240, 320), seed=0):
+    """Raw (x16) disparity of a floor line plus a box of constant disparity."""
+    rng = np.random.default_rng(seed)
+    rows = np.arange(shape[0], dtype=np.float64)[:, None]
+    floor = slope * rows + intercept + rng.normal(0, 0.3, shape)
+    disparity = np.where(floor > 0, floor * 16, -16).astype(np.int16)
+    disparity[120:200, 100:180] = 40 * 16     # Obstacle closer than the floor behind it
+    return disparity
+
+
+class TestGroundPlaneEstimator:
+    def test_recovers_floor_line(self):
+        estimator = GroundPlaneEstimator(num_disparities=64, scale=16)
+        model = estimator.estimate(_floor_scene())
+        assert model['slope'] == pytest.approx(0.12, abs=0.01)
+        assert model['intercept'] == pytest.approx(-6.0, abs=1.0)
+
+    def test_second_frame_is_only_verified(self):
+        estimator = GroundPlaneEstimator(num_disparities=64, scale=16)
+        estimator.estimate(_floor_scene(seed=0))
+        model = estimator.estimate(_floor_scene(seed=1))
+        assert model['verified']
+        assert estimator.stats['refits'] == 1
+        assert estimator.stats['verified'] == 1
+
+    def test_refits_when_floor_moves(self):
+        estimator = GroundPlaneEstimator(num_disparities=64, scale=16)
+        estimator.estimate(_floor_scene(slope=0.12, intercept=-6.0))
+        model = estimator.estimate(_floor_scene(slope=0.2, intercept=-20.0))
+        assert not model['verified']
+        assert model['slope'] == pytest.approx(0.2, abs=0.01)
+
+    def test_expected_disparity_per_row(self):
+        estimator = GroundPlaneEstimator(num_disparities=64, scale=16)
+        floor = estimator.expected_disparity(_floor_scene())
+        assert floor.shape == (240,)
+        assert floor[0] == 0.0
+        assert floor[200] == pytest.approx((0.12 * 200 - 6.0) * 16, abs=16)
+
+    def test_no_floor_in_empty_disparity(self):
+        estimator = GroundPlaneEstimator()
+        assert estimator.expected_disparity(np.full((60, 80), -16, np.int16)) is None
+
+
+class TestDetectFloorPlane:
+    def test_default_estimator_is_reused(self, monkeypatch):
+        monkeypatch.setattr(contour_detection_lesson, '_floor_estimator', None)
+        assert detect_floor_plane(_floor_scene(seed=0)) is not None
+        assert detect_floor_plane(_floor_scene(seed=1)) is not None
+
+        estimator = contour_detection_lesson._floor_estimator
+        assert estimator.model['verified']
+        assert estimator.stats == {'frames': 2, 'refits': 1, 'verified': 1, 'failed': 0}
@@ -0,0 +1,55 @@
+"""
+Hello OpenCV overlay tests.
+
+The overlay must draw on frames from every source, including the read-only
+frames that image directories and frame stores hand out, without writing
+into the source's own buffers.
+
+Run with:
+    pytest tests/test_hello_opencv.py -v
+"""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from frame_capture import LatestFrameCapture
+from frame_sources import SyntheticSource, open_source
+from frame_store import pack
+from hello_opencv import draw_overlay
+
+
+def _draw_first_frame(spec):
+    capture = LatestFrameCapture(open_source(spec)).start()
+    try:
+        ret, frame, _ = capture.read()
+        assert ret and not frame.flags.writeable
+        before = frame.copy()
+        drawn = draw_overlay(frame, 1, capture)
+    finally:
+        capture.release()
+    assert drawn.shape == before.shape
+    assert not np.array_equal(drawn, before)
+    np.testing.assert_array_equal(frame, before)
+
+
+class TestDrawOverlay:
+    def test_image_directory_source(self, tmp_path):
+        for i in range(2):
+            cv2.imwrite(str(tmp_path / f'{i}.png'), np.full((120, 160, 3), 40 * i, np.uint8))
+        _draw_first_frame(f'images:{tmp_path}')
+
+    def test_frame_store_source(self, tmp_path):
+        pack(SyntheticSource(size=(160, 120), num_frames=2), str(tmp_path))
+        _draw_first_frame(f'store:{tmp_path}')
+
+    def test_writable_frame_drawn_in_place(self):
+        capture = LatestFrameCapture(SyntheticSource(size=(160, 120), num_frames=1)).start()
+        try:
+            ret, _, _ = capture.read()
+            frame = np.zeros((120, 160, 3), np.uint8)
+            assert ret and draw_overlay(frame, 1, capture) is frame
+        finally:
+            capture.release()
+        assert frame.any()
@@ -0,0 +1,84 @@
+"""
+HSV label classifier tests.
+
+The lookup-table classifier must reproduce one cv2.inRange per HSV box
+exactly, including red's two wrap-around boxes.
+
+Run with:
+    pytest tests/test_hsv_classifier.py -v
+"""
+
+import copy
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from hsv_classifier import HSVLabelClassifier
+
+
+COLOR_RANGES = {
+    'red': {
+        'lower1': np.array([0, 100, 100]), 'upper1': np.array([10, 255, 255]),
+        'lower2': np.array([170, 100, 100]), 'upper2': np.array([180, 255, 255]),
+    },
+    'yellow': {'lower': np.array([18, 70, 70]), 'upper': np.array([35, 255, 255])},
+    'black': {'lower': np.array([0, 0, 0]), 'upper': np.array([180, 255, 35])},
+}
+
+
+def _random_hsv(seed=0, shape=(120, 160)):
+    rng = np.random.default_rng(seed)
+    h = rng.integers(0, 180, shape, dtype=np.uint8)
+    sv = rng.integers(0, 256, shape + (2,), dtype=np.uint8)
+    return np.dstack([h, sv])
+
+
+def _reference_mask(hsv, info):
+    if 'lower1' in info:
+        return cv2.bitwise_or(cv2.inRange(hsv, info['lower1'], info['upper1']),
+                              cv2.inRange(hsv, info['lower2'], info['upper2']))
+    return cv2.inRange(hsv, info['lower'], info['upper'])
+
+
+class TestHSVLabelClassifier:
+    def test_planes_match_inrange(self):
+        hsv = _random_hsv()
+        classifier = HSVLabelClassifier(COLOR_RANGES)
+        labels = classifier.classify(hsv)
+        for name, info in COLOR_RANGES.items():
+            assert np.array_equal(classifier.plane(labels, name), _reference_mask(hsv, info)), name
+
+    def test_color_rects_bound_each_plane(self):
+        hsv = np.zeros((50, 60, 3), dtype=np.uint8)
+        hsv[...] = (90, 0, 200)                 # grey: no color
+        hsv[10:20, 30:35] = (25, 200, 200)      # yellow patch
+        classifier = HSVLabelClassifier(COLOR_RANGES)
+        rects = classifier.color_rects(classifier.classify(hsv))
+        assert rects == {'yellow': (30, 10, 5, 10)}
+
+    def test_wide_tables_use_wider_labels(self):
+        ranges = {f'c{i}': {'lower': np.array([i, 0, 0]), 'upper': np.array([i, 255, 255])}
+                  for i in range(12)}
+        hsv = _random_hsv(seed=1)
+        classifier = HSVLabelClassifier(ranges)
+        labels = classifier.classify(hsv)
+        assert labels.dtype == np.uint16
+        for name, info in ranges.items():
+            assert np.array_equal(classifier.plane(labels, name), _reference_mask(hsv, info)), name
+
+    def test_pipeline_recompiles_after_in_place_edit(self):
+        from hsv_bounded_stereo_lesson import HSVStereoPipeline
+        pipeline = HSVStereoPipeline(15.24)
+        classifier = pipeline.get_classifier()
+        pipeline.color_ranges = copy.deepcopy(pipeline.color_ranges)
+        assert pipeline.get_classifier() is classifier
+
+        hsv = np.zeros((10, 10, 3), dtype=np.uint8)
+        hsv[...] = (25, 100, 200)
+        assert pipeline.get_classifier().color_rects(pipeline.get_classifier().classify(hsv))
+        pipeline.color_ranges['yellow']['lower'][1] = 150
+        assert pipeline.get_classifier() is not classifier
+        assert 'yellow' not in pipeline.get_classifier().color_rects(
+            pipeline.get_classifier().classify(hsv))
@@ -0,0 +1,85 @@
+"""
+Image loader tests.
+
+Sized loads must come back at the requested width from a reduced JPEG
+decode, repeated loads must be cache hits until the file changes, and the
+cache must stay within its byte budget.
+
+Run with:
+    pytest tests/test_image_loader.py -v
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from image_loader import ImageLoader, jpeg_size, reduction_factor
+
+
+@pytest.fixture
+def jpeg(tmp_path):
+    path = str(tmp_path / 'frame.jpg')
+    img = np.zeros((480, 640, 3), np.uint8)
+    img[100:300, 200:400] = (0, 220, 220)
+    cv2.imwrite(path, img)
+    return path
+
+
+class TestDecode:
+    def test_jpeg_size_from_header(self, jpeg, tmp_path):
+        assert jpeg_size(jpeg) == (640, 480)
+        png = str(tmp_path / 'frame.png')
+        cv2.imwrite(png, np.zeros((10, 20, 3), np.uint8))
+        assert jpeg_size(png) is None
+
+    def test_reduction_factor(self):
+        assert reduction_factor(2016, 800) == 2
+        assert reduction_factor(2856, 300) == 8
+        assert reduction_factor(640, 640) == 1
+        assert reduction_factor(640, 1000) == 1
+
+    def test_sized_load(self, jpeg, tmp_path):
+        loader = ImageLoader()
+        img = loader.load(jpeg, width=160)
+        assert img.shape == (120, 160, 3)
+        assert img[50, 75].tolist() == pytest.approx([0, 220, 220], abs=8)
+
+        png = str(tmp_path / 'frame.png')
+        cv2.imwrite(png, np.zeros((100, 200, 3), np.uint8))
+        assert loader.load(png, width=50).shape == (25, 50, 3)
+
+    def test_missing_file(self, tmp_path):
+        assert ImageLoader().load(str(tmp_path / 'nope.jpg')) is None
+
+
+class TestCache:
+    def test_hit_until_file_changes(self, jpeg):
+        loader = ImageLoader()
+        first = loader.load(jpeg)
+        assert loader.load(jpeg) is first
+        assert not first.flags.writeable
+        assert (loader.hits, loader.misses) == (1, 1)
+
+        loader.load(jpeg, width=320)                 # Different size, separate entry
+        assert loader.misses == 2
+
+        stat = os.stat(jpeg)
+        os.utime(jpeg, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert loader.load(jpeg) is not first
+        assert loader.misses == 3
+
+    def test_evicts_least_recently_used(self, jpeg):
+        full = 480 * 640 * 3
+        loader = ImageLoader(max_bytes=full + 160 * 120 * 3)
+        loader.load(jpeg)
+        loader.load(jpeg, width=160)
+        loader.load(jpeg)                            # Full size is now the most recent
+        loader.load(jpeg, width=320)                 # Evicts the 160 px entry first
+        assert loader.bytes <= loader.max_bytes
+        widths = sorted(img.shape[1] for img in loader.cache.values())
+        assert widths == [320]
+        assert loader.load(jpeg, width=160) is not None
+        assert loader.misses == 4
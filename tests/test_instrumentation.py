@@ -0,0 +1,130 @@
+"""
+Pipeline instrumentation tests.
+
+Spans, counters and gauges must reach every collector once per frame, a
+disabled Instrumentation must record nothing, and the pipeline's debug
+sink must carry the per-obstacle lines the stages used to print.
+
+Run with:
+    pytest tests/test_instrumentation.py -v
+"""
+
+import io
+import json
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from frame_sources import SyntheticSource
+from hsv_bounded_stereo_lesson import HSVStereoPipeline
+from instrumentation import (NULL_SPAN, DebugSink, Histogram, HistogramCollector,
+                             Instrumentation, JSONLinesExporter, SummaryCollector)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestInstrumentation:
+    def test_disabled_records_nothing(self):
+        instrumentation = Instrumentation()
+        assert instrumentation.span('stage1') is NULL_SPAN
+        with instrumentation.span('stage1'):
+            instrumentation.count('detections', 3)
+            instrumentation.gauge('depth_cm', 50.0)
+        instrumentation.debug("never {}", "formatted")
+        instrumentation.end_frame()
+        assert instrumentation.spans == {}
+        assert instrumentation.counters == {}
+        assert instrumentation.frame_index == 0
+
+    def test_frame_record_reaches_collectors(self):
+        clock = FakeClock()
+        histogram = HistogramCollector()
+        out = io.StringIO()
+        instrumentation = Instrumentation([histogram, JSONLinesExporter(out)], clock=clock)
+
+        for frame in range(3):
+            with instrumentation.span('stage1'):
+                clock.now += 0.010
+            with instrumentation.span('stage1'):   # Repeated spans add up
+                clock.now += 0.005
+            instrumentation.count('detections', frame)
+            instrumentation.gauge('depth_cm', 100.0 + frame)
+            instrumentation.end_frame()
+
+        assert histogram.frames == 3
+        assert histogram.totals == {'detections': 3}
+        assert histogram.gauges == {'depth_cm': 102.0}
+        stage1 = histogram.summary()['stage1']
+        assert stage1['n'] == 3
+        assert stage1['mean_ms'] == pytest.approx(15.0)
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        assert [r['frame'] for r in records] == [0, 1, 2]
+        assert records[1]['spans']['stage1'] == pytest.approx(15.0)
+        assert records[2]['counters'] == {'detections': 2}
+
+    def test_summary_line_per_interval(self):
+        clock = FakeClock()
+        out = io.StringIO()
+        instrumentation = Instrumentation([SummaryCollector(interval_s=1.0, out=out)], clock=clock)
+
+        for _ in range(17):          # 16 frame periods of 0.125s
+            with instrumentation.span('stage1'):
+                clock.now += 0.0625
+            clock.now += 0.0625
+            instrumentation.count('obstacles', 2)
+            instrumentation.end_frame()
+
+        lines = out.getvalue().splitlines()
+        assert len(lines) == 2
+        assert lines[0].startswith("8.0 fps | stage1 62.5ms")
+        assert "obstacles=2.0" in lines[0]
+
+
+class TestHistogram:
+    def test_percentiles_within_bucket_resolution(self):
+        histogram = Histogram()
+        values = np.linspace(1.0, 100.0, 1000)
+        for value in values:
+            histogram.add(value)
+        for q in (50, 95, 99):
+            assert histogram.percentile(q) == pytest.approx(np.percentile(values, q), rel=0.07)
+        assert histogram.max == 100.0
+        assert Histogram().percentile(50) is None
+
+
+class TestPipelineInstrumentation:
+    def frame(self):
+        source = SyntheticSource(size=(320, 240), num_frames=1, stereo=True)
+        ok, pair, _ = source.read()
+        assert ok
+        return pair
+
+    def test_default_pipeline_is_silent(self, capsys):
+        HSVStereoPipeline(15.24).process(*self.frame())
+        assert capsys.readouterr().out == ""
+
+    def test_stage_spans_counters_and_debug_lines(self):
+        histogram = HistogramCollector()
+        out = io.StringIO()
+        pipeline = HSVStereoPipeline(15.24, instrumentation=Instrumentation(
+            [histogram], DebugSink(out)))
+        result = pipeline.process(*self.frame())
+
+        assert set(histogram.histograms) == {'begin_frame', 'stage1', 'stage2', 'stage3', 'stage4'}
+        assert histogram.totals['detections'] == len(result.color_detections)
+        assert histogram.totals['obstacles'] == len(result.merged_obstacles)
+        assert histogram.gauges['process_ms'] == result.process_ms
+
+        text = out.getvalue()
+        assert "STAGE 1: HSV REGION PROPOSAL" in text
+        for det in result.color_detections:
+            assert f"  - {det['color_name']} at ({det['center'][0]}, {det['center'][1]})" in text
@@ -0,0 +1,106 @@
+"""
+MJPEG debug stream server tests.
+
+Frames must be encoded once however many clients watch, slow clients must
+lose their oldest frames instead of growing a backlog, due() must respect
+the display rate, and a real HTTP client must get decodable JPEG parts.
+
+Run with:
+    pytest tests/test_mjpeg_server.py -v
+"""
+
+import http.client
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from mjpeg_server import MJPEGServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def image(value):
+    return np.full((48, 64, 3), value, np.uint8)
+
+
+class TestPublish:
+    def test_encode_once_and_drop_for_slow_clients(self):
+        server = MJPEGServer(queue_size=2)
+        clients = [server.add_client('1'), server.add_client('1'), server.add_client('2')]
+
+        for value in range(5):
+            server.publish('1', image(value * 50))
+
+        assert server.encoded == 5
+        assert [len(c.queue) for c in clients] == [2, 2, 0]
+        assert [c.dropped for c in clients] == [3, 3, 0]
+        assert server.stats()['dropped'] == 6
+
+        # The two newest frames are left, oldest first
+        newest = cv2.imdecode(np.frombuffer(clients[0].queue[-1], np.uint8), cv2.IMREAD_COLOR)
+        assert abs(int(newest.mean()) - 200) <= 2
+
+    def test_new_client_gets_latest_frame(self):
+        server = MJPEGServer()
+        server.publish('1', image(10))
+        client = server.add_client('1')
+        assert client.queue[0] == server.latest['1']
+
+    def test_due_follows_clients_display_rate_and_key(self):
+        clock = FakeClock()
+        server = MJPEGServer(max_fps=10, clock=clock)
+        assert not server.due('1')            # Nobody watching
+
+        client = server.add_client('1')
+        assert server.due('1', key=0)
+        server.publish('1', image(0), key=0)
+        clock.now += 0.05
+        assert not server.due('1', key=1)     # Too soon for 10fps
+        clock.now += 0.05
+        assert server.due('1', key=1)
+        assert not server.due('1', key=0)     # Same content already sent
+
+        server.remove_client(client)
+        assert not server.due('1', key=2)
+
+
+class TestHTTP:
+    def test_stream_and_snapshot(self):
+        server = MJPEGServer(host='127.0.0.1', port=0).start()
+        try:
+            server.publish('1', image(128))
+
+            conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+            conn.request('GET', '/snapshot/1.jpg')
+            response = conn.getresponse()
+            assert response.status == 200
+            snapshot = cv2.imdecode(np.frombuffer(response.read(), np.uint8), cv2.IMREAD_COLOR)
+            assert snapshot.shape == (48, 64, 3)
+
+            conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+            conn.request('GET', '/stream/1')
+            response = conn.getresponse()
+            assert response.getheader('Content-Type').startswith('multipart/x-mixed-replace')
+            assert response.fp.readline().strip() == b'--frame'
+            headers = {}
+            while True:
+                line = response.fp.readline().strip()
+                if not line:
+                    break
+                key, _, value = line.decode().partition(':')
+                headers[key.lower()] = value.strip()
+            part = response.fp.read(int(headers['content-length']))
+            frame = cv2.imdecode(np.frombuffer(part, np.uint8), cv2.IMREAD_COLOR)
+            assert abs(int(frame.mean()) - 128) <= 2
+            assert server.stats()['clients'] == 1
+            conn.close()
+        finally:
+            server.stop()
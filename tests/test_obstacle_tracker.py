@@ -0,0 +1,110 @@
+"""
+Obstacle tracker tests.
+
+Tracks must keep their IDs across frames and estimate velocity, stages 3-4
+must only be scheduled for new, moved, resized or depth-stale obstacles,
+and a tracked pipeline must report the same obstacles as an untracked one
+on a static scene.
+
+Run with:
+    pytest tests/test_obstacle_tracker.py -v
+"""
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from detection_arrays import ObstacleArrays
+from frame_sources import SyntheticSource
+from hsv_bounded_stereo_lesson import HSVStereoPipeline
+from obstacle_tracker import ObstacleTracker
+
+
+def _obs(x, y, w=40, h=30):
+    return {'bbox': (x, y, w, h), 'center': (x + w // 2, y + h // 2)}
+
+
+def _step(tracker, obstacles):
+    """One frame: update, then pretend stages 3-4 ran on the stale ones."""
+    result, stale = tracker.update(ObstacleArrays.from_obstacles(obstacles))
+    refreshed = result.take(stale)
+    refreshed.records['depth_cm'] = 100.0 + tracker.frame
+    tracker.refreshed(refreshed)
+    result.assign(stale, refreshed)
+    return result.records, refreshed.records
+
+
+class TestObstacleTracker:
+    def test_stable_ids_and_velocity(self):
+        tracker = ObstacleTracker(move_px=100)
+        ids = set()
+        for frame in range(10):
+            result, _ = _step(tracker, [_obs(10 + 3 * frame, 50), _obs(300, 200)])
+            ids.update(result['track_id'].tolist())
+        assert len(ids) == 2
+        moving, still = result
+        assert moving['velocity'][0] == pytest.approx(3.0, abs=0.5)
+        assert abs(still['velocity'][0]) < 0.5
+        assert still['confidence'] == 1.0
+
+    def test_schedules_only_changed_obstacles(self):
+        tracker = ObstacleTracker(move_px=4, resize_ratio=0.1, depth_max_age=100)
+        _, stale = _step(tracker, [_obs(10, 10), _obs(200, 10)])
+        assert len(stale) == 2
+
+        result, stale = _step(tracker, [_obs(11, 10), _obs(200, 10)])
+        assert len(stale) == 0
+        assert tuple(result[0]['bbox']) == (10, 10, 40, 30)    # Box its results belong to
+        assert result[0]['depth_cm'] == 101.0
+
+        _, stale = _step(tracker, [_obs(20, 10), _obs(200, 10, 60, 30), _obs(400, 300)])
+        assert stale['bbox'][:, 0].tolist() == [20, 200, 400]
+
+    def test_depth_goes_stale(self):
+        tracker = ObstacleTracker(depth_max_age=3)
+        scheduled = [len(_step(tracker, [_obs(10, 10)])[1]) for _ in range(7)]
+        assert scheduled == [1, 0, 0, 1, 0, 0, 1]
+
+    def test_lost_tracks_are_dropped(self):
+        tracker = ObstacleTracker(max_missed=2)
+        first, _ = _step(tracker, [_obs(10, 10)])
+        for _ in range(2):
+            _step(tracker, [])
+        again, _ = _step(tracker, [_obs(10, 10)])
+        assert again[0]['track_id'] == first[0]['track_id']
+
+        for _ in range(3):
+            _step(tracker, [])
+        assert tracker.tracks == []
+        result, stale = _step(tracker, [_obs(10, 10)])
+        assert result[0]['track_id'] != first[0]['track_id'] and len(stale) == 1
+
+    def test_reused_obstacles_keep_payloads(self):
+        tracker = ObstacleTracker(move_px=4, depth_max_age=100)
+        obstacles, stale = tracker.update(ObstacleArrays.from_obstacles([_obs(10, 10)]))
+        refreshed = obstacles.take(stale)
+        refreshed.contours = [[np.zeros((4, 1, 2), np.int32)]]
+        refreshed.edges = refreshed.disparities = [np.ones((30, 40), np.uint8)]
+        refreshed.skip_reasons = [None]
+        tracker.refreshed(refreshed)
+
+        obstacles, stale = tracker.update(ObstacleArrays.from_obstacles([_obs(11, 10)]))
+        assert len(stale) == 0
+        assert obstacles.contours[0] is refreshed.contours[0]
+        assert obstacles.disparities[0] is refreshed.disparities[0]
+
+
+class TestTrackedPipeline:
+    def test_static_scene_matches_untracked(self):
+        ok, pair, _ = SyntheticSource(stereo=True).read()
+        expected = HSVStereoPipeline(15.24).process(*pair)
+
+        pipeline = HSVStereoPipeline(15.24)
+        pipeline.tracker = ObstacleTracker()
+        for _ in range(3):
+            result = pipeline.process(*pair)
+
+        assert pipeline.tracker.scheduled == len(expected.merged_obstacles)
+        assert ([(o['bbox'], o['num_contours'], o['depth_cm']) for o in result.merged_obstacles] ==
+                [(o['bbox'], o['num_contours'], o['depth_cm']) for o in expected.merged_obstacles])
@@ -0,0 +1,121 @@
+"""
+Parameter sweep tests.
+
+Configurations must expand from grids and ranges, reused stage outputs
+must give the same numbers as a fresh pipeline run per configuration, and
+a stage must only rerun when a parameter it depends on changes.
+
+Run with:
+    pytest tests/test_param_sweep.py -v
+"""
+
+import pytest
+
+pytest.importorskip("cv2")
+
+from frame_sources import SyntheticSource
+from hsv_bounded_stereo_lesson import HSVStereoPipeline
+from param_sweep import (Evaluator, build_configs, parse_values, set_param, stage_keys,
+                         sweep)
+
+
+def _pair():
+    ok, pair, _ = SyntheticSource(stereo=True).read()
+    return pair
+
+
+class TestConfigs:
+    def test_parse_values(self):
+        assert parse_values('30,50,80') == [30, 50, 80]
+        assert parse_values('0.5,1') == [0.5, 1]
+        assert parse_values('5:30') == (5, 30)
+        assert parse_values('auto,per_roi') == ['auto', 'per_roi']
+
+    def test_grid_and_random(self):
+        grid = build_configs({'canny_threshold1': [30, 50], 'roi_padding': [5, 10, 15]})
+        assert len(grid) == 6
+        assert {'canny_threshold1': 50, 'roi_padding': 15} in grid
+
+        samples = build_configs({'roi_padding': (5, 30), 'block_size': [5, 7]}, samples=20, seed=1)
+        assert len(samples) == 20
+        assert all(5 <= c['roi_padding'] <= 30 and c['block_size'] in (5, 7) for c in samples)
+        assert samples == build_configs({'roi_padding': (5, 30), 'block_size': [5, 7]},
+                                        samples=20, seed=1)
+
+        with pytest.raises(ValueError):
+            build_configs({'roi_padding': (5, 30)})
+        with pytest.raises(ValueError):
+            build_configs({'not_a_parameter': [1]})
+
+    def test_set_nested_param(self):
+        pipeline = HSVStereoPipeline(15.24)
+        set_param(pipeline, 'color_ranges.yellow.lower.1', 90)
+        set_param(pipeline, 'sgbm_params.uniquenessRatio', 5)
+        assert pipeline.color_ranges['yellow']['lower'][1] == 90
+        assert pipeline.sgbm_params['uniquenessRatio'] == 5
+
+    def test_stage_keys_separate_stages(self):
+        a = stage_keys({'color_ranges.yellow.lower.1': 70, 'canny_threshold1': 30})
+        b = stage_keys({'color_ranges.yellow.lower.1': 70, 'canny_threshold1': 80})
+        assert a[:2] == b[:2] and a[3] == b[3] and a[2] != b[2]
+
+
+class TestEvaluator:
+    def test_reuse_matches_fresh_runs(self):
+        left, right = _pair()
+        configs = build_configs({'merge_margin_x': [5, 40], 'canny_threshold1': [20, 120],
+                                 'block_size': [5, 9]})
+        evaluator = Evaluator(HSVStereoPipeline(15.24))
+        results = evaluator.run_frame(left, right, configs)
+        assert evaluator.stage_runs == [1, 2, 4, 4]
+
+        for config, metrics in zip(configs, results):
+            pipeline = HSVStereoPipeline(15.24)
+            for path, value in config.items():
+                set_param(pipeline, path, value)
+            result = pipeline.process(left, right)
+            assert metrics['detections'] == len(result.color_detections)
+            assert metrics['obstacles'] == len(result.merged_obstacles)
+            assert metrics['contours'] == sum(o['num_contours'] for o in result.merged_obstacles)
+            assert metrics['with_depth'] == len(result.obstacles_with_depth)
+
+    def test_color_range_change_reruns_stage1(self):
+        left, right = _pair()
+        evaluator = Evaluator(HSVStereoPipeline(15.24))
+        loose = evaluator.run_frame(left, right, [{'color_ranges.red.lower1.1': 100}])
+        strict = evaluator.run_frame(left, right, [{'color_ranges.red.lower1.1': 256}])
+        assert evaluator.stage_runs[0] == 2
+        assert strict[0]['detections'] < loose[0]['detections']
+        # Defaults are restored between configurations
+        assert evaluator.pipeline.color_ranges['red']['lower1'][1] == 256
+        evaluator.apply({})
+        assert evaluator.pipeline.color_ranges['red']['lower1'][1] == 100
+
+    def test_frame_derived_focal_length_survives_configs(self):
+        from param_sweep import make_pipeline
+        left, right = _pair()
+        configs = build_configs({'block_size': [5, 9]})
+        evaluator = Evaluator(make_pipeline('gemini', 15.24))
+        results = evaluator.run_frame(left, right, configs)
+        assert evaluator.pipeline.focal_length == 0.8 * left.shape[1]
+
+        for config, metrics in zip(configs, results):
+            pipeline = make_pipeline('gemini', 15.24)
+            for path, value in config.items():
+                set_param(pipeline, path, value)
+            result = pipeline.process(left, right)
+            assert metrics['with_depth'] == len(result.obstacles_with_depth)
+
+
+class TestSweep:
+    def test_rows_and_scores(self):
+        configs = build_configs({'roi_padding': [0, 15]})
+        labels = {'0': [[60, 220, 120, 90]], '1': [[60, 220, 120, 90]]}
+        rows, stage_runs, num_frames = sweep('synthetic', configs, workers=1, max_frames=2,
+                                             labels=labels)
+        assert num_frames == 2
+        assert stage_runs[0] == 2 and stage_runs[1] == 4
+        assert [row['roi_padding'] for row in rows] == [0, 15]
+        for row in rows:
+            assert row['obstacles_per_frame'] > 0
+            assert 0.0 <= row['score'] <= 1.0
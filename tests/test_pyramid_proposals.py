@@ -0,0 +1,81 @@
+"""
+Coarse-to-fine stage 1 proposal tests.
+
+Pyramid mode must find the same boxes as the full-resolution path on blobs
+well above min_area, including blobs that straddle refinement tiles, and
+proposal_agreement must score matches by color and IoU.
+
+Run with:
+    pytest tests/test_pyramid_proposals.py -v
+"""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from hsv_bounded_stereo_lesson import HSVStereoPipeline, proposal_agreement
+
+
+def _scene():
+    img = np.full((480, 640, 3), 128, np.uint8)
+    img[90:210, 100:300] = (0, 220, 220)       # Yellow, across tile seams at x=128, 256 and y=128
+    img[300:420, 400:600] = (40, 40, 200)      # Red
+    img[250:400, 60:220] = (10, 10, 10)        # Black
+    rng = np.random.default_rng(3)
+    for x, y in rng.integers(0, 600, (40, 2)):
+        img[y % 470:y % 470 + 2, x:x + 2] = (0, 220, 220)   # Specks far below min_area
+    return img
+
+
+def _stage1(img, mode):
+    pipeline = HSVStereoPipeline(15.24)
+    pipeline.proposal_mode = mode
+    pipeline.begin_frame(img, img)
+    pipeline.stage1_hsv_region_proposal()
+    return pipeline
+
+
+class TestPyramidProposals:
+    def test_matches_full_resolution(self):
+        img = _scene()
+        full = _stage1(img, 'full')
+        pyramid = _stage1(img, 'pyramid')
+
+        assert len(full.color_detections) >= 3
+        agreement = proposal_agreement(full.color_detections, pyramid.color_detections)
+        assert agreement['recall'] == 1.0
+        assert agreement['precision'] == 1.0
+        assert agreement['mean_iou'] == 1.0
+
+    def test_masks_exact_across_tile_seams(self):
+        img = _scene()
+        full = _stage1(img, 'full')
+        pyramid = _stage1(img, 'pyramid')
+        for color_name, mask in full.color_masks.items():
+            np.testing.assert_array_equal(pyramid.color_masks[color_name], mask)
+
+    def test_empty_frame(self):
+        pipeline = _stage1(np.full((240, 320, 3), 128, np.uint8), 'pyramid')
+        assert pipeline.color_detections == []
+
+
+class TestProposalAgreement:
+    def det(self, color, bbox):
+        return {'color': color, 'bbox': bbox, 'area': bbox[2] * bbox[3]}
+
+    def test_matches_by_color_and_iou(self):
+        reference = [self.det('yellow', (0, 0, 10, 10)), self.det('blue', (50, 50, 20, 20))]
+        candidate = [self.det('blue', (0, 0, 10, 10)),          # Right box, wrong color
+                     self.det('blue', (52, 50, 20, 20)),
+                     self.det('yellow', (100, 100, 5, 5))]
+        agreement = proposal_agreement(reference, candidate)
+        assert agreement['matched'] == 1
+        assert agreement['recall'] == 0.5
+        assert agreement['precision'] == pytest.approx(1 / 3)
+        assert agreement['mean_iou'] == pytest.approx(360 / 440)
+
+    def test_each_candidate_matches_once(self):
+        reference = [self.det('yellow', (0, 0, 10, 10)), self.det('yellow', (0, 0, 10, 10))]
+        agreement = proposal_agreement(reference, [self.det('yellow', (0, 0, 10, 10))])
+        assert agreement['matched'] == 1
@@ -0,0 +1,101 @@
+"""
+Rectification map cache tests.
+
+Maps are built once from a calibration file, reused while it is unchanged,
+and remapping a box must give exactly that box of the full rectified frame.
+Stage 4 rerun on the same frame with a wider plan must rectify the extra
+parts of the right frame too.
+
+Run with:
+    pytest tests/test_rectification.py -v
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from frame_sources import SyntheticSource
+from hsv_bounded_stereo_lesson import HSVStereoPipeline
+from rectification import StereoRectifier, default_maps_dir
+
+
+def _write_calibration(path, size=(320, 240)):
+    width, height = size
+    K = np.array([[300.0, 0, width / 2], [0, 300.0, height / 2], [0, 0, 1]])
+    D = np.array([[-0.25, 0.08, 0.0, 0.0, 0.0]])
+    R = cv2.Rodrigues(np.array([0.0, 0.01, 0.0]))[0]
+    T = np.array([[-15.0], [0.0], [0.0]])
+    np.savez(path, K1=K, D1=D, K2=K, D2=D, R=R, T=T, image_size=np.array(size))
+
+
+class TestStereoRectifier:
+    def test_maps_are_fixed_point_and_memory_mapped(self, tmp_path):
+        calib = str(tmp_path / 'stereo_calibration.npz')
+        _write_calibration(calib)
+        rectifier = StereoRectifier.load(calib)
+
+        assert rectifier.maps['left_map1'].dtype == np.int16
+        assert rectifier.maps['left_map1'].shape == (240, 320, 2)
+        assert rectifier.maps['left_map2'].dtype == np.uint16
+        assert isinstance(rectifier.maps['left_map1'], np.memmap)
+
+    def test_maps_rebuilt_only_when_calibration_changes(self, tmp_path):
+        calib = str(tmp_path / 'stereo_calibration.npz')
+        _write_calibration(calib)
+        StereoRectifier.load(calib)
+        map_path = os.path.join(default_maps_dir(calib), 'left_map1.npy')
+        first = os.stat(map_path).st_mtime_ns
+
+        StereoRectifier.load(calib)
+        assert os.stat(map_path).st_mtime_ns == first
+
+        _write_calibration(calib, size=(160, 120))
+        rectifier = StereoRectifier.load(calib)
+        assert rectifier.image_size == (160, 120)
+
+    def test_roi_matches_full_frame(self, tmp_path):
+        calib = str(tmp_path / 'stereo_calibration.npz')
+        _write_calibration(calib)
+        rectifier = StereoRectifier.load(calib)
+
+        frame = np.random.default_rng(0).integers(0, 256, (240, 320, 3), dtype=np.uint8)
+        full = rectifier.rectify('right', frame)
+        box = rectifier.rectify_roi('right', frame, (50, 40, 100, 60))
+        assert np.array_equal(box, full[40:100, 50:150])
+
+    def test_wrong_frame_size_rejected(self, tmp_path):
+        calib = str(tmp_path / 'stereo_calibration.npz')
+        _write_calibration(calib)
+        rectifier = StereoRectifier.load(calib)
+        with pytest.raises(ValueError):
+            rectifier.rectify('left', np.zeros((100, 100, 3), dtype=np.uint8))
+
+
+class TestROIRectification:
+    def _depths(self, rectifier, pair, num_disparities):
+        pipeline = HSVStereoPipeline(15.24, rectifier=rectifier)
+        pipeline.depth_strategy = 'per_roi'
+        pipeline.begin_frame(*pair)
+        pipeline.stage1_hsv_region_proposal()
+        pipeline.stage2_merge_nearby_detections()
+        for value in num_disparities:
+            pipeline.num_disparities = value
+            pipeline.stage4_stereo_depth_analysis()
+        return pipeline, [obs['depth_cm'] for obs in pipeline.merged_obstacles]
+
+    def test_wider_rerun_rectifies_missing_bands(self, tmp_path):
+        calib = str(tmp_path / 'stereo_calibration.npz')
+        _write_calibration(calib)
+        rectifier = StereoRectifier.load(calib)
+        ok, pair, _ = SyntheticSource(size=(320, 240), stereo=True).read()
+
+        pipeline, rerun = self._depths(rectifier, pair, [16, 64])
+        _, direct = self._depths(rectifier, pair, [64])
+        assert rerun == direct
+
+        full = rectifier.rectify('right', cv2.cvtColor(pair[1], cv2.COLOR_BGR2GRAY))
+        for x0, y0, x1, y1 in pipeline.depth_plan['bands']:
+            assert np.array_equal(pipeline.right_gray[y0:y1, x0:x1], full[y0:y1, x0:x1])
@@ -0,0 +1,80 @@
+"""
+Render cache tests.
+
+A mode must be rendered once per data version, imshow must only be called
+when the mode or the data changed, and canvases must be reused per slot.
+
+Run with:
+    pytest tests/test_render_cache.py -v
+"""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+import render_cache
+from render_cache import RenderCache
+
+
+@pytest.fixture
+def shown(monkeypatch):
+    frames = []
+    monkeypatch.setattr(render_cache.cv2, 'imshow', lambda window, image: frames.append(image))
+    return frames
+
+
+class TestRenderCache:
+    def make(self):
+        image = np.full((20, 30, 3), 7, np.uint8)
+        calls = []
+
+        def render(mode):
+            calls.append(mode)
+            canvas = renderer.canvas(image, mode)
+            canvas[0, 0] = len(calls)
+            return canvas
+
+        renderer = RenderCache(render)
+        return renderer, calls, image
+
+    def test_renders_once_per_version(self):
+        renderer, calls, _ = self.make()
+        first = renderer.render('1')
+        assert renderer.render('1') is first
+        renderer.render('2')
+        renderer.render('1')
+        assert calls == ['1', '2']
+
+        renderer.invalidate()
+        renderer.render('1')
+        assert calls == ['1', '2', '1']
+
+    def test_show_only_on_change(self, shown):
+        renderer, calls, _ = self.make()
+        for _ in range(10):
+            renderer.show("window", '1')
+        assert len(shown) == 1
+
+        renderer.show("window", '2')
+        renderer.show("window", '1')          # Cached image, but not on screen any more
+        assert len(shown) == 3
+        assert calls == ['1', '2']
+
+        renderer.invalidate()
+        assert renderer.show("window", '1')
+        assert not renderer.show("window", '1')
+        assert len(shown) == 4
+
+    def test_canvas_reused_and_refilled(self):
+        renderer, _, image = self.make()
+        first = renderer.canvas(image, 'a')
+        first[:] = 0
+        second = renderer.canvas(image, 'a')
+        assert second is first
+        np.testing.assert_array_equal(second, image)
+        assert renderer.canvas(image, 'b') is not first
+
+        blank = renderer.blank(image, 'a')
+        assert blank is first and not blank.any()
+        assert renderer.canvas(np.zeros((5, 5, 3), np.uint8), 'a') is not first
@@ -0,0 +1,76 @@
+"""
+Epipolar-band ROI stereo and depth strategy tests.
+
+A synthetic pair shifted by a known disparity must be recovered inside a
+box narrower than the shift - the case the old same-window crop skipped.
+The planner must prefer one union band when boxes pile up.
+
+Run with:
+    pytest tests/test_roi_stereo.py -v
+"""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from depth_planner import DepthPlanner, union_area
+from roi_stereo import ROIStereoEngine
+from stereo_matchers import StereoMatcherPool
+
+
+def _shifted_pair(shift, shape=(200, 400), seed=0):
+    rng = np.random.default_rng(seed)
+    texture = rng.integers(0, 256, (shape[0], shape[1] + shift), dtype=np.uint8)
+    texture = cv2.GaussianBlur(texture, (3, 3), 0)
+    # left(u) == right(u - shift)
+    left = np.ascontiguousarray(texture[:, :shape[1]])
+    right = np.ascontiguousarray(texture[:, shift:])
+    return left, right
+
+
+class TestROIStereoEngine:
+    def test_recovers_shift_in_narrow_box(self):
+        left, right = _shifted_pair(shift=40)
+        engine = ROIStereoEngine(StereoMatcherPool())
+        bbox = (250, 80, 30, 40)
+        disparity = engine.compute(left, right, bbox, 64, 7)
+
+        assert disparity.shape == (40, 30)
+        valid = disparity[disparity > 0] / 16.0
+        assert len(valid) > 0.9 * disparity.size
+        assert abs(np.median(valid) - 40) < 1
+
+    def test_band_grows_left_by_search_range(self):
+        engine = ROIStereoEngine(StereoMatcherPool())
+        assert engine.band((100, 50, 20, 10), (200, 400), 64, 7) == (33, 47, 123, 63)
+
+    def test_too_narrow_band_returns_none(self):
+        left, right = _shifted_pair(shift=4, shape=(60, 20))
+        engine = ROIStereoEngine(StereoMatcherPool())
+        assert engine.compute(left, right, (0, 10, 10, 10), 64, 7) is None
+
+
+class TestDepthPlanner:
+    def test_union_area_counts_overlap_once(self):
+        assert union_area([(0, 0, 10, 10), (5, 5, 15, 15), (20, 20, 21, 21)]) == 175 + 1
+
+    def test_sparse_boxes_match_per_roi(self):
+        planner = DepthPlanner(ROIStereoEngine(StereoMatcherPool()))
+        plan = planner.plan([(100, 10, 20, 20), (900, 700, 20, 20)], (800, 1000), 64, 7)
+        assert plan['strategy'] == 'per_roi'
+
+    def test_overlapping_boxes_share_one_band(self):
+        planner = DepthPlanner(ROIStereoEngine(StereoMatcherPool()))
+        boxes = [(200 + 10 * i, 100, 120, 120) for i in range(6)]
+        plan = planner.plan(boxes, (800, 1000), 64, 7)
+        assert plan['strategy'] == 'union'
+        assert plan['overlap_ratio'] > 1.5
+        assert plan['est_cost_union'] < plan['est_cost_per_roi']
+
+    def test_union_slices_match_shift(self):
+        left, right = _shifted_pair(shift=24)
+        engine = ROIStereoEngine(StereoMatcherPool())
+        disparity, origin = engine.compute_band(left, right, (150, 60, 120, 80), 64, 7)
+        roi = disparity[80 - origin[1]:100 - origin[1], 200 - origin[0]:230 - origin[0]]
+        assert abs(np.median(roi[roi > 0]) / 16.0 - 24) < 1
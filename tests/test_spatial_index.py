@@ -0,0 +1,89 @@
+"""
+Sort-and-sweep stage 2 merge tests.
+
+The pairs from overlapping_pairs must be exactly the pairs whose grown boxes
+meet, so merged groups match the old all-pairs should_merge loop.
+
+Run with:
+    pytest tests/test_spatial_index.py -v
+"""
+
+import contextlib
+import io
+import itertools
+
+import numpy as np
+import pytest
+
+pytest.importorskip("cv2")
+
+from spatial_index import box_iou, overlapping_pairs
+from hsv_bounded_stereo_lesson import HSVStereoPipeline
+
+
+def _random_detections(n, seed, width=800, height=600, max_size=60):
+    rng = np.random.default_rng(seed)
+    detections = []
+    for _ in range(n):
+        w, h = (int(v) for v in rng.integers(1, max_size, 2))
+        x = int(rng.integers(0, width - w))
+        y = int(rng.integers(0, height - h))
+        detections.append({'color': 'yellow', 'color_name': 'YELLOW', 'color_bgr': (0, 255, 255),
+                           'bbox': (x, y, w, h), 'center': (x + w//2, y + h//2), 'area': w * h})
+    return detections
+
+
+def _brute_force_groups(pipeline, detections):
+    parent = list(range(len(detections)))
+
+    def find(i):
+        while parent[i] != i:
+            i = parent[i]
+        return i
+
+    for i, j in itertools.combinations(range(len(detections)), 2):
+        if pipeline.should_merge(detections[i], detections[j]):
+            parent[find(i)] = find(j)
+    groups = {}
+    for i in range(len(detections)):
+        groups.setdefault(find(i), []).append(i)
+    return sorted(sorted(g) for g in groups.values())
+
+
+@pytest.mark.parametrize("margins", [(20, 15, 100), (40, 15, 20), (0, 0, 5)])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_sweep_merge_matches_all_pairs(margins, seed):
+    pipeline = HSVStereoPipeline(15.24)
+    pipeline.merge_margin_x, pipeline.merge_margin_y, pipeline.merge_max_y_gap = margins
+    pipeline.img_width, pipeline.img_height = 800, 600
+    pipeline.color_detections = _random_detections(300, seed)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline.stage2_merge_nearby_detections()
+
+    index = {id(d): i for i, d in enumerate(pipeline.color_detections)}
+    got = sorted(sorted(index[id(d)] for d in obs['detections'])
+                 for obs in pipeline.merged_obstacles)
+    assert got == _brute_force_groups(pipeline, pipeline.color_detections)
+
+
+def test_pairs_include_touching_boxes():
+    # Gap of exactly margin_x still merges (inclusive comparison in should_merge)
+    boxes = [(30, 0, 10, 10), (0, 0, 10, 10), (100, 100, 5, 5)]
+    assert sorted(zip(*(v.tolist() for v in overlapping_pairs(boxes, 20, 0)))) == [(1, 0)]
+    assert len(overlapping_pairs(boxes, 19, 0)[0]) == 0
+
+
+def test_pairs_match_brute_force():
+    boxes = [d['bbox'] for d in _random_detections(200, 3)]
+    i, j = overlapping_pairs(boxes, -1, -1)
+    got = {tuple(sorted(p)) for p in zip(i.tolist(), j.tolist())}
+    expected = {(a, b) for a, b in itertools.combinations(range(len(boxes)), 2)
+                if box_iou(boxes[a], boxes[b]) > 0}
+    assert len(got) == len(i) and got == expected
+
+
+def test_box_iou():
+    assert box_iou((0, 0, 10, 10), (0, 0, 10, 10)) == 1.0
+    assert box_iou((0, 0, 10, 10), (10, 0, 10, 10)) == 0.0      # Touching edges only
+    assert box_iou((0, 0, 10, 10), (5, 0, 10, 10)) == pytest.approx(50 / 150)
@@ -0,0 +1,103 @@
+"""
+Stage graph tests.
+
+A stage must only run when an output needs it, rerun only when its inputs
+or declared parameters change, keep its last cache_size results, and the
+pipeline's graph must give the same obstacles as process().
+
+Run with:
+    pytest tests/test_stage_graph.py -v
+"""
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from edge_detection_lesson import edge_graph, process_frame
+from frame_sources import SyntheticSource
+from hsv_bounded_stereo_lesson import HSVStereoPipeline
+from stage_graph import StageGraph
+
+
+def _graph(params):
+    graph = StageGraph(params)
+    graph.add_input('x')
+    graph.add('double', lambda x: x * 2, ['x'])
+    graph.add('scaled', lambda d: d * params['k'], ['double'], ['k'], cache_size=2)
+    graph.add('other', lambda x: x + 1, ['x'])
+    return graph
+
+
+class TestStageGraph:
+    def test_lazy_and_memoized(self):
+        params = {'k': 3}
+        graph = _graph(params)
+        graph.set_input('x', 5)
+        assert graph.get('scaled') == 30
+        assert graph.get('scaled') == 30
+        assert graph.runs == {'double': 1, 'scaled': 1}
+
+        assert graph.get('other') == 6
+        assert graph.runs['other'] == 1
+
+    def test_param_change_reruns_only_its_stage(self):
+        params = {'k': 3}
+        graph = _graph(params)
+        graph.set_input('x', 5)
+        graph.get('scaled')
+        params['k'] = 4
+        assert graph.get('scaled') == 40
+        params['k'] = 3                   # Still in the cache (cache_size=2)
+        assert graph.get('scaled') == 30
+        assert graph.runs == {'double': 1, 'scaled': 2}
+
+        params['k'] = 5
+        graph.get('scaled')
+        params['k'] = 4                   # Evicted by k=5
+        graph.get('scaled')
+        assert graph.runs['scaled'] == 4
+
+    def test_set_input_invalidates_downstream(self):
+        graph = _graph({'k': 1})
+        graph.set_input('x', 1)
+        graph.get('scaled')
+        graph.set_input('x', 2)
+        assert graph.get('scaled') == 4
+        assert graph.runs == {'double': 2, 'scaled': 2}
+
+    def test_errors(self):
+        graph = _graph({'k': 1})
+        with pytest.raises(LookupError):
+            graph.get('double')
+        with pytest.raises(ValueError):
+            graph.add('bad', lambda y: y, ['missing'])
+        with pytest.raises(KeyError):
+            graph.set_input('double', 1)
+
+
+class TestPipelineGraphs:
+    def test_pipeline_graph_matches_process(self):
+        ok, pair, _ = SyntheticSource(stereo=True).read()
+        result = HSVStereoPipeline(15.24).process(*pair)
+        expected = [(o['bbox'], o['num_contours'], o.get('has_depth')) for o in result.merged_obstacles]
+
+        pipeline = HSVStereoPipeline(15.24)
+        graph = pipeline.stage_graph()
+        graph.set_input('pair', pair)
+        obstacles = graph.get('obstacles').to_dicts()
+        assert [(o['bbox'], o['num_contours'], o.get('has_depth')) for o in obstacles] == expected
+
+        pipeline.canny_threshold1 = 10
+        graph.get('obstacles')
+        assert graph.runs['stage3'] == 2
+        assert graph.runs['stage2'] == graph.runs['stage4'] == 1
+
+    def test_edge_graph_matches_process_frame(self):
+        frame = np.random.default_rng(0).integers(0, 255, (48, 64, 3), dtype=np.uint8)
+        steps = process_frame(frame)
+        graph = edge_graph()
+        graph.set_input('frame', frame)
+        np.testing.assert_array_equal(graph.get('grayscale'), steps['grayscale'])
+        assert 'edges' not in graph.runs
+        np.testing.assert_array_equal(graph.get('edges'), steps['edges'])
@@ -0,0 +1,75 @@
+"""
+Stereo pair capture tests.
+
+Two recorded cameras with sidecar timestamps stand in for the CSI pair:
+frames must be paired within the tolerance, frames without a partner dropped,
+and only the newest pair handed out.
+
+Run with:
+    pytest tests/test_stereo_capture.py -v
+"""
+
+import time
+
+import numpy as np
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+
+from frame_sources import VideoFileSource
+from stereo_capture import StereoPairCapture
+
+
+def _write_video(path, timestamps):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*'MJPG'), 30, (64, 48))
+    if not writer.isOpened():
+        pytest.skip("MJPG video writer not available")
+    for i in range(len(timestamps)):
+        writer.write(np.full((48, 64, 3), i * 8, np.uint8))
+    writer.release()
+    with open(str(path) + '.timestamps', 'w') as f:
+        f.write('\n'.join(f'{t:.6f}' for t in timestamps))
+
+
+def _wait_for_end(stereo):
+    deadline = time.monotonic() + 2.0
+    while not all(stereo.ended.values()) and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+class TestStereoPairCapture:
+    def test_pairs_within_tolerance_and_drops_orphans(self, tmp_path):
+        left_ts = [i / 30 for i in range(10)]
+        right_ts = [t + 0.002 for i, t in enumerate(left_ts) if i != 4]   # Right missed frame 4
+        _write_video(tmp_path / 'left.avi', left_ts)
+        _write_video(tmp_path / 'right.avi', right_ts)
+
+        stereo = StereoPairCapture(VideoFileSource(str(tmp_path / 'left.avi')),
+                                   VideoFileSource(str(tmp_path / 'right.avi')),
+                                   tolerance_ms=5.0, queue_size=32).start()
+        _wait_for_end(stereo)
+
+        ok, (left, right), timestamp = stereo.read()
+        assert ok
+        assert left.shape == right.shape == (48, 64, 3)
+        assert timestamp == pytest.approx(9 / 30 + 0.001)
+        assert stereo.last_skew_ms == pytest.approx(2.0, abs=1e-3)
+
+        stats = stereo.stats()
+        assert stats['dropped_left'] == 1
+        assert stats['dropped_right'] == 0
+        assert stats['stale_pairs'] == 8
+        assert not stereo.read(timeout=0.1)[0]
+        stereo.release()
+
+    def test_skew_above_tolerance_gives_no_pairs(self, tmp_path):
+        _write_video(tmp_path / 'left.avi', [i / 30 for i in range(5)])
+        _write_video(tmp_path / 'right.avi', [i / 30 + 0.012 for i in range(5)])
+
+        stereo = StereoPairCapture(VideoFileSource(str(tmp_path / 'left.avi')),
+                                   VideoFileSource(str(tmp_path / 'right.avi')),
+                                   tolerance_ms=5.0, queue_size=32).start()
+        _wait_for_end(stereo)
+        assert not stereo.read(timeout=0.1)[0]
+        assert stereo.stats()['pairs'] == 0
+        stereo.release()
@@ -0,0 +1,53 @@
+"""
+Vision benchmark smoke test.
+
+One pass over a small synthetic pair must give a summary row for every
+stage at every scale.
+
+Run with:
+    pytest tests/test_vision_bench.py -v
+"""
+
+import importlib.util
+import os
+
+import pytest
+
+pytest.importorskip("cv2")
+
+from frame_sources import SyntheticSource
+
+BENCH_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'benchmarks', 'vision_bench.py')
+
+
+def _load_bench():
+    spec = importlib.util.spec_from_file_location('vision_bench', BENCH_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class TestVisionBench:
+    def test_rows_per_stage_and_scale(self):
+        bench = _load_bench()
+        ok, pair, _ = SyntheticSource(size=(320, 240), stereo=True).read()
+        rows = bench.benchmark([pair], scales=[1.0, 0.5], repeat=2)
+
+        stages = {'begin_frame', 'stage1', 'stage2', 'stage3', 'stage4',
+                  'pipeline', 'disparity', 'canny'}
+        assert {(r['scale'], r['stage']) for r in rows} == \
+            {(s, stage) for s in (1.0, 0.5) for stage in stages}
+        for row in rows:
+            assert row['n'] == 2
+            assert row['p50_ms'] <= row['p95_ms'] <= row['p99_ms']
+        assert {(r['width'], r['height']) for r in rows} == {(320, 240), (160, 120)}
+
+    def test_proposal_comparison(self):
+        bench = _load_bench()
+        ok, pair, _ = SyntheticSource(size=(320, 240), stereo=True).read()
+        rows = bench.compare_proposals([pair], scales=[1.0], repeat=1)
+
+        assert len(rows) == 1
+        assert rows[0]['full_p50_ms'] > 0 and rows[0]['pyramid_p50_ms'] > 0
+        assert 0.0 <= rows[0]['recall'] <= 1.0